@@ -0,0 +1,248 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import List, Optional, Union
+from app.core.config import settings
+from app.core.proxy_pool import proxy_pool
+from app.utils.deadline import clamp, check, DeadlineExceeded
+from app.utils.logger import log
+
+
+# Priority order — pehla sabse important
+TIERS = ("premium", "standard", "free")
+LATENCY_ALPHA = 0.2
+
+
+class AdmissionRejected(Exception):
+    """Capacity nahi hai — client ko turant 503 + Retry-After"""
+
+    def __init__(self, tier: str, retry_after: int):
+        super().__init__(f"Server busy — '{tier}' tier ke liye abhi capacity nahi")
+        self.tier = tier
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """
+    Admission ka handle — coalesced flight ka tier baad mein aaye behtar waiter ke
+    liye badh sakta hai (`promote`), queue mein khade hone par bhi.
+    """
+
+    def __init__(self, tier: str):
+        self.tier = tier
+        self.entry: Optional[list] = None  # [priority, seq, future, ticket] jab queue mein ho
+
+
+class AdmissionController:
+    """
+    TeraboxFetcher ke aage gate — cache miss (upstream kaam) tabhi shuru ho jab
+    live proxies ke health/latency ke hisaab se capacity ho. Capacity se zyada
+    load priority order mein queue hota hai; jo tier apna max wait pura nahi kar
+    sakta usse turant 503 — 45 second ke timeout se behtar.
+    Cache hits is gate se guzarte hi nahi.
+    """
+
+    def __init__(self):
+        self._in_flight = 0
+        self._waiters: List[list] = []  # heap of [priority, seq, future, ticket]
+        self._seq = itertools.count()
+        self._latency = 2.0  # EWMA seconds per admitted miss
+        self.admitted: Counter = Counter()
+        self.shed: Counter = Counter()
+        self.timeouts: Counter = Counter()
+        # Pool refresh pe capacity badh sakti hai — queue aage badhao
+        proxy_pool.refresh_listeners.append(self._wake)
+
+    # ── Capacity ──────────────────────────────────────────────────────────────
+
+    def tier_for(self, api_key: Optional[str]) -> str:
+        tier = settings.API_KEYS.get(api_key, settings.ADMISSION_DEFAULT_TIER) if api_key \
+            else settings.ADMISSION_DEFAULT_TIER
+        return tier if tier in TIERS else settings.ADMISSION_DEFAULT_TIER
+
+    def capacity(self) -> float:
+        """Parallel misses jo pool sambhal sakta hai — har proxy ke slots × health score"""
+        entries = proxy_pool.alive_entries()
+        if not entries:
+            return float(settings.ADMISSION_DIRECT_CAPACITY)
+        slots = settings.PROXY_MAX_CONCURRENCY or settings.ADMISSION_UNCAPPED_SLOTS
+        return max(1.0, sum(e.score for e in entries) * slots)
+
+    def warming(self) -> bool:
+        """
+        Pool abhi pehli baar load nahi hua (follower leader ke publish ka wait kar raha,
+        ya leader ka pehla refresh chal raha) — fallback capacity asli capacity nahi hai.
+        Serverless pe pool miss ke andar hi bharta hai, wahan warm-up nahi.
+        """
+        return not settings.SERVERLESS and proxy_pool.last_refreshed is None \
+            and not proxy_pool.alive_entries()
+
+    def _limit(self, tier: str) -> float:
+        return self.capacity() * settings.ADMISSION_SHARE.get(tier, 1.0)
+
+    def _expected_wait(self, priority: int) -> float:
+        """Aage kitne waiters hain ÷ throughput (capacity / miss latency)"""
+        ahead = sum(1 for w in self._waiters if w[0] <= priority)
+        throughput = self.capacity() / max(self._latency, 0.05)
+        return (ahead + 1) / throughput
+
+    def retry_after(self, priority: int = len(TIERS) - 1) -> int:
+        return min(60, max(1, math.ceil(self._expected_wait(priority))))
+
+    # ── Admission ─────────────────────────────────────────────────────────────
+
+    def _max_wait(self, tier: str, warming: bool = False) -> float:
+        # Request ki deadline queue wait ko bhi limit karti hai
+        wait = settings.ADMISSION_MAX_WAIT.get(tier, 0.0)
+        if warming:
+            # Pehle pool load ka wait — fallback capacity pe shed karna galat 503 hai
+            wait = max(wait, settings.ADMISSION_WARMUP_WAIT)
+        return clamp(wait)
+
+    def _try_take(self, tier: str) -> bool:
+        """Bina queue ke slot — koi barabar/behtar priority wala wait na kar raha ho tab"""
+        priority = TIERS.index(tier)
+        if any(w[0] <= priority for w in self._waiters) or self._in_flight >= self._limit(tier):
+            return False
+        self._in_flight += 1
+        self.admitted[tier] += 1
+        return True
+
+    async def _acquire(self, ticket: Ticket):
+        tier = ticket.tier
+        priority = TIERS.index(tier)
+        if self._try_take(tier):
+            return
+
+        warming = self.warming()
+        max_wait = self._max_wait(tier, warming)
+        # Warm-up mein expected wait fallback capacity se nikalta — bematlab
+        expected = 0.0 if warming else self._expected_wait(priority)
+        if max_wait <= 0 or len(self._waiters) >= settings.ADMISSION_QUEUE_SIZE \
+                or expected > max_wait:
+            if len(self._waiters) < settings.ADMISSION_QUEUE_SIZE \
+                    and 0 < expected <= settings.ADMISSION_MAX_WAIT.get(tier, 0.0):
+                # Tier wait kar sakta tha — request ki apni deadline chhoti hai
+                raise DeadlineExceeded("Request deadline admission queue ke wait se chhoti hai")
+            self.shed[tier] += 1
+            log.debug(f"Shed '{tier}' (in_flight {self._in_flight}, queue {len(self._waiters)})")
+            raise AdmissionRejected(tier, self.retry_after(priority))
+
+        fut = asyncio.get_running_loop().create_future()
+        ticket.entry = [priority, next(self._seq), fut, ticket]
+        heapq.heappush(self._waiters, ticket.entry)
+        start = time.monotonic()
+        try:
+            while not fut.done():
+                # promote() se tier badla ho toh max wait bhi naye tier ka
+                left = self._max_wait(ticket.tier, warming) - (time.monotonic() - start)
+                if left <= 0:
+                    self.timeouts[ticket.tier] += 1
+                    check()  # deadline ne kaata — 504, 503 nahi
+                    raise AdmissionRejected(ticket.tier, self.retry_after(ticket.entry[0]))
+                await asyncio.wait({fut}, timeout=left)
+        except asyncio.CancelledError:
+            # Slot mil chuka tha par client chala gaya — wapas do
+            if fut.done() and not fut.cancelled():
+                self._release()
+            raise
+        finally:
+            if ticket.entry in self._waiters:
+                self._waiters.remove(ticket.entry)
+                heapq.heapify(self._waiters)
+            ticket.entry = None
+
+    def promote(self, ticket: Ticket, tier: str):
+        """Behtar tier ka waiter flight se juda — queue mein aage karo"""
+        if tier not in TIERS or TIERS.index(tier) >= TIERS.index(ticket.tier):
+            return
+        ticket.tier = tier
+        if ticket.entry is not None and ticket.entry in self._waiters:
+            ticket.entry[0] = TIERS.index(tier)
+            heapq.heapify(self._waiters)
+            self._wake()
+
+    def _release(self):
+        self._in_flight = max(0, self._in_flight - 1)
+        self._wake()
+
+    def _wake(self):
+        while self._waiters:
+            priority, _, fut, ticket = self._waiters[0]
+            if fut.done():
+                heapq.heappop(self._waiters)
+                continue
+            if self._in_flight >= self._limit(ticket.tier):
+                return
+            heapq.heappop(self._waiters)
+            self._in_flight += 1
+            self.admitted[ticket.tier] += 1
+            fut.set_result(True)
+
+    @asynccontextmanager
+    async def slot(self, tier: Union[str, Ticket]):
+        """Cache miss ka upstream kaam isi ke andar karo"""
+        if not settings.ADMISSION_ENABLED:
+            yield
+            return
+        await self._acquire(tier if isinstance(tier, Ticket) else Ticket(tier))
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - start
+            self._latency = LATENCY_ALPHA * elapsed + (1 - LATENCY_ALPHA) * self._latency
+            self._release()
+
+    @asynccontextmanager
+    async def slots(self, tier: str, want: int):
+        """
+        Batch ke liye — pehla slot normal admission se (queue/shed), baaki sirf agar
+        abhi free hon. Yield = kitne slots mile; caller utne hi misses parallel chalaye.
+        """
+        if not settings.ADMISSION_ENABLED:
+            yield want
+            return
+        await self._acquire(Ticket(tier))
+        granted = 1
+        while granted < want and self._try_take(tier):
+            granted += 1
+        try:
+            yield granted
+        finally:
+            # Ek slot pe kai misses line se chalte hain — miss latency EWMA mein nahi ginte
+            for _ in range(granted):
+                self._release()
+
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def stats(self) -> dict:
+        capacity = self.capacity()
+        return {
+            "enabled": settings.ADMISSION_ENABLED,
+            "capacity": round(capacity, 1),
+            "warming": self.warming(),
+            "in_flight": self._in_flight,
+            "queue_depth": len(self._waiters),
+            "miss_latency_s": round(self._latency, 3),
+            "tiers": {
+                tier: {
+                    "limit": round(capacity * settings.ADMISSION_SHARE.get(tier, 1.0), 1),
+                    "max_wait": settings.ADMISSION_MAX_WAIT.get(tier, 0.0),
+                    "queued": sum(1 for w in self._waiters if w[3].tier == tier),
+                    "admitted": self.admitted[tier],
+                    "shed": self.shed[tier],
+                    "timeouts": self.timeouts[tier],
+                }
+                for tier in TIERS
+            },
+        }
+
+
+# Global instance
+admission = AdmissionController()
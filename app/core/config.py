@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Optional, List, Dict
 
 
 class Settings(BaseSettings):
@@ -15,10 +15,58 @@ class Settings(BaseSettings):
     PROXY_TEST_TIMEOUT: int = 5
     PROXY_MAX_FAILURES: int = 3
     PROXY_POOL_MIN_SIZE: int = 10
+    PROXY_STRATEGY: str = "round_robin"  # round_robin | random | weighted | least_loaded
+    # Per proxy in-flight limit (0 = unlimited). Har worker process ka apna count hai —
+    # N workers (SHARED_STATE ke saath bhi) pe ek proxy pe max N × yeh value
+    PROXY_MAX_CONCURRENCY: int = 2
+    PROXY_QUEUE_SIZE: int = 200       # sab saturated hon toh itne requests wait karein
+    PROXY_QUEUE_TIMEOUT: float = 5.0  # seconds — phir 503
+    PROXY_TEST_URL: str = "https://httpbin.org/ip"
+    PROXY_SOURCE_URLS: List[str] = []  # Set ho toh built-in PROXY_SOURCES ki jagah
     USE_TOR: bool = False
     TOR_SOCKS_PORT: int = 9050
     TOR_CONTROL_PORT: int = 9051
-    TOR_ROTATE_EVERY: int = 60
+    TOR_ROTATE_EVERY: int = 60           # Per-circuit max age (seconds, jitter ke saath)
+    TOR_HOST: str = "127.0.0.1"
+    TOR_SOCKS_PORTS: List[int] = []      # Multiple SocksPorts; khali = [TOR_SOCKS_PORT]
+    TOR_CIRCUITS_PER_PORT: int = 4       # SOCKS username isolation slots per port
+    TOR_CONTROL_PASSWORD: Optional[str] = None  # None = cookie / null auth
+    TOR_CIRCUIT_MIN_SCORE: float = 0.3
+    TOR_CHECK_INTERVAL: int = 5
+    TOR_STRATEGY: str = "least_loaded"
+
+    # Serverless (Vercel) — koi background task nahi, pool on-demand
+    SERVERLESS: bool = False
+    SERVERLESS_PROXY_SAMPLE: int = 20        # pehli zaroorat pe itne proxies test (ek source se)
+    SERVERLESS_MIN_ALIVE: int = 3            # itne zinda mil gaye toh baaki tests cancel
+    SERVERLESS_SAMPLE_TIMEOUT: float = 3.0   # sample ka total budget (source fetch + tests)
+    SERVERLESS_RESAMPLE_INTERVAL: int = 120  # sab proxies mar gaye toh itne baad hi dobara sample
+    PROXY_SNAPSHOT_PATH: str = ""            # Pre-built snapshot JSON (deploy ke saath bundle)
+
+    # Multi-worker shared state
+    SHARED_STATE: bool = False
+    SHARED_STATE_SIDECAR: bool = False  # True = workers kabhi leader nahi bante, sidecar refresh karta hai
+    SHARED_STATE_DIR: str = ""          # Default: /dev/shm/terabox-api
+    SHARED_REGION_MB: int = 8
+    SHARED_PUBLISH_INTERVAL: float = 1.0
+    SHARED_POLL_INTERVAL: float = 0.5
+    SHARED_CACHE_MAX_ENTRIES: int = 2000
+
+    # Admission control (cache miss = upstream kaam)
+    ADMISSION_ENABLED: bool = True
+    API_KEYS: Dict[str, str] = {}                 # X-API-Key → tier (premium | standard | free)
+    ADMISSION_DEFAULT_TIER: str = "standard"      # bina key wale requests
+    ADMISSION_SHARE: Dict[str, float] = {"premium": 1.0, "standard": 0.85, "free": 0.6}
+    ADMISSION_MAX_WAIT: Dict[str, float] = {"premium": 10.0, "standard": 5.0, "free": 0.0}
+    ADMISSION_QUEUE_SIZE: int = 500
+    ADMISSION_DIRECT_CAPACITY: int = 2            # pool khali — direct pe itne parallel
+    ADMISSION_WARMUP_WAIT: float = 15.0           # pool pehli baar load ho raha — shed ki jagah itna wait
+    ADMISSION_UNCAPPED_SLOTS: int = 4             # PROXY_MAX_CONCURRENCY=0 pe per-proxy estimate
+
+    # Deadlines / client disconnect
+    REQUEST_TIMEOUT_DEFAULT: float = 0        # seconds, 0 = sirf retries ka natural limit
+    REQUEST_TIMEOUT_MAX: float = 60           # X-Request-Timeout header ki upper limit
+    DISCONNECT_KEEP_MIN_HITS: int = 3         # itne hits wala URL client jaane pe bhi cache bharega
 
     # Rate Limiting
     RATE_LIMIT_REQUESTS: int = 30
@@ -29,11 +77,65 @@ class Settings(BaseSettings):
     USE_REDIS: bool = False
     REDIS_URL: str = "redis://localhost:6379/0"
 
+    # Refresh-ahead (hot links TTL se pehle re-resolve)
+    PREFETCH_ENABLED: bool = False
+    PREFETCH_TOP_K: int = 100
+    PREFETCH_MIN_HITS: int = 3           # isse kam hits wale keys refresh nahi hote
+    PREFETCH_LEAD: int = 30              # TTL khatam hone se itne seconds pehle
+    PREFETCH_INTERVAL: float = 5.0
+    PREFETCH_BUDGET_PER_MIN: int = 30    # max refreshes/min (~2 proxy calls each)
+    PREFETCH_DECAY_INTERVAL: int = 600   # counters aadhe — purani popularity fade
+    PREFETCH_BACKOFF: float = 30.0       # fail hue key ka pehla backoff (seconds), har fail pe double
+    PREFETCH_BACKOFF_MAX: float = 600.0
+
+    # Disk persistence (restart ke baad warm cache + proxy table)
+    PERSIST_ENABLED: bool = False
+    PERSIST_PATH: str = "data/state.db"        # SQLite (WAL mode)
+    PERSIST_FLUSH_INTERVAL: float = 1.0        # dirty entries itne seconds mein disk pe
+    PERSIST_PROXY_MAX_AGE: int = 1800          # isse purani proxy table load nahi hoti (full refresh)
+
     # Terabox
     TERABOX_APP_ID: int = 250528
+    TERABOX_API_BASE: str = "https://www.terabox.com"   # primary API host
+    TERABOX_API_MIRRORS: List[str] = [
+        "https://www.1024terabox.com",
+        "https://www.teraboxapp.com",
+        "https://www.terabox.app",
+    ]
+    TERABOX_RACE_FIRST_HOP: bool = False   # shorturlinfo pe top-2 hosts hedged race
+    TERABOX_RACE_DELAY_MS: int = 300       # doosra host itni der baad (0 = saath mein)
     TERABOX_TIMEOUT: int = 15
     TERABOX_MAX_RETRIES: int = 3
 
+    # Streaming relay
+    STREAM_CHUNK_SIZE: int = 64 * 1024
+    STREAM_MAX_REFRESHES: int = 3  # Mid-transfer dlink refresh / resume attempts
+
+    # Segmented downloader
+    DOWNLOAD_CONNECTIONS: int = 8
+    DOWNLOAD_SEGMENT_MB: int = 8
+    DOWNLOAD_MIN_SPLIT_KB: int = 512         # isse chhota segment steal nahi hota
+    DOWNLOAD_SLOW_AFTER: float = 5.0         # seconds — isse pehle speed judge nahi karte
+    DOWNLOAD_MIN_SPEED_KB: int = 50          # absolute floor; median ka 25% bhi
+    DOWNLOAD_SEGMENT_RETRIES: int = 8
+    DOWNLOAD_CHECKPOINT_INTERVAL: float = 2.0
+
+    # Logging
+    LOG_JSON: bool = True
+    LOG_FILE: Optional[str] = "logs/app.log"
+    LOG_FILE_MAX_MB: int = 10
+    LOG_RETENTION_DAYS: int = 7
+    LOG_QUEUE_SIZE: int = 10000
+    LOG_SAMPLE_RATE: float = 1.0
+    LOG_RATE_LIMIT: int = 100
+
+    # Tracing / Profiling
+    TRACING_ENABLED: bool = True
+    TRACE_SLOW_MS: int = 2000
+    TRACE_SAMPLE_RATE: float = 1.0
+    TRACE_BUFFER_SIZE: int = 100
+    ADMIN_TOKEN: Optional[str] = None
+
     class Config:
         env_file = ".env"
         case_sensitive = True
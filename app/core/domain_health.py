@@ -0,0 +1,113 @@
+import random
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from app.core.config import settings
+
+
+DIRECT = "DIRECT"
+HEALTH_ALPHA = 0.3
+MAX_PAIRS = 5000
+EXPLORE_RATE = 0.05
+
+
+def api_hosts() -> List[str]:
+    """Primary API base pehle, phir mirrors (duplicates hata ke)"""
+    hosts = [settings.TERABOX_API_BASE.rstrip("/")]
+    for mirror in settings.TERABOX_API_MIRRORS:
+        mirror = mirror.rstrip("/")
+        if mirror not in hosts:
+            hosts.append(mirror)
+    return hosts
+
+
+@dataclass
+class HostStats:
+    latency: float = 0.0    # EWMA seconds (sirf successes)
+    error_rate: float = 0.0  # EWMA 0..1
+    samples: int = 0
+    failures: int = 0
+    last_failure: float = 0.0
+
+    def record(self, ok: bool, latency: float):
+        if ok:
+            self.latency = latency if not self.samples else \
+                HEALTH_ALPHA * latency + (1 - HEALTH_ALPHA) * self.latency
+        else:
+            self.failures += 1
+            self.last_failure = time.time()
+        self.error_rate = HEALTH_ALPHA * (0.0 if ok else 1.0) + (1 - HEALTH_ALPHA) * self.error_rate
+        self.samples += 1
+
+    def record_latency(self, latency: float):
+        """Censored sample (race haara) — latency kam se kam itni; error rate nahi chhedte"""
+        self.latency = max(self.latency, HEALTH_ALPHA * latency + (1 - HEALTH_ALPHA) * self.latency)
+        self.samples += 1
+
+    def cost(self) -> float:
+        """Expected time — errors retry karwate hain isliye heavy penalty"""
+        latency = self.latency or settings.TERABOX_TIMEOUT / 2
+        return latency * (1 + 4 * self.error_rate)
+
+
+class DomainHealth:
+    """
+    Per-(proxy, API host) latency/error stats. Ek proxy ke region se koi mirror
+    block/slow ho sakta hai jabki doosra theek — isliye pair level pe track.
+    Pair ka data na ho toh us host ka global (sab proxies) stat use hota hai.
+    """
+
+    def __init__(self):
+        self._pairs: "OrderedDict[Tuple[str, str], HostStats]" = OrderedDict()
+        self._global: Dict[str, HostStats] = {}
+
+    def record(self, proxy_url: Optional[str], host: str, ok: bool, latency: float = 0.0):
+        key = (proxy_url or DIRECT, host)
+        stats = self._pairs.pop(key, None) or HostStats()
+        stats.record(ok, latency)
+        self._pairs[key] = stats
+        if len(self._pairs) > MAX_PAIRS:
+            self._pairs.popitem(last=False)  # LRU — mare hue proxies ke pairs
+        self._global.setdefault(host, HostStats()).record(ok, latency)
+
+    def record_slow(self, proxy_url: Optional[str], host: str, latency: float):
+        key = (proxy_url or DIRECT, host)
+        self._pairs.setdefault(key, HostStats()).record_latency(latency)
+        self._global.setdefault(host, HostStats()).record_latency(latency)
+
+    def _cost(self, proxy_url: Optional[str], host: str, order: int) -> float:
+        stats = self._pairs.get((proxy_url or DIRECT, host)) or self._global.get(host)
+        if stats is None or not stats.samples:
+            # Unknown host — optimistic, ek baar try ho jaye; tie pe config order
+            return order * 1e-3
+        return stats.cost()
+
+    def rank(self, proxy_url: Optional[str], hosts: Optional[List[str]] = None) -> List[str]:
+        """Best host pehle. Kabhi kabhi doosra host aage — warna uske stats kabhi update nahi honge"""
+        hosts = hosts or api_hosts()
+        order = {h: i for i, h in enumerate(hosts)}
+        ranked = sorted(hosts, key=lambda h: self._cost(proxy_url, h, order[h]))
+        if len(ranked) > 1 and random.random() < EXPLORE_RATE:
+            ranked[0], ranked[1] = ranked[1], ranked[0]
+        return ranked
+
+    def stats(self) -> dict:
+        return {
+            "hosts": api_hosts(),
+            "race_first_hop": settings.TERABOX_RACE_FIRST_HOP,
+            "pairs_tracked": len(self._pairs),
+            "global": {
+                host: {
+                    "latency_ms": round(s.latency * 1000),
+                    "error_rate": round(s.error_rate, 3),
+                    "samples": s.samples,
+                    "failures": s.failures,
+                }
+                for host, s in self._global.items()
+            },
+        }
+
+
+# Global instance
+domain_health = DomainHealth()
@@ -0,0 +1,453 @@
+"""
+Multi-connection segmented downloader — resolved `direct_link` ko Range segments
+mein tod ke kai proxies pe parallel fetch karo, preallocated file mein positional
+writes (pwrite), slow segments ka kaam idle connections pe shift, aur checkpoint
+file se resume.
+
+    python -m app.core.downloader "https://terabox.com/s/XXXXX" -o movie.mp4 -c 8
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import statistics
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, List, Optional, Set, Tuple
+
+import httpx
+
+from app.core.config import settings
+from app.core.proxy_pool import proxy_pool, ProxyPoolSaturated
+from app.core.terabox import terabox, build_client
+from app.utils.logger import log
+
+
+EXPIRED_STATUSES = {401, 403, 404, 410}
+FLUSH_BYTES = 1024 * 1024
+
+# _fetch ke outcomes — sirf FAILED segment ki retry limit mein ginta hai
+DONE = "done"
+FAILED = "failed"        # connection/proxy ki asli galti
+EXPIRED = "expired"      # dlink expire, refresh ho gaya
+SLOW = "slow"            # humne khud chhoda — baaki kaam tez connection pe
+SATURATED = "saturated"  # pool mein slot nahi mila, request bheji hi nahi
+
+
+class DownloadError(Exception):
+    pass
+
+
+def _parse_content_range(header: str) -> Optional[Tuple[int, Optional[int]]]:
+    """`bytes a-b/total` → (a, total) — total `*` ho toh None. Kharab header pe None"""
+    m = re.match(r"^bytes (\d+)-(\d+)/(\d+|\*)$", header.strip())
+    if not m:
+        return None
+    return int(m.group(1)), None if m.group(3) == "*" else int(m.group(3))
+
+
+class _SlowSegment(Exception):
+    pass
+
+
+@dataclass(eq=False)
+class Segment:
+    start: int
+    end: int            # inclusive — work stealing isse chhota kar sakta hai
+    pos: int = -1       # agla byte jo receive hoga
+    flushed: int = -1   # yahan tak disk pe likha ja chuka
+    failures: int = 0
+    expiries: int = 0
+    started: float = 0.0
+    run_bytes: int = 0
+
+    def __post_init__(self):
+        if self.pos < 0:
+            self.pos = self.start
+        if self.flushed < 0:
+            self.flushed = self.start
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.end - self.pos + 1)
+
+    @property
+    def speed(self) -> float:
+        elapsed = time.monotonic() - self.started
+        return self.run_bytes / elapsed if elapsed > 0 else 0.0
+
+
+class SegmentedDownloader:
+    def __init__(self, share_url: str, output: str, connections: Optional[int] = None,
+                 segment_size: Optional[int] = None, info: Optional[dict] = None,
+                 use_proxies: bool = True, resume: bool = True,
+                 progress: Optional[Callable[[int, int], None]] = None):
+        self.share_url = share_url
+        self.output = output
+        self.checkpoint_path = f"{output}.part.json"
+        self.connections = connections or settings.DOWNLOAD_CONNECTIONS
+        self.segment_size = segment_size or settings.DOWNLOAD_SEGMENT_MB * 1024 * 1024
+        self.min_split = settings.DOWNLOAD_MIN_SPLIT_KB * 1024
+        self.info = info
+        self.use_proxies = use_proxies
+        self.resume = resume
+        self.progress = progress
+
+        self.size = 0
+        self._fd: Optional[int] = None
+        self._pending: Deque[Segment] = deque()
+        self._active: Set[Segment] = set()
+        self._link_lock = asyncio.Lock()
+        self._error: Optional[Exception] = None
+
+        self.steals = 0
+        self.slow_abandons = 0
+        self.link_refreshes = 0
+        self.resumed_bytes = 0
+        self.bytes_written = 0
+        self.proxies_used: Set[str] = set()
+
+    # ── Planning / Checkpoint ─────────────────────────────────────────────────
+
+    def _plan(self):
+        for start in range(0, self.size, self.segment_size):
+            self._pending.append(Segment(start, min(start + self.segment_size, self.size) - 1))
+
+    def _load_checkpoint(self) -> bool:
+        if not (self.resume and os.path.exists(self.checkpoint_path) and os.path.exists(self.output)):
+            return False
+        try:
+            with open(self.checkpoint_path) as f:
+                ckpt = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if ckpt.get("size") != self.size or ckpt.get("share_url") != self.share_url:
+            log.warning("Checkpoint is download ka nahi hai — fresh start")
+            return False
+        for start, end in ckpt["remaining"]:
+            self._pending.append(Segment(start, end))
+        self.resumed_bytes = self.size - sum(s.remaining for s in self._pending)
+        log.info(f"⏯️ Resume: {self.resumed_bytes}/{self.size} bytes already done")
+        return True
+
+    def _remaining_ranges(self) -> List[List[int]]:
+        """
+        Flushed offset se — buffer mein pade bytes crash pe dobara aayenge. Sirf event
+        loop thread se call karo: wahi _pending/_active badalta hai, beech ka hissa nahi dikhega.
+        """
+        segs = list(self._pending) + list(self._active)
+        return sorted([s.flushed, s.end] for s in segs if s.flushed <= s.end)
+
+    def _write_checkpoint(self, ranges: List[List[int]]):
+        tmp = self.checkpoint_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({
+                "share_url": self.share_url,
+                "size": self.size,
+                "remaining": ranges,
+                "saved_at": time.time(),
+            }, f)
+        os.replace(tmp, self.checkpoint_path)
+
+    async def _save_checkpoint(self):
+        # Order zaroori hai: ranges snapshot (loop thread pe) → fsync → JSON. Snapshot ke
+        # baad wale pwrites bhi fsync mein aa jaate hain; ulta hua toh checkpoint un
+        # bytes ko durable maanega jo disk pe nahi hain, aur resume hole chhod dega
+        ranges = self._remaining_ranges()
+        await asyncio.to_thread(os.fsync, self._fd)
+        await asyncio.to_thread(self._write_checkpoint, ranges)
+
+    async def _checkpoint_loop(self):
+        while True:
+            await asyncio.sleep(settings.DOWNLOAD_CHECKPOINT_INTERVAL)
+            await self._save_checkpoint()
+            if self.progress:
+                self.progress(self.downloaded, self.size)
+
+    @property
+    def downloaded(self) -> int:
+        return self.size - sum(s.remaining for s in list(self._pending) + list(self._active))
+
+    # ── Link ──────────────────────────────────────────────────────────────────
+
+    async def _resolve(self):
+        info = await terabox.get_direct_link(self.share_url)
+        if "error" in info:
+            raise DownloadError(info["error"])
+        if self.size and int(info.get("size_bytes") or 0) != self.size:
+            raise DownloadError("File size badal gaya — share change ho gaya?")
+        self.info = info
+
+    async def _refresh_link(self, stale: str):
+        async with self._link_lock:
+            if self.info["direct_link"] != stale:
+                return  # kisi aur worker ne already refresh kar diya
+            self.link_refreshes += 1
+            log.info(f"🔁 dlink refresh #{self.link_refreshes}")
+            await self._resolve()
+
+    # ── Work Distribution ─────────────────────────────────────────────────────
+
+    def _next_segment(self) -> Optional[Segment]:
+        if self._pending:
+            return self._pending.popleft()
+        # Queue khali — sabse zyada time bache segment ka aadha kaam le lo
+        candidates = [s for s in self._active if s.remaining >= 2 * self.min_split]
+        if not candidates:
+            return None
+        victim = max(candidates, key=lambda s: s.remaining / max(s.speed, 1.0))
+        mid = victim.pos + victim.remaining // 2
+        stolen = Segment(mid, victim.end)
+        victim.end = mid - 1
+        self.steals += 1
+        return stolen
+
+    def _too_slow(self, seg: Segment) -> bool:
+        if time.monotonic() - seg.started < settings.DOWNLOAD_SLOW_AFTER:
+            return False
+        others = [s.speed for s in self._active if s is not seg and s.run_bytes]
+        floor = settings.DOWNLOAD_MIN_SPEED_KB * 1024
+        if len(others) >= 2:
+            floor = max(floor, statistics.median(others) * 0.25)
+        return seg.speed < floor
+
+    async def _write(self, offset: int, data: bytearray):
+        view = memoryview(data)
+        while view:
+            # pwrite short write kar sakta hai — baaki hissa aage likho
+            n = await asyncio.to_thread(os.pwrite, self._fd, view, offset)
+            view = view[n:]
+            offset += n
+            self.bytes_written += n
+
+    async def _fetch(self, seg: Segment) -> str:
+        """Segment ka ek attempt — DONE / FAILED / EXPIRED / SLOW / SATURATED"""
+        proxy = None
+        link = self.info["direct_link"]
+        seg.started = time.monotonic()
+        seg.run_bytes = 0
+        buf = bytearray()
+        buf_offset = seg.pos
+        ok = expired = False
+        try:
+            if self.use_proxies:
+                proxy = await proxy_pool.acquire_proxy()
+            if proxy:
+                self.proxies_used.add(proxy)
+            seg.started = time.monotonic()  # queue wait speed mein nahi ginte
+            async with build_client(proxy) as client:
+                headers = {"Range": f"bytes={seg.pos}-{seg.end}", "Accept-Encoding": "identity"}
+                async with client.stream("GET", link, headers=headers) as res:
+                    if res.status_code in EXPIRED_STATUSES:
+                        expired = True
+                        await self._refresh_link(link)
+                        return EXPIRED
+                    if res.status_code == 200 and res.headers.get("content-length") == str(self.size):
+                        # Asli file poori aa rahi hai — server Range nahi maanta, segmenting bekaar
+                        raise DownloadError("Upstream Range support nahi kar raha (status 200)")
+                    if res.status_code != 206:
+                        # 503/429, proxy ka 502/407 page — is connection ki galti, retry
+                        log.debug(f"Segment {seg.pos}-{seg.end} via {proxy or 'DIRECT'}: status {res.status_code}")
+                        return FAILED
+                    got = _parse_content_range(res.headers.get("content-range", ""))
+                    if got is None or got[0] != seg.pos:
+                        log.debug(f"Segment {seg.pos}-{seg.end}: bad Content-Range {res.headers.get('content-range')!r}")
+                        return FAILED
+                    if got[1] is not None and got[1] != self.size:
+                        raise DownloadError(f"Size mismatch: upstream {got[1]}, expected {self.size}")
+
+                    async for chunk in res.aiter_raw(settings.STREAM_CHUNK_SIZE):
+                        take = min(len(chunk), seg.end - seg.pos + 1)
+                        if take <= 0:
+                            break  # segment ka baaki hissa kisi aur ne le liya
+                        buf += chunk[:take] if take < len(chunk) else chunk
+                        seg.pos += take
+                        seg.run_bytes += take
+                        if len(buf) >= FLUSH_BYTES:
+                            await self._write(buf_offset, buf)
+                            buf_offset += len(buf)
+                            seg.flushed = buf_offset
+                            buf = bytearray()
+                        if seg.pos > seg.end:
+                            break
+                        if self._too_slow(seg):
+                            raise _SlowSegment(f"{seg.speed / 1024:.0f} KB/s")
+
+            if seg.pos <= seg.end:
+                raise httpx.RemoteProtocolError("Segment short read")
+            ok = True
+            return DONE
+
+        except ProxyPoolSaturated as e:
+            log.debug(f"Segment {seg.pos}-{seg.end}: proxy slot nahi mila ({e})")
+            return SATURATED
+
+        except _SlowSegment as e:
+            self.slow_abandons += 1
+            log.debug(f"Segment {seg.pos}-{seg.end} via {proxy or 'DIRECT'} too slow: {e}")
+            return SLOW
+
+        except httpx.HTTPError as e:
+            log.debug(f"Segment {seg.pos}-{seg.end} via {proxy or 'DIRECT'} failed: {e}")
+            return FAILED
+
+        finally:
+            # Jo bytes aa chuke hain woh valid hain — likh do
+            if buf:
+                await self._write(buf_offset, buf)
+                seg.flushed = buf_offset + len(buf)
+            if proxy:
+                if ok:
+                    proxy_pool.report_success(proxy, time.monotonic() - seg.started)
+                elif expired:
+                    proxy_pool.release(proxy)  # link ki galti, proxy ki nahi
+                else:
+                    proxy_pool.report_failure(proxy)
+
+    async def _worker(self):
+        while self._error is None:
+            seg = self._next_segment()
+            if seg is None:
+                if not self._active:
+                    return
+                await asyncio.sleep(0.2)  # koi split-able segment aa sakta hai
+                continue
+            self._active.add(seg)
+            outcome = FAILED
+            try:
+                outcome = await self._fetch(seg)
+            except DownloadError as e:
+                self._error = e
+            except asyncio.CancelledError:
+                # Checkpoint mein yeh range baaki dikhni chahiye
+                self._pending.append(seg)
+                raise
+            finally:
+                self._active.discard(seg)
+            if outcome != DONE and seg.remaining:
+                # Slow abandon / saturated pool segment ki galti nahi — retry limit mein nahi
+                if outcome == EXPIRED:
+                    seg.expiries += 1
+                elif outcome == FAILED:
+                    seg.failures += 1
+                if max(seg.failures, seg.expiries) > settings.DOWNLOAD_SEGMENT_RETRIES and self._error is None:
+                    self._error = DownloadError(f"Segment {seg.pos}-{seg.end} baar baar fail")
+                # Bacha hissa wapas queue mein — agli baar naya proxy milega
+                self._pending.append(Segment(seg.pos, seg.end, failures=seg.failures, expiries=seg.expiries))
+                if outcome == SATURATED:
+                    await asyncio.sleep(0.2)  # queue full pe turant dobara maangna busy loop hai
+
+    # ── Run ───────────────────────────────────────────────────────────────────
+
+    async def run(self) -> dict:
+        if self.info is None:
+            await self._resolve()
+        self.size = int(self.info.get("size_bytes") or 0)
+        if self.size <= 0:
+            raise DownloadError("File size unknown — segment nahi kar sakte")
+
+        resumed = self._load_checkpoint()
+        if not resumed:
+            self._plan()
+
+        self._fd = os.open(self.output, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if not resumed:
+                if hasattr(os, "posix_fallocate"):
+                    os.posix_fallocate(self._fd, 0, self.size)
+                else:
+                    os.ftruncate(self._fd, self.size)
+
+            start = time.monotonic()
+            ckpt = asyncio.create_task(self._checkpoint_loop())
+            try:
+                await asyncio.gather(*(self._worker() for _ in range(self.connections)))
+            finally:
+                ckpt.cancel()
+                await self._save_checkpoint()
+
+            if self._error:
+                raise self._error
+            if self._remaining_ranges():
+                raise DownloadError("Download incomplete — checkpoint se resume karo")
+            # File preallocated hai — st_size hamesha sahi dikhega; asli likhe bytes gino
+            if self.resumed_bytes + self.bytes_written != self.size:
+                raise DownloadError(
+                    f"Likhe gaye bytes ({self.resumed_bytes + self.bytes_written}) size_bytes "
+                    f"({self.size}) se match nahi karte"
+                )
+            elapsed = time.monotonic() - start
+        finally:
+            os.close(self._fd)
+
+        os.remove(self.checkpoint_path)
+        fetched = self.size - self.resumed_bytes
+        return {
+            "output": self.output,
+            "filename": self.info.get("filename"),
+            "size_bytes": self.size,
+            "elapsed_seconds": round(elapsed, 2),
+            "speed_mb_s": round(fetched / max(elapsed, 1e-6) / 1024 / 1024, 2),
+            "connections": self.connections,
+            "steals": self.steals,
+            "slow_abandons": self.slow_abandons,
+            "link_refreshes": self.link_refreshes,
+            "resumed_bytes": self.resumed_bytes,
+            "proxies_used": len(self.proxies_used),
+        }
+
+
+async def download(share_url: str, output: Optional[str] = None, **kwargs) -> dict:
+    """Library API — output na do toh Terabox filename use hota hai"""
+    info = kwargs.pop("info", None)
+    if output is None:
+        if info is None:
+            info = await terabox.get_direct_link(share_url)
+            if "error" in info:
+                raise DownloadError(info["error"])
+        output = os.path.basename(info.get("filename") or "download.bin")
+    return await SegmentedDownloader(share_url, output, info=info, **kwargs).run()
+
+
+# ─── CLI ──────────────────────────────────────────────────────────────────────
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("url", help="Terabox share URL")
+    p.add_argument("-o", "--output", default=None, help="Output file (default: Terabox filename)")
+    p.add_argument("-c", "--connections", type=int, default=settings.DOWNLOAD_CONNECTIONS)
+    p.add_argument("--segment-mb", type=int, default=settings.DOWNLOAD_SEGMENT_MB)
+    p.add_argument("--no-proxy", action="store_true", help="Direct connection, proxy pool mat bharo")
+    p.add_argument("--no-resume", action="store_true", help="Checkpoint ignore karo")
+    args = p.parse_args()
+
+    def progress(done: int, total: int):
+        sys.stderr.write(f"\r{done / max(total, 1) * 100:6.2f}%  {done / 1048576:.1f}/{total / 1048576:.1f} MB")
+        sys.stderr.flush()
+
+    async def _run():
+        if not args.no_proxy:
+            await proxy_pool.refresh_pool()
+        return await download(
+            args.url, args.output,
+            connections=args.connections,
+            segment_size=args.segment_mb * 1024 * 1024,
+            use_proxies=not args.no_proxy,
+            resume=not args.no_resume,
+            progress=progress,
+        )
+
+    try:
+        result = asyncio.run(_run())
+    except DownloadError as e:
+        sys.stderr.write(f"\n❌ {e}\n")
+        sys.exit(1)
+    sys.stderr.write("\n")
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
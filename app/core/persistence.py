@@ -0,0 +1,244 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Set
+from app.core.config import settings
+from app.core.proxy_pool import ProxyPoolManager, proxy_pool
+from app.core.shared_state import shared_state
+from app.utils.cache import InMemoryCache, cache
+from app.utils.logger import log
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key        TEXT PRIMARY KEY,
+    data       TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires_at);
+CREATE TABLE IF NOT EXISTS proxies (
+    url   TEXT PRIMARY KEY,
+    entry TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    k TEXT PRIMARY KEY,
+    v TEXT NOT NULL
+);
+"""
+
+PRUNE_INTERVAL = 60
+
+
+class PersistentStore:
+    """
+    Resolved links + proxy table (health scores ke saath) SQLite (WAL) mein —
+    restart/deploy ke baad node pehli second se warm. Writes incremental hain:
+    sirf badle hue cache keys / proxies har `PERSIST_FLUSH_INTERVAL` pe ek
+    transaction mein, background thread se (event loop block nahi hota).
+    """
+
+    def __init__(self, pool: ProxyPoolManager, cache_: InMemoryCache):
+        self.pool = pool
+        self.cache = cache_
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._writes: Set[asyncio.Future] = set()  # thread mein chal rahe writes
+        self._last_prune = 0.0
+
+        # Dirty sets — flush pe swap
+        self._cache_dirty: Dict[str, Optional[dict]] = {}
+        self._cache_cleared = False
+        self._proxies_dirty: Set[str] = set()
+        self._proxies_replaced = False
+
+        self.loaded_cache = 0
+        self.loaded_proxies = 0
+        self.load_ms = 0.0
+        self.flushes = 0
+        self.rows_written = 0
+
+    # ── Lifecycle ─────────────────────────────────────────────────────────────
+
+    def _connect(self) -> sqlite3.Connection:
+        path = settings.PERSIST_PATH
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        db = sqlite3.connect(path, isolation_level=None, check_same_thread=False, timeout=5)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")  # WAL mein crash-safe, fsync har commit pe nahi
+        db.executescript(SCHEMA)
+        return db
+
+    async def start(self) -> bool:
+        """Snapshot load karo, listeners lagao. True = proxy table warm mili (re-test skip)"""
+        start = time.perf_counter()
+        self._db = self._connect()
+        warm = self._load()
+        self.load_ms = round((time.perf_counter() - start) * 1000, 1)
+        log.info(f"💽 Warm start: {self.loaded_cache} cache entries, {self.loaded_proxies} proxies "
+                 f"in {self.load_ms}ms ({settings.PERSIST_PATH})")
+
+        self.cache.change_listeners.append(self._on_cache_change)
+        self.pool.outcome_listeners.append(self._on_outcome)
+        self.pool.refresh_listeners.append(self._on_refresh)
+        self._task = asyncio.create_task(self._loop())
+        return warm
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+        # Cancel sirf await ko kaatta hai — loop ka write thread mein abhi chal raha ho sakta hai
+        if self._writes:
+            await asyncio.gather(*self._writes, return_exceptions=True)
+        await self.flush()
+        await asyncio.to_thread(self._close)
+
+    def _close(self):
+        with self._db_lock:
+            if self._db:
+                self._db.close()
+                self._db = None
+
+    def _load(self) -> bool:
+        now = time.time()
+        rows = self._db.execute(
+            "SELECT key, data, expires_at, created_at FROM cache WHERE expires_at > ?", (now,)
+        ).fetchall()
+        self.cache.restore({
+            key: {"data": json.loads(data), "expires_at": expires_at, "created_at": created_at}
+            for key, data, expires_at, created_at in rows
+        })
+        self.loaded_cache = len(rows)
+
+        row = self._db.execute("SELECT v FROM meta WHERE k = 'proxies_refreshed'").fetchone()
+        refreshed = float(row[0]) if row else None
+        # Free proxies jaldi marte hain — bahut purani table se full refresh behtar
+        if refreshed is None or now - refreshed > settings.PERSIST_PROXY_MAX_AGE:
+            return False
+        entries = [json.loads(e) for (e,) in self._db.execute("SELECT entry FROM proxies")]
+        if not entries:
+            return False
+        self.pool.load_entries(entries, refreshed)
+        self.loaded_proxies = len(entries)
+        return True
+
+    # ── Change Tracking ───────────────────────────────────────────────────────
+
+    def _on_cache_change(self, key: Optional[str], entry: Optional[dict]):
+        if key is None:
+            self._cache_dirty.clear()
+            self._cache_cleared = True
+        else:
+            self._cache_dirty[key] = entry
+
+    def _on_outcome(self, proxy_url: str, ok: bool, response_time: float):
+        self._proxies_dirty.add(proxy_url)
+
+    def _on_refresh(self):
+        self._proxies_replaced = True
+        self._proxies_dirty.clear()
+
+    # ── Flush ─────────────────────────────────────────────────────────────────
+
+    def _take_batch(self) -> Optional[dict]:
+        # Follower ki proxy table leader ki copy hai — leader hi likhe
+        own_proxies = shared_state.role != "follower"
+        proxies = None
+        if own_proxies and (self._proxies_replaced or self._proxies_dirty):
+            entries = self.pool.export_entries()
+            if not self._proxies_replaced:
+                entries = [e for e in entries if e["url"] in self._proxies_dirty]
+            proxies = {
+                "replace": self._proxies_replaced,
+                "entries": entries,
+                "refreshed": self.pool.last_refreshed,
+            }
+        self._proxies_dirty = set()
+        self._proxies_replaced = False
+
+        if not (proxies or self._cache_dirty or self._cache_cleared):
+            return None
+        batch = {"cache": self._cache_dirty, "cleared": self._cache_cleared, "proxies": proxies}
+        self._cache_dirty = {}
+        self._cache_cleared = False
+        return batch
+
+    def _write(self, batch: dict):
+        with self._db_lock:
+            db = self._db
+            if db is None:
+                return
+            db.execute("BEGIN")
+            try:
+                if batch["cleared"]:
+                    db.execute("DELETE FROM cache")
+                for key, entry in batch["cache"].items():
+                    if entry is None:
+                        db.execute("DELETE FROM cache WHERE key = ?", (key,))
+                    else:
+                        db.execute(
+                            "INSERT OR REPLACE INTO cache (key, data, expires_at, created_at) VALUES (?, ?, ?, ?)",
+                            (key, json.dumps(entry["data"]), entry["expires_at"], entry["created_at"]),
+                        )
+                proxies = batch["proxies"]
+                if proxies:
+                    if proxies["replace"]:
+                        db.execute("DELETE FROM proxies")
+                    db.executemany(
+                        "INSERT OR REPLACE INTO proxies (url, entry) VALUES (?, ?)",
+                        [(e["url"], json.dumps(e)) for e in proxies["entries"]],
+                    )
+                    if proxies["refreshed"]:
+                        db.execute(
+                            "INSERT OR REPLACE INTO meta (k, v) VALUES ('proxies_refreshed', ?)",
+                            (str(proxies["refreshed"]),),
+                        )
+                now = time.time()
+                if now - self._last_prune > PRUNE_INTERVAL:
+                    self._last_prune = now
+                    db.execute("DELETE FROM cache WHERE expires_at < ?", (now,))
+                db.execute("COMMIT")
+            except sqlite3.Error:
+                db.execute("ROLLBACK")
+                raise
+        self.flushes += 1
+        self.rows_written += len(batch["cache"]) + (len(proxies["entries"]) if proxies else 0)
+
+    async def flush(self):
+        batch = self._take_batch()
+        if batch is None:
+            return
+        write = asyncio.ensure_future(asyncio.to_thread(self._write, batch))
+        self._writes.add(write)
+        write.add_done_callback(self._writes.discard)
+        try:
+            await asyncio.shield(write)  # flush cancel ho toh bhi stop() is write ka wait kar sake
+        except sqlite3.Error as e:
+            log.warning(f"Persist flush failed: {e}")
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(settings.PERSIST_FLUSH_INTERVAL)
+            await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self._db is not None,
+            "path": settings.PERSIST_PATH,
+            "loaded_cache": self.loaded_cache,
+            "loaded_proxies": self.loaded_proxies,
+            "load_ms": self.load_ms,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "pending_cache": len(self._cache_dirty),
+            "pending_proxies": len(self._proxies_dirty),
+        }
+
+
+# Global instance
+persistent_store = PersistentStore(proxy_pool, cache)
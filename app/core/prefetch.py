@@ -0,0 +1,236 @@
+import asyncio
+import hashlib
+import heapq
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.core.proxy_pool import proxy_pool, ProxyPoolSaturated
+from app.core.admission import admission
+from app.core.terabox import terabox
+from app.utils.cache import cache, InMemoryCache
+from app.utils.logger import log
+
+
+# ─── Frequency Tracking ───────────────────────────────────────────────────────
+
+class CountMinSketch:
+    """
+    Approximate counter — fixed memory (width × depth), kabhi under-count nahi
+    karta. `decay()` saare counters aadhe karta hai taaki purani popularity fade ho.
+    """
+
+    def __init__(self, width: int = 2048, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self._rows = [[0] * width for _ in range(depth)]
+
+    def _indexes(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=8 * self.depth).digest()
+        for i in range(self.depth):
+            yield i, int.from_bytes(digest[i * 8:(i + 1) * 8], "little") % self.width
+
+    def add(self, key: str, count: int = 1) -> int:
+        """Increment karo aur naya estimate lautao"""
+        estimate = None
+        for i, j in self._indexes(key):
+            self._rows[i][j] += count
+            value = self._rows[i][j]
+            estimate = value if estimate is None else min(estimate, value)
+        return estimate
+
+    def estimate(self, key: str) -> int:
+        return min(self._rows[i][j] for i, j in self._indexes(key))
+
+    def decay(self):
+        for row in self._rows:
+            for j in range(self.width):
+                row[j] >>= 1
+
+
+@dataclass
+class HotKey:
+    url: str
+    estimate: int
+    last_seen: float
+
+
+class HotKeys:
+    """
+    Count-min ke upar chhota top-K — refresh ke liye URL bhi yaad rakhta hai.
+    Coldest key ek lazy min-heap se (har cache.get pe O(K) scan nahi): estimate
+    badalne pe nayi entry push, purani stale entries coldest dhundte waqt hatti hain.
+    """
+
+    def __init__(self, k: int, sketch: Optional[CountMinSketch] = None):
+        self.k = k
+        self.sketch = sketch or CountMinSketch()
+        self._top: Dict[str, HotKey] = {}
+        self._heap: List[Tuple[int, str]] = []  # (estimate, url)
+
+    def _push(self, hot: HotKey):
+        heapq.heappush(self._heap, (hot.estimate, hot.url))
+        if len(self._heap) > 4 * self.k + 16:
+            self._rebuild()  # stale entries ka dher — compact karo
+
+    def _rebuild(self):
+        self._heap = [(h.estimate, h.url) for h in self._top.values()]
+        heapq.heapify(self._heap)
+
+    def _coldest(self) -> HotKey:
+        while True:
+            estimate, url = self._heap[0]
+            hot = self._top.get(url)
+            # Decay ke beech estimate sirf badhta hai — match na kare toh entry purani hai
+            if hot is not None and hot.estimate == estimate:
+                return hot
+            heapq.heappop(self._heap)
+
+    def record(self, url: str):
+        estimate = self.sketch.add(url)
+        now = time.time()
+        hot = self._top.get(url)
+        if hot:
+            hot.estimate = estimate
+            hot.last_seen = now
+            self._push(hot)
+            return
+        if len(self._top) >= self.k:
+            coldest = self._coldest()
+            if estimate <= coldest.estimate:
+                return
+            del self._top[coldest.url]
+            heapq.heappop(self._heap)
+        hot = self._top[url] = HotKey(url, estimate, now)
+        self._push(hot)
+
+    def decay(self):
+        self.sketch.decay()
+        for hot in self._top.values():
+            hot.estimate >>= 1
+        self._rebuild()
+
+    def hottest(self) -> List[HotKey]:
+        return sorted(self._top.values(), key=lambda h: h.estimate, reverse=True)
+
+
+# ─── Refresh-Ahead Scheduler ──────────────────────────────────────────────────
+
+class RefreshAhead:
+    """
+    Hot links ko TTL khatam hone se `PREFETCH_LEAD` seconds pehle background mein
+    dobara resolve karo. Har refresh 2 upstream calls (proxies se) hai, isliye
+    `PREFETCH_BUDGET_PER_MIN` token bucket se limit.
+    """
+
+    def __init__(self, store: InMemoryCache = cache):
+        self.cache = store
+        self.hot = HotKeys(settings.PREFETCH_TOP_K)
+        self._task: Optional[asyncio.Task] = None
+        self._inflight: set = set()
+        self._backoff: Dict[str, Tuple[float, int]] = {}  # url → (retry_at monotonic, lagataar fails)
+        self._tokens = float(settings.PREFETCH_BUDGET_PER_MIN)
+        self._last_fill = time.monotonic()
+        self._last_decay = time.monotonic()
+        self.refreshed = 0
+        self.failed = 0
+        self.skipped_budget = 0
+
+    async def start(self):
+        self.cache.access_listeners.append(self.hot.record)
+        self._task = asyncio.create_task(self._loop())
+        log.info(f"♻️ Refresh-ahead on: top {settings.PREFETCH_TOP_K}, "
+                 f"{settings.PREFETCH_BUDGET_PER_MIN} refreshes/min")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+        if self.hot.record in self.cache.access_listeners:
+            self.cache.access_listeners.remove(self.hot.record)
+
+    def _take_token(self) -> bool:
+        now = time.monotonic()
+        budget = settings.PREFETCH_BUDGET_PER_MIN
+        self._tokens = min(budget, self._tokens + (now - self._last_fill) * budget / 60)
+        self._last_fill = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    def due(self) -> List[HotKey]:
+        """Woh hot keys jinki entry jald expire hone wali hai (ya ho chuki hai)"""
+        now = time.time()
+        out = []
+        for hot in self.hot.hottest():
+            if hot.estimate < settings.PREFETCH_MIN_HITS or hot.url in self._inflight:
+                continue
+            # Abhi fail hua tha — har tick pe dobara try budget kha jaata
+            backoff = self._backoff.get(hot.url)
+            if backoff and backoff[0] > time.monotonic():
+                continue
+            # Ek TTL se koi nahi aaya — ab hot nahi hai
+            if now - hot.last_seen > settings.CACHE_TTL:
+                continue
+            remaining = self.cache.ttl_remaining(hot.url)
+            if remaining is None or remaining <= settings.PREFETCH_LEAD:
+                out.append(hot)
+        return out
+
+    async def _refresh(self, url: str):
+        self._inflight.add(url)
+        try:
+            try:
+                result = await terabox.get_direct_link(url)
+            except ProxyPoolSaturated as e:
+                result = {"error": str(e)}
+            if "error" in result:
+                self.failed += 1
+                fails = self._backoff.get(url, (0.0, 0))[1] + 1
+                delay = min(settings.PREFETCH_BACKOFF * 2 ** (fails - 1), settings.PREFETCH_BACKOFF_MAX)
+                self._backoff[url] = (time.monotonic() + delay, fails)
+                log.debug(f"Prefetch failed for {url[:50]} ({fails}x, retry in {delay:.0f}s): {result['error']}")
+                return
+            self._backoff.pop(url, None)
+            self.cache.set(url, result)
+            self.refreshed += 1
+            log.debug(f"♻️ Prefetched: {url[:50]}")
+        finally:
+            self._inflight.discard(url)
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(settings.PREFETCH_INTERVAL)
+            if time.monotonic() - self._last_decay > settings.PREFETCH_DECAY_INTERVAL:
+                self._last_decay = time.monotonic()
+                self.hot.decay()
+                # Top-K se nikle keys ka backoff yaad rakhne ka fayda nahi
+                tracked = {h.url for h in self.hot.hottest()}
+                self._backoff = {u: b for u, b in self._backoff.items() if u in tracked}
+            if proxy_pool.queue_stats()["depth"] or admission.queue_depth():
+                continue  # real users proxy slots ka wait kar rahe hain — unko pehle
+            for hot in self.due():
+                if not self._take_token():
+                    self.skipped_budget += 1
+                    break
+                asyncio.create_task(self._refresh(hot.url))
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self._task is not None,
+            "tracked": len(self.hot.hottest()),
+            "refreshed": self.refreshed,
+            "failed": self.failed,
+            "in_flight": len(self._inflight),
+            "skipped_budget": self.skipped_budget,
+            "backing_off": sum(1 for retry_at, _ in self._backoff.values() if retry_at > time.monotonic()),
+            "budget_tokens": round(self._tokens, 1),
+            "hottest": [
+                {"url": h.url, "hits": h.estimate, "ttl_remaining": self.cache.ttl_remaining(h.url)}
+                for h in self.hot.hottest()[:10]
+            ],
+        }
+
+
+# Global instance
+prefetcher = RefreshAhead()
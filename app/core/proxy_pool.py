@@ -1,13 +1,21 @@
 import asyncio
+import json
+import os
 import time
 import random
-from typing import Optional, List
-from dataclasses import dataclass, field
+from collections import deque
+from typing import Optional, List, Callable, Deque
+from dataclasses import dataclass, field, asdict
 import httpx
 from app.core.config import settings
+from app.core.proxy_strategy import ProxyStrategy, make_strategy
+from app.utils import deadline
 from app.utils.logger import log
 
 
+HEALTH_ALPHA = 0.3
+
+
 @dataclass
 class ProxyEntry:
     url: str
@@ -16,9 +24,12 @@ class ProxyEntry:
     last_checked: float = 0.0
     response_time: float = 999.0
     is_alive: bool = True
+    in_flight: int = 0
+    score: float = 1.0  # success rate ka EWMA — health score
 
     def mark_failed(self):
         self.failures += 1
+        self.score *= 1 - HEALTH_ALPHA
         if self.failures >= settings.PROXY_MAX_FAILURES:
             self.is_alive = False
             log.warning(f"Proxy DEAD: {self.url}")
@@ -28,6 +39,7 @@ class ProxyEntry:
         self.is_alive = True
         self.last_used = time.time()
         self.response_time = response_time
+        self.score = self.score * (1 - HEALTH_ALPHA) + HEALTH_ALPHA
 
 
 # Free proxy API sources
@@ -38,47 +50,87 @@ PROXY_SOURCES = [
     "https://raw.githubusercontent.com/ShiftyTR/Proxy-List/master/http.txt",
 ]
 
-TEST_URL = "https://httpbin.org/ip"
+TEST_URL = settings.PROXY_TEST_URL
+
+_ssl_context = None
+
+
+def test_ssl_context():
+    """
+    Proxy tests ka shared SSL context — har naya AsyncClient CA bundle dobara load
+    karta hai (~100ms CPU); 500 tests pe yahi refresh ka sabse bada kharcha tha.
+    """
+    global _ssl_context
+    if _ssl_context is None:
+        _ssl_context = httpx.create_ssl_context()
+    return _ssl_context
+
+
+class ProxyPoolSaturated(Exception):
+    """Saare proxies PROXY_MAX_CONCURRENCY pe hain aur admission queue full / wait timeout"""
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
 
 
 class ProxyPoolManager:
-    def __init__(self):
+    def __init__(self, strategy: Optional[ProxyStrategy] = None):
         self._pool: List[ProxyEntry] = []
         self._lock = asyncio.Lock()
-        self._index = 0
+        self._strategy = strategy or make_strategy()
         self._last_refreshed: Optional[float] = None
         self._requests_served = 0
         self._refresh_task: Optional[asyncio.Task] = None
-        self._tor_rotate_task: Optional[asyncio.Task] = None
+        self.tor = None  # TorCircuitPool — USE_TOR pe start_tor() banata hai
+        # (proxy_url, ok, response_time) — shared state / persistence yahan se outcomes sunte hain
+        self.outcome_listeners: List[Callable[[str, bool, float], None]] = []
+        # Pool replace hone pe (refresh / snapshot load)
+        self.refresh_listeners: List[Callable[[], None]] = []
+        # Saturated pool pe FIFO admission queue — release() pe slot seedha waiter ko
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._queue_peak = 0
+        self._queue_timeouts = 0
+        self._queue_rejected = 0
+        # Serverless: on-demand sample (ek hi chale, baaki usi ka wait karein)
+        self._sampling: Optional[asyncio.Task] = None
+        self._last_sampled: Optional[float] = None  # monotonic — None = abhi tak koi sample nahi
+        self._snapshot_tried = False
 
     # ── Startup ──────────────────────────────────────────────────────────────
 
-    async def start(self):
-        """App startup pe call karo"""
+    async def start(self, initial_refresh: bool = True):
+        """App startup pe call karo — pool pehle se loaded ho toh initial_refresh=False"""
         log.info("🚀 Proxy Pool Manager starting...")
-        await self.refresh_pool()
+        if initial_refresh:
+            await self.refresh_pool()
 
         # Background auto-refresh task
         self._refresh_task = asyncio.create_task(self._auto_refresh_loop())
+        await self.start_tor()
 
-        if settings.USE_TOR:
-            self._tor_rotate_task = asyncio.create_task(self._tor_rotate_loop())
-            log.info("🧅 Tor rotation enabled")
+    async def start_tor(self):
+        """Tor circuit pool — har worker ka apna (Tor local hai, circuits per-process)"""
+        if not settings.USE_TOR or self.tor is not None:
+            return
+        from app.core.tor_pool import TorCircuitPool
+        self.tor = TorCircuitPool()
+        await self.tor.start()
 
     async def stop(self):
         """App shutdown pe call karo"""
         if self._refresh_task:
             self._refresh_task.cancel()
-        if self._tor_rotate_task:
-            self._tor_rotate_task.cancel()
+        if self.tor:
+            await self.tor.stop()
         log.info("🛑 Proxy Pool Manager stopped")
 
     # ── Proxy Fetching ────────────────────────────────────────────────────────
 
-    async def _fetch_from_source(self, source_url: str) -> List[str]:
+    async def _fetch_from_source(self, source_url: str, timeout: float = 10) -> List[str]:
         """Single source se proxies fetch karo"""
         try:
-            async with httpx.AsyncClient(timeout=10) as client:
+            async with httpx.AsyncClient(timeout=timeout) as client:
                 res = await client.get(source_url)
                 proxies = []
                 for line in res.text.strip().splitlines():
@@ -98,7 +150,8 @@ class ProxyPoolManager:
         all_proxies: List[str] = []
 
         # Sab sources se parallel fetch
-        tasks = [self._fetch_from_source(src) for src in PROXY_SOURCES]
+        sources = settings.PROXY_SOURCE_URLS or PROXY_SOURCES
+        tasks = [self._fetch_from_source(src) for src in sources]
         results = await asyncio.gather(*tasks, return_exceptions=True)
 
         for result in results:
@@ -111,13 +164,21 @@ class ProxyPoolManager:
 
         # Test proxies (parallel, limited concurrency)
         alive = await self._test_proxies_batch(all_proxies)
+        await self._install(alive)
 
+    async def _install(self, alive: List[ProxyEntry]):
         async with self._lock:
+            # Chal rahi requests ka in-flight count naye entries pe bhi rahe
+            in_flight = {p.url: p.in_flight for p in self._pool}
+            for entry in alive:
+                entry.in_flight = in_flight.get(entry.url, 0)
             self._pool = alive
             self._last_refreshed = time.time()
-            self._index = 0
+            self._wake()
 
         log.info(f"✅ Proxy pool ready: {len(alive)} alive proxies")
+        for listener in self.refresh_listeners:
+            listener()
 
     async def _test_proxies_batch(self, proxy_urls: List[str], batch_size: int = 50) -> List[ProxyEntry]:
         """Proxies ko batch mein test karo"""
@@ -139,6 +200,99 @@ class ProxyPoolManager:
         alive.sort(key=lambda x: x.response_time)
         return alive
 
+    async def _test_until(self, proxy_urls: List[str], want: int) -> List[ProxyEntry]:
+        """Sab parallel test — `want` zinda mil gaye toh baaki cancel (serverless sample)"""
+        tasks = [asyncio.create_task(self._test_proxy(p)) for p in proxy_urls]
+        alive: List[ProxyEntry] = []
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                entry = await next_done
+                if entry is not None:
+                    alive.append(entry)
+                    if len(alive) >= want:
+                        break
+        finally:
+            for task in tasks:
+                task.cancel()
+        alive.sort(key=lambda x: x.response_time)
+        return alive
+
+    # ── Serverless (on-demand pool) ───────────────────────────────────────────
+
+    async def ensure_ready(self):
+        """
+        Serverless mode — startup pe kuch nahi hota, pool pehli zaroorat pe bharta hai:
+        pehle PROXY_SNAPSHOT_PATH (deploy ke saath bundled), warna ek source se chhota
+        sample. Sample ka wait request ki deadline tak; na bane toh direct.
+        """
+        if any(p.is_alive for p in self._pool):
+            return
+        if not self._snapshot_tried:
+            self._snapshot_tried = True
+            if settings.PROXY_SNAPSHOT_PATH and self.load_snapshot(settings.PROXY_SNAPSHOT_PATH):
+                return
+        if self._sampling is None:
+            # Sab proxies haal hi mein mar gaye — har request pe naya sample nahi.
+            # monotonic() boot se ginta hai; fresh microVM pe woh 120s se kam ho sakta hai
+            if self._last_sampled is not None and \
+                    time.monotonic() - self._last_sampled < settings.SERVERLESS_RESAMPLE_INTERVAL:
+                return
+            self._last_sampled = time.monotonic()
+            self._sampling = asyncio.create_task(self._sample())
+            self._sampling.add_done_callback(self._sample_done)
+        try:
+            await asyncio.wait_for(
+                asyncio.shield(self._sampling),
+                deadline.clamp(settings.SERVERLESS_SAMPLE_TIMEOUT),
+            )
+        except asyncio.TimeoutError:
+            pass
+
+    def _sample_done(self, task: asyncio.Task):
+        self._sampling = None
+        if not task.cancelled() and task.exception() is not None:
+            log.warning(f"Proxy sample failed: {task.exception()}")
+
+    async def _sample(self):
+        start = time.monotonic()
+        budget = settings.SERVERLESS_SAMPLE_TIMEOUT
+        sources = settings.PROXY_SOURCE_URLS or PROXY_SOURCES
+        proxies = await self._fetch_from_source(random.choice(sources), timeout=budget)
+        sample = random.sample(proxies, min(len(proxies), settings.SERVERLESS_PROXY_SAMPLE))
+        try:
+            alive = await asyncio.wait_for(
+                self._test_until(sample, settings.SERVERLESS_MIN_ALIVE),
+                max(0.1, budget - (time.monotonic() - start)),
+            )
+        except asyncio.TimeoutError:
+            alive = []
+        await self._install(alive)
+        log.info(f"🎯 On-demand proxy sample: {len(alive)}/{len(sample)} alive "
+                 f"in {time.monotonic() - start:.2f}s")
+
+    def load_snapshot(self, path: str) -> bool:
+        """save_snapshot() wali JSON file — sab entries dead hon ya file na ho toh False"""
+        try:
+            with open(path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError) as e:
+            log.warning(f"Proxy snapshot load failed ({path}): {e}")
+            return False
+        entries = [e for e in snapshot.get("entries", []) if e.get("is_alive", True)]
+        if not entries:
+            return False
+        self.load_entries(entries, snapshot.get("refreshed"))
+        log.info(f"📦 Proxy snapshot loaded: {len(entries)} proxies ({path})")
+        return True
+
+    def save_snapshot(self, path: str):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"refreshed": self._last_refreshed, "entries": self.export_entries()}, f)
+        os.replace(tmp, path)
+
     async def _test_proxy(self, proxy_url: str) -> Optional[ProxyEntry]:
         """Single proxy test karo"""
         start = time.time()
@@ -146,6 +300,7 @@ class ProxyPoolManager:
             async with httpx.AsyncClient(
                 proxies={"https://": proxy_url, "http://": proxy_url},
                 timeout=settings.PROXY_TEST_TIMEOUT,
+                verify=test_ssl_context(),
             ) as client:
                 res = await client.get(TEST_URL)
                 if res.status_code == 200:
@@ -159,23 +314,134 @@ class ProxyPoolManager:
 
     # ── Proxy Getting ─────────────────────────────────────────────────────────
 
+    @property
+    def strategy(self) -> ProxyStrategy:
+        return self._strategy
+
     def get_proxy(self) -> Optional[str]:
-        """Next alive proxy do (round-robin)"""
+        """
+        Next alive proxy do (PROXY_STRATEGY ke hisaab se). Har get_proxy ke baad
+        report_success/report_failure zaroor call karo — in-flight count wahi ghatata hai.
+        """
         if settings.USE_TOR:
-            return f"socks5://127.0.0.1:{settings.TOR_SOCKS_PORT}"
+            if self.tor:
+                return self.tor.get_circuit()
+            return f"socks5://{settings.TOR_HOST}:{settings.TOR_SOCKS_PORT}"
 
         alive = [p for p in self._pool if p.is_alive]
         if not alive:
             log.warning("⚠️ No alive proxies! Direct connection use ho raha hai")
             return None
 
-        # Round robin
-        proxy = alive[self._index % len(alive)]
-        self._index += 1
+        # Sync callers wait nahi kar sakte — saturated pool pe least-bad proxy
+        return self._take(self._strategy.select(self._available() or alive))
+
+    def _available(self) -> List[ProxyEntry]:
+        """Alive proxies jinke paas concurrency slot bacha hai"""
+        cap = settings.PROXY_MAX_CONCURRENCY
+        return [p for p in self._pool if p.is_alive and (not cap or p.in_flight < cap)]
+
+    def hold(self, proxy_url: str) -> bool:
+        """
+        Specific proxy pe slot lo — bina wait/strategy (stream ka dlink usi proxy se
+        bound hai). Poore stream tak in-flight mein gina jaata hai; release() se wapas.
+        """
+        if self.tor and self.tor.owns(proxy_url):
+            return False
+        for p in self._pool:
+            if p.url == proxy_url:
+                p.in_flight += 1
+                p.last_used = time.time()
+                return True
+        return False
+
+    def _take(self, proxy: ProxyEntry) -> str:
         self._requests_served += 1
+        proxy.in_flight += 1
         proxy.last_used = time.time()
         return proxy.url
 
+    async def acquire_proxy(self, timeout: Optional[float] = None) -> Optional[str]:
+        """
+        get_proxy ka backpressure wala version — har proxy pe max PROXY_MAX_CONCURRENCY
+        requests. Sab saturated hon toh bounded FIFO queue mein wait; queue full ya
+        timeout pe ProxyPoolSaturated (router 503 + Retry-After deta hai).
+        """
+        if settings.SERVERLESS and not settings.USE_TOR:
+            await self.ensure_ready()
+        if settings.USE_TOR or not settings.PROXY_MAX_CONCURRENCY:
+            return self.get_proxy()
+        if not any(p.is_alive for p in self._pool):
+            return self.get_proxy()  # None → direct, jaise pehle
+        if not self._waiters:
+            available = self._available()
+            if available:
+                return self._take(self._strategy.select(available))
+
+        if len(self._waiters) >= settings.PROXY_QUEUE_SIZE:
+            self._queue_rejected += 1
+            raise ProxyPoolSaturated("Proxy admission queue full")
+
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        self._queue_peak = max(self._queue_peak, len(self._waiters))
+        try:
+            # wait_for nahi — 3.11 mein future complete ho chuka ho toh woh caller ka
+            # cancel nigal jaata hai aur cancelled flight attempt chalata rehta
+            done, _ = await asyncio.wait({fut}, timeout=timeout or settings.PROXY_QUEUE_TIMEOUT)
+            if not done:
+                fut.cancel()
+                self._queue_timeouts += 1
+                deadline.check()  # wait request ki deadline ne kaata — 504, 503 nahi
+                raise ProxyPoolSaturated("Proxy slot ke liye wait timeout", retry_after=2)
+            return fut.result()
+        except asyncio.CancelledError:
+            # Slot mil chuka tha par caller chala gaya — wapas do
+            if fut.done() and not fut.cancelled() and fut.result():
+                self.release(fut.result())
+            raise
+        finally:
+            try:
+                self._waiters.remove(fut)
+            except ValueError:
+                pass
+
+    def _wake(self):
+        """Free slots queue ke aage wale waiters ko do"""
+        while self._waiters:
+            fut = self._waiters[0]
+            if fut.done():
+                self._waiters.popleft()
+                continue
+            if not any(p.is_alive for p in self._pool):
+                self._waiters.popleft()
+                fut.set_result(None)  # pool mar gaya — direct
+                continue
+            available = self._available()
+            if not available:
+                return
+            self._waiters.popleft()
+            fut.set_result(self._take(self._strategy.select(available)))
+
+    def peek_proxy(self) -> Optional[str]:
+        """Agla proxy kaunsa milega — bina rotate/count kiye"""
+        if settings.USE_TOR:
+            if self.tor:
+                return self.tor.peek()
+            return f"socks5://{settings.TOR_HOST}:{settings.TOR_SOCKS_PORT}"
+        proxy = self._strategy.peek([p for p in self._pool if p.is_alive])
+        return proxy.url if proxy else None
+
+    def alive_entries(self) -> List[ProxyEntry]:
+        """Abhi kaam ke proxies (Tor on ho toh circuits) — capacity estimate ke liye"""
+        if self.tor:
+            return self.tor.entries()
+        return [p for p in self._pool if p.is_alive]
+
+    def rotate(self):
+        """Manual rotation — cursor wali strategy ko aage badhao"""
+        self._strategy.advance()
+
     def get_random_proxy(self) -> Optional[str]:
         """Random alive proxy do"""
         alive = [p for p in self._pool if p.is_alive]
@@ -185,17 +451,71 @@ class ProxyPoolManager:
 
     def report_failure(self, proxy_url: str):
         """Proxy ko failed mark karo"""
+        if self.tor and self.tor.owns(proxy_url):
+            self.tor.report(proxy_url, False)
+            return
+        self.release(proxy_url)
+        self.apply_outcome(proxy_url, False)
+        for listener in self.outcome_listeners:
+            listener(proxy_url, False, 0.0)
+
+    def report_success(self, proxy_url: str, response_time: float = 0.0):
+        """Proxy ko success mark karo"""
+        if self.tor and self.tor.owns(proxy_url):
+            self.tor.report(proxy_url, True, response_time)
+            return
+        self.release(proxy_url)
+        self.apply_outcome(proxy_url, True, response_time)
+        for listener in self.outcome_listeners:
+            listener(proxy_url, True, response_time)
+
+    def apply_outcome(self, proxy_url: str, ok: bool, response_time: float = 0.0):
+        """Sirf health update — in-flight nahi chhedta (doosre worker ke outcomes ke liye)"""
         for p in self._pool:
             if p.url == proxy_url:
-                p.mark_failed()
+                if ok:
+                    self._strategy.on_success(p, response_time)
+                else:
+                    self._strategy.on_failure(p)
                 break
 
-    def report_success(self, proxy_url: str, response_time: float = 0.0):
-        """Proxy ko success mark karo"""
+    def release(self, proxy_url: str):
+        """Request cancel hui — in-flight ghatao, health mat chhedo"""
+        if self.tor and self.tor.owns(proxy_url):
+            self.tor.release(proxy_url)
+            return
         for p in self._pool:
             if p.url == proxy_url:
-                p.mark_success(response_time)
+                p.in_flight = max(0, p.in_flight - 1)
                 break
+        self._wake()
+
+    # ── Export / Import ───────────────────────────────────────────────────────
+
+    def export_entries(self) -> List[dict]:
+        """Proxy table + health scores (shared state / snapshot ke liye)"""
+        return [
+            {k: v for k, v in asdict(p).items() if k != "in_flight"}
+            for p in self._pool
+        ]
+
+    def load_entries(self, entries: List[dict], last_refreshed: Optional[float] = None):
+        """Bahar se aayi proxy table load karo — local in-flight counts bache rehte hain"""
+        in_flight = {p.url: p.in_flight for p in self._pool}
+        pool = []
+        for e in entries:
+            entry = ProxyEntry(**e)
+            entry.in_flight = in_flight.get(entry.url, 0)
+            pool.append(entry)
+        self._pool = pool
+        self._last_refreshed = last_refreshed or self._last_refreshed
+        self._wake()
+        for listener in self.refresh_listeners:
+            listener()
+
+    @property
+    def last_refreshed(self) -> Optional[float]:
+        return self._last_refreshed
 
     # ── Background Tasks ──────────────────────────────────────────────────────
 
@@ -208,32 +528,12 @@ class ProxyPoolManager:
             except Exception as e:
                 log.error(f"Auto-refresh failed: {e}")
 
-    async def _tor_rotate_loop(self):
-        """Tor IP rotate karo"""
-        while True:
-            await asyncio.sleep(settings.TOR_ROTATE_EVERY)
-            try:
-                self._rotate_tor_ip()
-            except Exception as e:
-                log.warning(f"Tor rotation failed: {e}")
-
-    def _rotate_tor_ip(self):
-        try:
-            from stem import Signal
-            from stem.control import Controller
-            with Controller.from_port(port=settings.TOR_CONTROL_PORT) as ctrl:
-                ctrl.authenticate()
-                ctrl.signal(Signal.NEWNYM)
-                log.info("🧅 Tor IP rotated!")
-        except Exception as e:
-            log.error(f"Tor rotate error: {e}")
-
     # ── Stats ─────────────────────────────────────────────────────────────────
 
     def stats(self) -> dict:
         alive = [p for p in self._pool if p.is_alive]
         dead = [p for p in self._pool if not p.is_alive]
-        current = self.get_proxy()
+        current = self.peek_proxy()
 
         return {
             "total_proxies": len(self._pool),
@@ -242,9 +542,50 @@ class ProxyPoolManager:
             "current_proxy": current,
             "last_refreshed": self._last_refreshed,
             "tor_enabled": settings.USE_TOR,
+            "tor": self.tor.stats() if self.tor else None,
             "requests_served": self._requests_served,
+            "strategy": self._strategy.name,
+            "in_flight": sum(p.in_flight for p in alive),
+            "queue": self.queue_stats(),
+        }
+
+    def queue_stats(self) -> dict:
+        """Admission queue — autoscaling ke liye `depth` dekho"""
+        cap = settings.PROXY_MAX_CONCURRENCY
+        return {
+            "depth": len(self._waiters),
+            "peak": self._queue_peak,
+            "max_size": settings.PROXY_QUEUE_SIZE,
+            "timeouts": self._queue_timeouts,
+            "rejected": self._queue_rejected,
+            "max_concurrency": cap,
+            "free_slots": sum(cap - p.in_flight for p in self._available()) if cap else None,
         }
 
 
 # Global proxy pool instance
 proxy_pool = ProxyPoolManager()
+
+
+# ─── CLI ──────────────────────────────────────────────────────────────────────
+
+def main():
+    """
+    Full refresh karke snapshot likho — serverless deploy ke saath bundle karo
+    (PROXY_SNAPSHOT_PATH) taaki cold start pe proxy testing na ho.
+
+        python -m app.core.proxy_pool -o data/proxies.json
+    """
+    import argparse
+    p = argparse.ArgumentParser(description=main.__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("-o", "--output", default="data/proxies.json")
+    args = p.parse_args()
+
+    pool = ProxyPoolManager()
+    asyncio.run(pool.refresh_pool())
+    pool.save_snapshot(args.output)
+    print(f"{len(pool.export_entries())} proxies → {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import abc
+import random
+from typing import TYPE_CHECKING, Dict, List, Optional, Type
+from app.core.config import settings
+
+if TYPE_CHECKING:
+    from app.core.proxy_pool import ProxyEntry  # proxy_pool isi module ko import karta hai
+
+
+class ProxyStrategy(abc.ABC):
+    """
+    Proxy selection + health update ka interface. ProxyPoolManager aur offline
+    simulator (benchmarks/proxy_sim.py) dono isi ko use karte hain — jo simulator
+    mein jeeta wahi production mein `PROXY_STRATEGY` se chalao.
+    """
+
+    name = "base"
+
+    def __init__(self, rng: Optional[random.Random] = None):
+        self._rng = rng or random.Random()
+
+    @abc.abstractmethod
+    def select(self, alive: List["ProxyEntry"]) -> Optional["ProxyEntry"]:
+        """Agla proxy — in-flight/cursor jaisa state yahin badalta hai"""
+
+    def peek(self, alive: List["ProxyEntry"]) -> Optional["ProxyEntry"]:
+        """Agla proxy kaunsa hoga — bina state badle (stats ke liye)"""
+        return alive[0] if alive else None
+
+    def advance(self):
+        """Manual rotation — jin strategies mein cursor hai unke liye"""
+
+    def on_success(self, entry: "ProxyEntry", response_time: float):
+        entry.mark_success(response_time)
+
+    def on_failure(self, entry: "ProxyEntry"):
+        entry.mark_failed()
+
+
+class RoundRobinStrategy(ProxyStrategy):
+    name = "round_robin"
+
+    def __init__(self, rng: Optional[random.Random] = None):
+        super().__init__(rng)
+        self._index = 0
+
+    def select(self, alive):
+        if not alive:
+            return None
+        proxy = alive[self._index % len(alive)]
+        self._index += 1
+        return proxy
+
+    def peek(self, alive):
+        return alive[self._index % len(alive)] if alive else None
+
+    def advance(self):
+        self._index += 1
+
+
+class RandomStrategy(ProxyStrategy):
+    name = "random"
+
+    def select(self, alive):
+        return self._rng.choice(alive) if alive else None
+
+
+class WeightedStrategy(ProxyStrategy):
+    """Health score / latency ke hisaab se weighted random — fast + reliable proxies zyada"""
+
+    name = "weighted"
+
+    @staticmethod
+    def weight(entry: "ProxyEntry") -> float:
+        return max(entry.score, 0.01) / max(entry.response_time, 0.05)
+
+    def select(self, alive):
+        if not alive:
+            return None
+        return self._rng.choices(alive, weights=[self.weight(p) for p in alive])[0]
+
+    def peek(self, alive):
+        return max(alive, key=self.weight) if alive else None
+
+
+class LeastLoadedStrategy(ProxyStrategy):
+    """Sabse kam in-flight requests wala proxy; tie pe fast wala"""
+
+    name = "least_loaded"
+
+    def select(self, alive):
+        if not alive:
+            return None
+        return min(alive, key=lambda p: (p.in_flight, p.response_time))
+
+    peek = select
+
+
+STRATEGIES: Dict[str, Type[ProxyStrategy]] = {
+    cls.name: cls
+    for cls in (RoundRobinStrategy, RandomStrategy, WeightedStrategy, LeastLoadedStrategy)
+}
+
+
+def make_strategy(name: Optional[str] = None, **kwargs) -> ProxyStrategy:
+    name = name or settings.PROXY_STRATEGY
+    try:
+        cls = STRATEGIES[name]
+    except KeyError:
+        raise ValueError(f"Unknown proxy strategy '{name}' — options: {', '.join(STRATEGIES)}")
+    return cls(**kwargs)
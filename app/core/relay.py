@@ -0,0 +1,226 @@
+import re
+from typing import Optional, Tuple
+from urllib.parse import quote
+import httpx
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse, Response
+
+from app.core.config import settings
+from app.core.terabox import terabox, build_client
+from app.core.proxy_pool import proxy_pool
+from app.core.resolver import resolver
+from app.utils.cache import cache
+from app.utils.logger import log
+
+
+# Signed dlink expire ho gaya — naya resolve karo
+EXPIRED_STATUSES = {401, 403, 404, 410}
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Single `bytes=a-b` range → (start, end) inclusive. Header na ho / multi-range
+    ho toh None (poori file). Unsatisfiable pe 416.
+    """
+    if not header or "," in header:
+        return None
+    m = _RANGE_RE.match(header.strip())
+    if not m or (not m.group(1) and not m.group(2)):
+        return None
+    first, last = m.group(1), m.group(2)
+    if first == "":
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if size and (start >= size or start > end):
+        raise HTTPException(
+            status_code=416,
+            detail="Range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return start, end
+
+
+def content_disposition(filename: str) -> str:
+    """
+    RFC 6266/5987 — `filename*` mein UTF-8 naam (Hindi/emoji wale shares), purane
+    clients ke liye ASCII fallback. Header Latin-1 hi encode hota hai, raw naam 500 deta.
+    """
+    fallback = re.sub(r'[^\x20-\x7e]|["\\]', "_", filename).strip() or "file"
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+
+class StreamRelay:
+    """
+    Resolved dlink ki body client tak relay karo — bounded chunks, upstream se
+    utna hi padho jitna client le raha hai (backpressure), aur beech mein link
+    expire/connection drop ho toh fresh dlink + Range se wahi offset se resume.
+    """
+
+    def __init__(self, share_url: str, tier: Optional[str] = None, request: Optional[Request] = None):
+        self.share_url = share_url
+        self.tier = tier
+        self.request = request
+        self.info: dict = {}
+        self.refreshes = 0
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_proxy: Optional[str] = None
+        self._held: Optional[str] = None  # proxy jiska slot stream ke liye pakda hai
+
+    async def _resolve(self, force: bool = False):
+        info = None if force else cache.get(self.share_url)
+        if not info:
+            if force or not self.tier:
+                # Chal rahe stream ka refresh — kaam pehle hi admit ho chuka
+                info = await terabox.get_direct_link(self.share_url)
+                if "error" not in info:
+                    cache.set(self.share_url, info)
+            else:
+                info = await resolver.resolve(self.share_url, self.tier, self.request)
+            if "error" in info:
+                raise HTTPException(status_code=404, detail=info["error"])
+        self.info = info
+
+    async def _client_for_link(self) -> httpx.AsyncClient:
+        # Wahi proxy jisne link resolve kiya — dlink aksar usi IP/region se bound hota hai
+        proxy = self.info.get("proxy_used")
+        if self._client is None or proxy != self._client_proxy:
+            await self._close()
+            self._client = build_client(proxy)
+            self._client_proxy = proxy
+            # Stream jitni der chale, proxy ka slot in-flight mein gina jaye
+            if proxy and proxy_pool.hold(proxy):
+                self._held = proxy
+        return self._client
+
+    async def _close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self._held:
+            proxy_pool.release(self._held)
+            self._held = None
+
+    async def _open(self, start: int, end: int) -> httpx.Response:
+        """Upstream stream kholo; link expired mile toh refresh karke dobara"""
+        while True:
+            client = await self._client_for_link()
+            req = client.build_request(
+                "GET",
+                self.info["direct_link"],
+                headers={"Range": f"bytes={start}-{end}", "Accept-Encoding": "identity"},
+            )
+            res = await client.send(req, stream=True)
+            if res.status_code in EXPIRED_STATUSES and self.refreshes < settings.STREAM_MAX_REFRESHES:
+                await res.aclose()
+                self.refreshes += 1
+                log.info(f"🔁 dlink expired ({res.status_code}) — refresh #{self.refreshes}")
+                await self._resolve(force=True)
+                continue
+            if res.status_code not in (200, 206):
+                await res.aclose()
+                raise HTTPException(status_code=502, detail=f"Upstream status {res.status_code}")
+            if res.status_code == 206:
+                got = res.headers.get("content-range", "")
+                if not got.startswith(f"bytes {start}-"):
+                    await res.aclose()
+                    raise HTTPException(status_code=502, detail=f"Upstream range mismatch: {got}")
+            return res
+
+    async def _open_retrying(self, start: int, end: int) -> httpx.Response:
+        """_open + transport error pe retry — initial open aur resume, dono ki ek hi policy"""
+        while True:
+            try:
+                return await self._open(start, end)
+            except httpx.HTTPError as e:
+                if self.refreshes >= settings.STREAM_MAX_REFRESHES:
+                    raise
+                self.refreshes += 1
+                log.info(f"🔁 Upstream open failed at byte {start}: {e} — retry #{self.refreshes}")
+
+    async def _body(self, res: httpx.Response, start: int, end: int):
+        """Chunks as-is forward karo — join/copy nahi; error pe offset se resume"""
+        length = end - start + 1
+        sent = 0
+        # Upstream ne Range ignore karke 200 diya — itne bytes skip karne padenge
+        skip = start if res.status_code == 200 else 0
+        try:
+            while True:
+                try:
+                    async for chunk in res.aiter_raw(settings.STREAM_CHUNK_SIZE):
+                        if skip:
+                            if len(chunk) <= skip:
+                                skip -= len(chunk)
+                                continue
+                            chunk = chunk[skip:]
+                            skip = 0
+                        if sent + len(chunk) > length:
+                            chunk = chunk[:length - sent]
+                        yield chunk
+                        sent += len(chunk)
+                        if sent >= length:
+                            return
+                    raise httpx.RemoteProtocolError("Upstream ne body beech mein band kar di")
+                except httpx.HTTPError as e:
+                    if self.refreshes >= settings.STREAM_MAX_REFRESHES:
+                        # Raise — server connection abort kare; chupchap return se client
+                        # ko chhoti body "poori" lagti
+                        log.warning(f"Stream aborted at {start + sent}/{end + 1}: {e}")
+                        raise
+                    log.info(f"🔁 Stream resume at byte {start + sent}: {e}")
+                finally:
+                    await res.aclose()
+
+                # Pehle same link se resume, expired mila toh _open khud refresh karega
+                self.refreshes += 1
+                try:
+                    res = await self._open_retrying(start + sent, end)
+                except (HTTPException, httpx.HTTPError) as e:
+                    log.warning(f"Stream resume failed at {start + sent}/{end + 1}: {getattr(e, 'detail', e)}")
+                    raise
+                skip = start + sent if res.status_code == 200 else 0
+        finally:
+            await self._close()
+
+    async def response(self, range_header: Optional[str]) -> Response:
+        await self._resolve()
+        size = int(self.info.get("size_bytes") or 0)
+        if size <= 0:
+            raise HTTPException(status_code=502, detail="File size unknown — stream nahi ho sakta")
+        byte_range = parse_range(range_header, size)
+        start, end = byte_range or (0, size - 1)
+
+        try:
+            res = await self._open_retrying(start, end)
+        except httpx.HTTPError as e:
+            await self._close()
+            raise HTTPException(status_code=502, detail=f"Upstream connect failed: {e}")
+        except BaseException:
+            await self._close()
+            raise
+
+        try:
+            headers = {
+                "Accept-Ranges": "bytes",
+                "Content-Length": str(end - start + 1),
+                "Content-Disposition": content_disposition(self.info.get("filename") or "file"),
+            }
+            status = 200
+            if byte_range:
+                status = 206
+                headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+            return StreamingResponse(
+                self._body(res, start, end),
+                status_code=status,
+                headers=headers,
+                media_type=res.headers.get("content-type", "application/octet-stream"),
+            )
+        except BaseException:
+            # Body generator kabhi chalega nahi — upstream aur proxy slot yahin chhodo
+            await res.aclose()
+            await self._close()
+            raise
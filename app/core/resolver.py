@@ -0,0 +1,141 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+from fastapi import Request
+from app.core.config import settings
+from app.core.admission import admission, Ticket
+from app.core.prefetch import CountMinSketch
+from app.core.terabox import terabox
+from app.utils.cache import cache
+from app.utils.deadline import remaining, without_deadline, DeadlineExceeded, ClientDisconnected
+from app.utils.logger import log
+
+
+# Keep-for-cache counters itne seconds pe aadhe — kal ke hot URLs hamesha hot nahi
+KEEP_DECAY_INTERVAL = 600
+
+
+@dataclass
+class Flight:
+    ticket: Optional[Ticket]  # None = caller pehle hi admit ho chuka (batch)
+    task: Optional[asyncio.Task] = None
+    waiters: int = 0
+
+
+class LinkResolver:
+    """
+    Cache miss ka upstream kaam — ek URL ke liye ek hi fetch (coalescing), admission
+    slot bhi ek hi. Har waiter apne client ka disconnect aur deadline dekhta hai;
+    aakhri waiter chala jaye toh fetch cancel — jab tak URL hot na ho (tab result
+    cache bharega aur agle users ke kaam aayega).
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, Flight] = {}
+        # Har cache.get count — prefetch on ho ya na ho, keep-for-cache isi se
+        self._hits = CountMinSketch()
+        self._last_decay = time.monotonic()
+        cache.access_listeners.append(self._record_access)
+        self.coalesced = 0
+        self.cancelled = 0
+        self.kept_for_cache = 0
+        self.disconnects = 0
+
+    def _record_access(self, url: str):
+        now = time.monotonic()
+        if now - self._last_decay > KEEP_DECAY_INTERVAL:
+            self._last_decay = now
+            self._hits.decay()
+        self._hits.add(url)
+
+    async def _run(self, url: str, flight: Flight) -> dict:
+        if flight.ticket is None:
+            result = await terabox.get_direct_link(url)
+        else:
+            async with admission.slot(flight.ticket):
+                result = await terabox.get_direct_link(url)
+        if "error" not in result:
+            cache.set(url, result)
+        return result
+
+    def _keep(self, url: str) -> bool:
+        """Sab chale gaye par URL hot hai — fetch poora karke cache bhar do"""
+        threshold = settings.DISCONNECT_KEEP_MIN_HITS
+        # Serverless pe response ke baad process freeze — background fetch poora nahi hota
+        return not settings.SERVERLESS and bool(threshold) and self._hits.estimate(url) >= threshold
+
+    def _done(self, url: str, flight: Flight):
+        if self._flights.get(url) is flight:
+            del self._flights[url]
+        task = flight.task
+        if not task.cancelled() and task.exception() is not None and not flight.waiters:
+            log.debug(f"Background fetch failed for {url[:50]}: {task.exception()}")
+
+    async def _disconnected(self, request: Request):
+        # Body pehle hi padh li gayi hai — ab receive() sirf http.disconnect pe lautega.
+        # is_disconnected() ka non-blocking poll BaseHTTPMiddleware ke peeche kaam nahi karta.
+        while (await request.receive())["type"] != "http.disconnect":
+            pass
+
+    async def _wait(self, flight: Flight, request: Optional[Request]) -> dict:
+        watch = asyncio.create_task(self._disconnected(request)) if request is not None else None
+        try:
+            done, _ = await asyncio.wait(
+                {flight.task, watch} - {None},
+                timeout=remaining(),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+        finally:
+            if watch:
+                watch.cancel()
+        if flight.task in done:
+            return dict(flight.task.result())  # har waiter ki apni copy
+        if watch in done:
+            self.disconnects += 1
+            raise ClientDisconnected()
+        raise DeadlineExceeded("Request deadline tak link resolve nahi hua")
+
+    async def resolve(self, url: str, tier: str, request: Optional[Request] = None,
+                      admitted: bool = False) -> dict:
+        """`admitted=True` — caller ne slot pehle hi le rakha hai (batch ek unit), dobara gate nahi"""
+        flight = self._flights.get(url)
+        if flight is None or flight.task.done():
+            # Pehle waiter ka context (trace spans, log trace_id) — bas deadline nahi;
+            # flight kisi ek waiter ki deadline nahi dhota, har waiter _wait mein apni dekhta hai
+            flight = Flight(None if admitted else Ticket(tier))
+            flight.task = asyncio.create_task(self._run(url, flight), context=without_deadline())
+            self._flights[url] = flight
+            flight.task.add_done_callback(lambda _, f=flight: self._done(url, f))
+        else:
+            self.coalesced += 1
+            # Flight sabse behtar waiter ke tier pe admit ho
+            if flight.ticket is not None:
+                admission.promote(flight.ticket, tier)
+
+        flight.waiters += 1
+        try:
+            return await self._wait(flight, request)
+        finally:
+            flight.waiters -= 1
+            if not flight.waiters and not flight.task.done():
+                if self._keep(url):
+                    self.kept_for_cache += 1
+                else:
+                    self.cancelled += 1
+                    flight.task.cancel()
+                    log.info(f"✂️ Upstream fetch cancelled (koi waiter nahi): {url[:50]}")
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._flights),
+            "waiters": sum(f.waiters for f in self._flights.values()),
+            "coalesced": self.coalesced,
+            "cancelled": self.cancelled,
+            "kept_for_cache": self.kept_for_cache,
+            "client_disconnects": self.disconnects,
+        }
+
+
+# Global instance
+resolver = LinkResolver()
@@ -0,0 +1,439 @@
+"""
+Multi-worker shared state — ek coordinator (leader worker ya sidecar) proxy pool
+refresh karta hai aur proxy table + health scores + hot cache shared memory
+(mmap) mein publish karta hai. Baaki workers sirf padhte hain aur apne outcomes
+unix datagram socket pe coordinator ko bhejte hain.
+
+Sidecar mode:
+    SHARED_STATE=True SHARED_STATE_SIDECAR=True python -m app.core.shared_state
+"""
+import asyncio
+import errno
+import fcntl
+import json
+import mmap
+import os
+import socket
+import struct
+import tempfile
+import time
+from typing import Optional, Tuple
+
+from app.core.config import settings
+from app.core.proxy_pool import proxy_pool, ProxyPoolManager
+from app.utils.cache import cache, InMemoryCache
+from app.utils.logger import log
+
+
+def state_dir() -> str:
+    path = settings.SHARED_STATE_DIR
+    if not path:
+        base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+        path = os.path.join(base, "terabox-api")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+# ─── Shared Memory Region ─────────────────────────────────────────────────────
+
+class SharedRegion:
+    """
+    Fixed-size mmap file, seqlock ke saath: writer seq odd karta hai, payload
+    likhta hai, phir seq even. Reader dono taraf same even seq dekhe tabhi data valid.
+    """
+
+    HEADER = struct.Struct("<QQ")  # seq, payload length
+
+    def __init__(self, path: str, size: int):
+        self.path = path
+        self.size = size
+        self._mm: Optional[mmap.mmap] = None
+
+    def open(self, create: bool = False) -> bool:
+        if self._mm is not None:
+            return True
+        if not create and not os.path.exists(self.path):
+            return False
+        # O_TRUNC nahi — inode wahi rehta hai, followers ki mapping valid rehti hai
+        fd = os.open(self.path, os.O_RDWR | (os.O_CREAT if create else 0), 0o600)
+        try:
+            if create and os.fstat(fd).st_size < self.size:
+                os.ftruncate(fd, self.size)
+            size = os.fstat(fd).st_size
+            if size < self.HEADER.size:
+                return False
+            self._mm = mmap.mmap(fd, size)
+            self.size = size
+        finally:
+            os.close(fd)
+        return True
+
+    def seq(self) -> int:
+        return self.HEADER.unpack_from(self._mm, 0)[0] if self._mm else 0
+
+    def write(self, payload: bytes) -> bool:
+        if len(payload) > self.size - self.HEADER.size:
+            return False
+        seq = self.seq()
+        seq += 1 if seq % 2 == 0 else 2  # crash hua writer odd chhod gaya ho toh bhi
+        self.HEADER.pack_into(self._mm, 0, seq, 0)
+        self._mm[self.HEADER.size:self.HEADER.size + len(payload)] = payload
+        self.HEADER.pack_into(self._mm, 0, seq + 1, len(payload))
+        return True
+
+    def read(self) -> Optional[Tuple[int, bytes]]:
+        if not self._mm and not self.open():
+            return None
+        for _ in range(8):
+            seq1, length = self.HEADER.unpack_from(self._mm, 0)
+            if seq1 % 2:
+                continue
+            data = bytes(self._mm[self.HEADER.size:self.HEADER.size + length])
+            if self.HEADER.unpack_from(self._mm, 0)[0] == seq1:
+                return seq1, data
+        return None
+
+
+def _cache_payload(raw: bytes) -> dict:
+    """Hot cache region ka payload — purana format (sirf entries) bhi padh lo"""
+    data = json.loads(raw) if raw else {}
+    if "entries" not in data:
+        data = {"entries": data}
+    data.setdefault("epoch", 0)
+    data.setdefault("deleted", {})
+    return data
+
+
+# ─── Coordinator / Worker ─────────────────────────────────────────────────────
+
+class SharedState:
+    def __init__(self, pool: ProxyPoolManager, cache_: InMemoryCache):
+        self.pool = pool
+        self.cache = cache_
+        self.role = "disabled"
+        self._dir = ""
+        self._lock_fd: Optional[int] = None
+        self._proxies: Optional[SharedRegion] = None
+        self._hot_cache: Optional[SharedRegion] = None
+        self._sock: Optional[socket.socket] = None
+        self._sock_path = ""
+        self._tasks: list = []
+
+        # Leader side
+        self._cache_table: dict = {}
+        self._cache_epoch = 0          # har clear pe +1 — followers local cache saaf karte hain
+        self._cache_deleted: dict = {}  # key → delete time (tombstones, CACHE_TTL tak)
+        self._proxies_dirty = False
+        self._cache_dirty = False
+        self._reports_received = 0
+
+        # Follower side
+        self._proxies_seq = 0
+        self._cache_seq = 0
+        self._cache_snapshot: dict = {}
+        self._seen_epoch: Optional[int] = None
+        self._reports_sent = 0
+        self._reports_dropped = 0
+
+    # ── Lifecycle ─────────────────────────────────────────────────────────────
+
+    async def start(self, sidecar: bool = False):
+        self._dir = state_dir()
+        size = settings.SHARED_REGION_MB * 1024 * 1024
+        self._proxies = SharedRegion(os.path.join(self._dir, "proxies.shm"), size)
+        self._hot_cache = SharedRegion(os.path.join(self._dir, "cache.shm"), size)
+        self._sock_path = os.path.join(self._dir, "reports.sock")
+
+        self.pool.outcome_listeners.append(self._on_outcome)
+        self.pool.refresh_listeners.append(self._on_refresh)
+        if not sidecar:
+            self.cache.attach_shared(self)
+
+        if sidecar:
+            while not self._try_lead():
+                await asyncio.sleep(settings.SHARED_POLL_INTERVAL)
+            await self._become_leader()
+        elif not settings.SHARED_STATE_SIDECAR and self._try_lead():
+            await self._become_leader()
+        else:
+            self.role = "follower"
+            self._client_socket()
+            self._sync_proxies()
+            await self.pool.start_tor()
+            log.info(f"🔗 Shared state: follower (pid {os.getpid()})")
+        self._tasks.append(asyncio.create_task(self._loop()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        if self.role == "leader":
+            self._publish()
+            await self.pool.stop()
+            asyncio.get_running_loop().remove_reader(self._sock.fileno())
+            try:
+                os.unlink(self._sock_path)
+            except OSError:
+                pass
+        if self._sock:
+            self._sock.close()
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)  # lock release — koi follower takeover karega
+
+    def _try_lead(self) -> bool:
+        fd = os.open(os.path.join(self._dir, "leader.lock"), os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError as e:
+            os.close(fd)
+            if e.errno in (errno.EAGAIN, errno.EACCES, errno.EWOULDBLOCK):
+                return False
+            raise
+        self._lock_fd = fd
+        return True
+
+    async def _become_leader(self):
+        was_follower = self.role == "follower"
+        self.role = "leader"
+        self._proxies.open(create=True)
+        self._hot_cache.open(create=True)
+
+        # Pichhle leader ka published state warm start ke liye
+        self._sync_proxies()
+        self._load_cache_table()
+        warm = bool(self.pool.export_entries())
+
+        if self._sock:
+            self._sock.close()
+        try:
+            os.unlink(self._sock_path)
+        except OSError:
+            pass
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.bind(self._sock_path)
+        self._sock.setblocking(False)
+        asyncio.get_running_loop().add_reader(self._sock.fileno(), self._drain_reports)
+
+        log.info(f"👑 Shared state: leader (pid {os.getpid()}{', takeover' if was_follower else ''})")
+        if warm:
+            self._tasks.append(asyncio.create_task(self.pool.start(initial_refresh=False)))
+        else:
+            self._tasks.append(asyncio.create_task(self.pool.start()))
+
+    def _client_socket(self):
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.setblocking(False)
+
+    async def _loop(self):
+        while True:
+            if self.role == "leader":
+                await asyncio.sleep(settings.SHARED_PUBLISH_INTERVAL)
+                self._publish()
+            else:
+                await asyncio.sleep(settings.SHARED_POLL_INTERVAL)
+                self._sync_proxies()
+                if not settings.SHARED_STATE_SIDECAR and self._try_lead():
+                    await self._become_leader()
+
+    # ── Outcome Reports ───────────────────────────────────────────────────────
+
+    def _on_outcome(self, proxy_url: str, ok: bool, response_time: float):
+        if self.role == "leader":
+            self._proxies_dirty = True
+        elif self.role == "follower":
+            self._send({"k": "o", "u": proxy_url, "ok": ok, "rt": round(response_time, 4)})
+
+    def _on_refresh(self):
+        if self.role == "leader":
+            self._proxies_dirty = True
+
+    def _send(self, msg: dict):
+        """Fire-and-forget — coordinator busy/down ho toh drop, request kabhi block nahi hoti"""
+        try:
+            self._sock.sendto(json.dumps(msg, separators=(",", ":")).encode(), self._sock_path)
+            self._reports_sent += 1
+        except OSError:
+            self._reports_dropped += 1
+
+    def _drain_reports(self):
+        while True:
+            try:
+                data = self._sock.recv(262144)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return
+            self._reports_received += 1
+            try:
+                msg = json.loads(data)
+            except ValueError:
+                continue
+            kind = msg.get("k")
+            if kind == "o":
+                self.pool.apply_outcome(msg["u"], msg["ok"], msg.get("rt", 0.0))
+                self._proxies_dirty = True
+            elif kind == "c":
+                self._cache_put(msg["key"], msg["e"])
+            elif kind == "x":
+                self._apply_invalidation(msg.get("key"))
+            elif kind == "refresh":
+                asyncio.create_task(self.pool.refresh_pool())
+
+    def request_refresh(self) -> bool:
+        """Follower se coordinator ko pool refresh bolo"""
+        if self.role != "follower":
+            return False
+        self._send({"k": "refresh"})
+        return True
+
+    # ── Proxy Table ───────────────────────────────────────────────────────────
+
+    def _sync_proxies(self):
+        """Published proxy table naya ho toh local pool mein load karo"""
+        snap = self._proxies.read()
+        if not snap or snap[0] == self._proxies_seq or not snap[1]:
+            return
+        self._proxies_seq = snap[0]
+        data = json.loads(snap[1])
+        if self.role == "follower" or not self.pool.export_entries():
+            self.pool.load_entries(data["proxies"], data.get("last_refreshed"))
+
+    def _publish(self):
+        if self._proxies_dirty:
+            self._proxies_dirty = False
+            payload = json.dumps({
+                "last_refreshed": self.pool.last_refreshed,
+                "published_at": time.time(),
+                "proxies": self.pool.export_entries(),
+            }).encode()
+            if not self._proxies.write(payload):
+                log.warning(f"Shared proxy table region chhota hai ({len(payload)} bytes)")
+            self._proxies_seq = self._proxies.seq()
+        if self._cache_dirty:
+            self._cache_dirty = False
+            self._publish_cache()
+
+    # ── Hot Cache ─────────────────────────────────────────────────────────────
+
+    def cache_publish(self, key: str, entry: dict):
+        if self.role == "leader":
+            self._cache_put(key, entry)
+        elif self.role == "follower":
+            self._send({"k": "c", "key": key, "e": entry})
+
+    def _cache_put(self, key: str, entry: dict):
+        self._cache_table[key] = entry
+        self._cache_dirty = True
+
+    def cache_invalidate(self, key: Optional[str]):
+        """Local delete (key) / clear (None) baaki workers tak — coordinator ke through"""
+        if self.role == "leader":
+            self._apply_invalidation(key)
+        elif self.role == "follower":
+            self._send({"k": "x", "key": key})
+
+    def _apply_invalidation(self, key: Optional[str]):
+        if key is None:
+            self._cache_table.clear()
+            self._cache_deleted.clear()
+            self._cache_epoch += 1
+        else:
+            self._cache_table.pop(key, None)
+            self._cache_deleted[key] = time.time()
+        self.cache.discard(key)  # leader worker ka apna local cache
+        self._cache_dirty = True
+
+    def cache_sync(self):
+        """
+        Follower: published version badla ho toh snapshot parse karo aur usme aaye
+        clear (epoch) / delete (tombstones) local cache pe lagao. Version same ho
+        toh sirf ek seq read — hot path sasta rehta hai.
+        """
+        if self.role != "follower" or not self._hot_cache.open():
+            return
+        if self._hot_cache.seq() == self._cache_seq:
+            return
+        snap = self._hot_cache.read()
+        if not snap:
+            return
+        self._cache_seq = snap[0]
+        data = _cache_payload(snap[1])
+        self._cache_snapshot = data["entries"]
+        if self._seen_epoch is not None and data["epoch"] != self._seen_epoch:
+            self.cache.discard(None)
+        self._seen_epoch = data["epoch"]
+        for key, deleted_at in data["deleted"].items():
+            self.cache.discard(key, before=deleted_at)
+
+    def cache_lookup(self, key: str) -> Optional[dict]:
+        if self.role == "leader":
+            return self._cache_table.get(key)
+        self.cache_sync()
+        return self._cache_snapshot.get(key)
+
+    def _load_cache_table(self):
+        snap = self._hot_cache.read()
+        if snap and snap[1]:
+            now = time.time()
+            data = _cache_payload(snap[1])
+            self._cache_table = {k: v for k, v in data["entries"].items() if v["expires_at"] > now}
+            self._cache_epoch = data["epoch"]
+            self._cache_deleted = data["deleted"]
+            self._cache_seq = snap[0]
+
+    def _publish_cache(self):
+        now = time.time()
+        live = sorted(
+            ((k, v) for k, v in self._cache_table.items() if v["expires_at"] > now),
+            key=lambda kv: kv[1]["created_at"], reverse=True,
+        )[:settings.SHARED_CACHE_MAX_ENTRIES]
+        # Tombstone ki zaroorat tab tak jab tak purani entry kisi local cache mein zinda ho sakti hai
+        self._cache_deleted = {
+            k: t for k, t in self._cache_deleted.items() if now - t < settings.CACHE_TTL
+        }
+
+        def payload() -> bytes:
+            return json.dumps({
+                "epoch": self._cache_epoch,
+                "deleted": self._cache_deleted,
+                "entries": self._cache_table,
+            }, default=str).encode()
+
+        self._cache_table = dict(live)
+        data = payload()
+        # Region se bada ho toh purane entries chhodo
+        while not self._hot_cache.write(data) and live:
+            live = live[:len(live) * 3 // 4]
+            self._cache_table = dict(live)
+            data = payload()
+        self._cache_seq = self._hot_cache.seq()
+
+    # ── Stats ─────────────────────────────────────────────────────────────────
+
+    def stats(self) -> dict:
+        return {
+            "enabled": settings.SHARED_STATE,
+            "role": self.role,
+            "pid": os.getpid(),
+            "dir": self._dir,
+            "proxy_table_version": self._proxies_seq,
+            "hot_cache_version": self._cache_seq,
+            "hot_cache_entries": len(self._cache_table if self.role == "leader" else self._cache_snapshot),
+            "reports_sent": self._reports_sent,
+            "reports_dropped": self._reports_dropped,
+            "reports_received": self._reports_received,
+        }
+
+
+shared_state = SharedState(proxy_pool, cache)
+
+
+async def _run_sidecar():
+    await shared_state.start(sidecar=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await shared_state.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(_run_sidecar())
@@ -1,12 +1,15 @@
 import re
 import time
-from typing import Optional
+import asyncio
+from typing import Optional, List, Tuple
 import httpx
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 
 from app.core.config import settings
 from app.core.proxy_pool import proxy_pool
+from app.core.domain_health import domain_health
 from app.utils.logger import log
+from app.utils.tracing import span, httpcore_trace
+from app.utils import deadline
 
 
 # ─── Constants ────────────────────────────────────────────────────────────────
@@ -59,7 +62,7 @@ def bytes_to_mb(size: int) -> float:
     return round(size / (1024 * 1024), 2)
 
 
-def build_client(proxy_url: Optional[str]) -> httpx.AsyncClient:
+def build_client(proxy_url: Optional[str], timeout: Optional[float] = None) -> httpx.AsyncClient:
     """httpx client banao with/without proxy"""
     proxies = None
     if proxy_url:
@@ -70,7 +73,7 @@ def build_client(proxy_url: Optional[str]) -> httpx.AsyncClient:
     return httpx.AsyncClient(
         headers=BASE_HEADERS,
         proxies=proxies,
-        timeout=settings.TERABOX_TIMEOUT,
+        timeout=timeout or settings.TERABOX_TIMEOUT,
         follow_redirects=True,
         verify=False,  # SSL ignore (proxy compatibility)
     )
@@ -93,28 +96,53 @@ class TeraboxFetcher:
         start_time = time.time()
 
         for attempt in range(1, settings.TERABOX_MAX_RETRIES + 1):
-            proxy_url = proxy_pool.get_proxy()
+            # Request ka budget khatam — aur retries se kisi ka fayda nahi
+            deadline.check()
+            with span("proxy_select"):
+                proxy_url = await proxy_pool.acquire_proxy(
+                    timeout=deadline.clamp(settings.PROXY_QUEUE_TIMEOUT)
+                )
             last_proxy = proxy_url
+            try:
+                deadline.check()  # proxy queue mein budget khatam ho gaya ho
+            except deadline.DeadlineExceeded:
+                if proxy_url:
+                    proxy_pool.release(proxy_url)
+                raise
 
             log.info(f"🔄 Attempt {attempt}/{settings.TERABOX_MAX_RETRIES} | Proxy: {proxy_url or 'DIRECT'}")
 
+            attempt_start = time.time()
             try:
-                result = await self._fetch(surl, share_url, proxy_url)
+                with span("attempt", n=attempt, proxy=proxy_url or "DIRECT"):
+                    result = await self._fetch(surl, share_url, proxy_url)
 
                 elapsed = time.time() - start_time
                 if proxy_url:
-                    proxy_pool.report_success(proxy_url, elapsed)
+                    # Health ke liye sirf is attempt ka time — pichhle failed attempts nahi
+                    proxy_pool.report_success(proxy_url, time.time() - attempt_start)
 
                 result["proxy_used"] = proxy_url
                 log.info(f"✅ Link generated in {elapsed:.2f}s via {proxy_url or 'DIRECT'}")
                 return result
 
+            except asyncio.CancelledError:
+                if proxy_url:
+                    proxy_pool.release(proxy_url)
+                raise
+
             except httpx.ProxyError as e:
                 log.warning(f"Proxy error ({proxy_url}): {e}")
                 if proxy_url:
                     proxy_pool.report_failure(proxy_url)
 
             except httpx.TimeoutException as e:
+                left = deadline.remaining()
+                if left is not None and left <= 0.1:
+                    # Timeout humari deadline ne chhota kiya tha — proxy ki galti nahi
+                    if proxy_url:
+                        proxy_pool.release(proxy_url)
+                    raise deadline.DeadlineExceeded("Request deadline nikal gayi") from e
                 log.warning(f"Timeout ({proxy_url}): {e}")
                 if proxy_url:
                     proxy_pool.report_failure(proxy_url)
@@ -126,19 +154,90 @@ class TeraboxFetcher:
 
         return {"error": f"Sabhi {settings.TERABOX_MAX_RETRIES} attempts fail ho gaye"}
 
+    async def _api_get(self, client: httpx.AsyncClient, host: str, path: str,
+                       proxy_url: Optional[str], name: str) -> dict:
+        """Ek API host pe GET — outcome (proxy, host) health mein record"""
+        start = time.monotonic()
+        try:
+            with span(name, host=host):
+                res = await client.get(
+                    f"{host}{path}",
+                    headers={"Referer": f"{host}/"},
+                    extensions={"trace": httpcore_trace()},
+                )
+                res.raise_for_status()
+                data = res.json()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            domain_health.record(proxy_url, host, False)
+            raise
+        domain_health.record(proxy_url, host, True, time.monotonic() - start)
+        return data
+
+    async def _race(self, client: httpx.AsyncClient, hosts: List[str], path: str,
+                    proxy_url: Optional[str]) -> Tuple[str, dict]:
+        """
+        Hedged race — best host abhi, doosra `TERABOX_RACE_DELAY_MS` baad (ya pehla
+        fail ho toh turant). Jo pehle sahi jawab de woh jeeta, baaki cancel.
+        """
+        async def one(host: str) -> Tuple[str, dict]:
+            return host, await self._api_get(client, host, path, proxy_url, "shorturlinfo")
+
+        started = {hosts[0]: time.monotonic()}
+        tasks = {asyncio.create_task(one(hosts[0])): hosts[0]}
+        error: Optional[BaseException] = None
+        won = False
+        try:
+            # Delay window bhi try ke andar — flight yahan cancel ho (client gaya) toh bhi
+            # host[0] ka task band ho, band hote client pe chalta na rahe
+            done, _ = await asyncio.wait(tasks, timeout=settings.TERABOX_RACE_DELAY_MS / 1000)
+            if not done or next(iter(done)).exception() is not None:
+                started[hosts[1]] = time.monotonic()
+                tasks[asyncio.create_task(one(hosts[1]))] = hosts[1]
+
+            while tasks:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    tasks.pop(task)
+                    if task.exception() is None:
+                        won = True
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task, host in tasks.items():
+                task.cancel()
+                if won:
+                    # Haara hua host kam se kam itna slow tha — ranking mein dikhna chahiye
+                    domain_health.record_slow(proxy_url, host, time.monotonic() - started[host])
+            if tasks:
+                # Client close hone se pehle cancelled tasks sach mein khatam hon
+                await asyncio.wait(tasks)
+                for task in tasks:
+                    if not task.cancelled():
+                        task.exception()  # saath mein fail hua loser — "never retrieved" nahi
+
+    async def _first_hop(self, client: httpx.AsyncClient, path: str,
+                         proxy_url: Optional[str]) -> Tuple[str, dict]:
+        hosts = domain_health.rank(proxy_url)
+        if settings.TERABOX_RACE_FIRST_HOP and len(hosts) > 1:
+            return await self._race(client, hosts[:2], path, proxy_url)
+        return hosts[0], await self._api_get(client, hosts[0], path, proxy_url, "shorturlinfo")
+
     async def _fetch(self, surl: str, share_url: str, proxy_url: Optional[str]) -> dict:
         """Actual Terabox API calls"""
-        async with build_client(proxy_url) as client:
+        with span("client_init"):
+            client = build_client(proxy_url, timeout=deadline.clamp(settings.TERABOX_TIMEOUT))
 
-            # ── Step 1: shorturlinfo ──────────────────────────────────────────
-            info_url = (
-                f"https://www.terabox.com/api/shorturlinfo"
-                f"?app_id={settings.TERABOX_APP_ID}"
-                f"&shorturl={surl}&root=1"
+        async with client:
+
+            # ── Step 1: shorturlinfo (best mirror, optional race) ─────────────
+            host, info = await self._first_hop(
+                client,
+                f"/api/shorturlinfo?app_id={settings.TERABOX_APP_ID}&shorturl={surl}&root=1",
+                proxy_url,
             )
-            info_res = await client.get(info_url)
-            info_res.raise_for_status()
-            info = info_res.json()
 
             log.debug(f"shorturlinfo response errno: {info.get('errno')}")
 
@@ -171,17 +270,15 @@ class TeraboxFetcher:
 
             log.debug(f"File: {filename} | Size: {bytes_to_mb(size)} MB | fs_id: {fs_id}")
 
-            # ── Step 3: Download link ─────────────────────────────────────────
-            dl_url = (
-                f"https://www.terabox.com/api/dlink"
+            # ── Step 3: Download link (sign usi host ka — wahi use karo) ──────
+            dl_path = (
+                f"/api/dlink"
                 f"?app_id={settings.TERABOX_APP_ID}"
                 f"&shareid={shareid}&uk={uk}"
                 f"&sign={sign}&timestamp={timestamp}"
                 f"&fs_id={fs_id}&type=3"
             )
-            dl_res = await client.get(dl_url)
-            dl_res.raise_for_status()
-            dl_data = dl_res.json()
+            dl_data = await self._api_get(client, host, dl_path, proxy_url, "dlink")
 
             dlink = dl_data.get("dlink") or dl_data.get("list", [{}])[0].get("dlink")
             if not dlink:
@@ -199,10 +296,10 @@ class TeraboxFetcher:
                 "fs_id": str(fs_id),
             }
 
-    async def get_batch_links(self, urls: list) -> list:
-        """Multiple URLs process karo"""
-        tasks = [self.get_direct_link(url) for url in urls]
-        import asyncio
+    async def get_batch_links(self, urls: list, resolve=None) -> list:
+        """Multiple URLs process karo — `resolve` se caller admission jaisa wrapper laga sakta hai"""
+        resolve = resolve or self.get_direct_link
+        tasks = [resolve(url) for url in urls]
         results = await asyncio.gather(*tasks, return_exceptions=True)
 
         output = []
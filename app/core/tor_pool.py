@@ -0,0 +1,274 @@
+import asyncio
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from app.core.config import settings
+from app.core.proxy_pool import ProxyEntry
+from app.core.proxy_strategy import ProxyStrategy, make_strategy
+from app.utils.logger import log
+
+
+# ─── Async Control Port ───────────────────────────────────────────────────────
+
+class TorControlError(Exception):
+    pass
+
+
+class TorController:
+    """
+    Minimal async Tor control-port client — stem ki tarah event loop block nahi
+    karta. Har command ke liye chhota connection, saari calls timeout ke saath.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: Optional[int] = None,
+                 password: Optional[str] = None, timeout: float = 5.0):
+        self.host = host
+        self.port = port or settings.TOR_CONTROL_PORT
+        self.password = password if password is not None else settings.TOR_CONTROL_PASSWORD
+        self.timeout = timeout
+
+    async def _command(self, writer, reader, line: str) -> List[str]:
+        writer.write(f"{line}\r\n".encode())
+        await writer.drain()
+        lines = []
+        while True:
+            raw = await reader.readline()
+            if not raw:
+                raise TorControlError("Control connection band ho gaya")
+            text = raw.decode(errors="replace").rstrip("\r\n")
+            if text[3:4] == "+":
+                # Data reply — "." tak padho
+                while True:
+                    data = (await reader.readline()).decode(errors="replace").rstrip("\r\n")
+                    if data == ".":
+                        break
+                    lines.append(data)
+                continue
+            lines.append(text[4:])
+            if not text.startswith("250"):
+                raise TorControlError(text)
+            if text[3:4] == " ":
+                return lines
+
+    async def _auth_line(self, writer, reader) -> str:
+        if self.password is not None:
+            return f'AUTHENTICATE "{self.password}"'
+        info = await self._command(writer, reader, "PROTOCOLINFO 1")
+        for line in info:
+            if "COOKIEFILE=" in line:
+                path = line.split('COOKIEFILE="', 1)[1].split('"', 1)[0]
+                with open(path, "rb") as f:
+                    return f"AUTHENTICATE {f.read().hex()}"
+        return "AUTHENTICATE"
+
+    async def run(self, *commands: str) -> List[List[str]]:
+        async def _go():
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+            try:
+                await self._command(writer, reader, await self._auth_line(writer, reader))
+                return [await self._command(writer, reader, c) for c in commands]
+            finally:
+                writer.close()
+        return await asyncio.wait_for(_go(), self.timeout)
+
+    async def newnym(self):
+        await self.run("SIGNAL NEWNYM")
+
+    async def circuits_for(self, username: str) -> List[str]:
+        """Is SOCKS username wale circuit IDs"""
+        (lines,) = await self.run("GETINFO circuit-status")
+        ids = []
+        for line in lines:
+            if f"SOCKS_USERNAME=\"{username}\"" in line:
+                ids.append(line.split(" ", 1)[0].replace("circuit-status=", ""))
+        return ids
+
+    async def close_circuits(self, ids: List[str]):
+        if ids:
+            await self.run(*(f"CLOSECIRCUIT {cid} IfUnused" for cid in ids))
+
+
+# ─── Circuit Pool ─────────────────────────────────────────────────────────────
+
+@dataclass
+class TorCircuit:
+    port: int
+    slot: int
+    generation: int = 0
+    born: float = field(default_factory=time.time)
+    max_age: float = 0.0
+    entry: Optional[ProxyEntry] = None
+
+    @property
+    def username(self) -> str:
+        # pid isliye ki multi-worker mein har worker ke circuits alag rahein
+        return f"tbx-{os.getpid()}-{self.port}-{self.slot}-{self.generation}"
+
+
+class TorCircuitPool:
+    """
+    Isolated Tor circuits ka pool — har SOCKS port × username isolation slot
+    ek circuit (Tor ka IsolateSOCKSAuth default on hai). Har circuit ka apna
+    health score; rotation sirf us circuit ke credentials badalta hai, isliye
+    purane circuit pe chal rahi requests khatam hone tak zinda rehti hain.
+    """
+
+    def __init__(self, strategy: Optional[ProxyStrategy] = None,
+                 controller: Optional[TorController] = None):
+        self._strategy = strategy or make_strategy(settings.TOR_STRATEGY)
+        self._controller = controller or TorController()
+        self._circuits: List[TorCircuit] = []
+        self._by_url: Dict[str, TorCircuit] = {}
+        self._retiring: Dict[str, int] = {}  # old url → in-flight
+        self._rotate_task: Optional[asyncio.Task] = None
+        self._rotations = 0
+        self._last_newnym = 0.0
+
+        ports = settings.TOR_SOCKS_PORTS or [settings.TOR_SOCKS_PORT]
+        for port in ports:
+            for slot in range(max(settings.TOR_CIRCUITS_PER_PORT, 1)):
+                circuit = TorCircuit(port=port, slot=slot)
+                self._renew(circuit)
+                self._circuits.append(circuit)
+
+    # ── Lifecycle ─────────────────────────────────────────────────────────────
+
+    async def start(self):
+        self._rotate_task = asyncio.create_task(self._rotate_loop())
+        log.info(f"🧅 Tor circuit pool: {len(self._circuits)} circuits "
+                 f"({len(settings.TOR_SOCKS_PORTS or [settings.TOR_SOCKS_PORT])} SOCKS ports)")
+
+    async def stop(self):
+        if self._rotate_task:
+            self._rotate_task.cancel()
+
+    # ── Selection ─────────────────────────────────────────────────────────────
+
+    def _url(self, circuit: TorCircuit) -> str:
+        return f"socks5://{circuit.username}:x@{settings.TOR_HOST}:{circuit.port}"
+
+    def _renew(self, circuit: TorCircuit):
+        circuit.born = time.time()
+        # Jitter — saare circuits ek saath rotate na hon
+        circuit.max_age = settings.TOR_ROTATE_EVERY * random.uniform(0.75, 1.25)
+        circuit.entry = ProxyEntry(url=self._url(circuit), response_time=1.0)
+        self._by_url[circuit.entry.url] = circuit
+
+    def owns(self, proxy_url: Optional[str]) -> bool:
+        return bool(proxy_url) and (proxy_url in self._by_url or proxy_url in self._retiring)
+
+    def get_circuit(self) -> Optional[str]:
+        alive = [c.entry for c in self._circuits if c.entry.is_alive]
+        if not alive:
+            # Sab circuits bimar — jo bhi hai wahi do, rotation loop theek karega
+            alive = [c.entry for c in self._circuits]
+        entry = self._strategy.select(alive)
+        entry.in_flight += 1
+        entry.last_used = time.time()
+        return entry.url
+
+    def entries(self) -> List[ProxyEntry]:
+        return [c.entry for c in self._circuits if c.entry.is_alive]
+
+    def peek(self) -> Optional[str]:
+        entry = self._strategy.peek([c.entry for c in self._circuits if c.entry.is_alive])
+        return entry.url if entry else None
+
+    # ── Outcomes ──────────────────────────────────────────────────────────────
+
+    def release(self, proxy_url: str):
+        if proxy_url in self._retiring:
+            self._retiring[proxy_url] = max(0, self._retiring[proxy_url] - 1)
+            return
+        circuit = self._by_url.get(proxy_url)
+        if circuit and circuit.entry.url == proxy_url:
+            circuit.entry.in_flight = max(0, circuit.entry.in_flight - 1)
+
+    def report(self, proxy_url: str, ok: bool, response_time: float = 0.0):
+        self.release(proxy_url)
+        circuit = self._by_url.get(proxy_url)
+        if not circuit or circuit.entry.url != proxy_url:
+            return  # rotate ho chuka circuit — purana outcome ignore
+        if ok:
+            self._strategy.on_success(circuit.entry, response_time)
+        else:
+            self._strategy.on_failure(circuit.entry)
+
+    # ── Rotation ──────────────────────────────────────────────────────────────
+
+    def _needs_rotation(self, circuit: TorCircuit, now: float) -> bool:
+        entry = circuit.entry
+        return (
+            not entry.is_alive
+            or entry.score < settings.TOR_CIRCUIT_MIN_SCORE
+            or now - circuit.born >= circuit.max_age
+        )
+
+    def rotate(self, circuit: TorCircuit):
+        """Naye SOCKS credentials → Tor naya circuit banata hai; purana drain hone do"""
+        old = circuit.entry
+        del self._by_url[old.url]
+        if old.in_flight:
+            self._retiring[old.url] = old.in_flight
+        circuit.generation += 1
+        self._renew(circuit)
+        self._rotations += 1
+        asyncio.create_task(self._retire(old.url, old.url.split("//", 1)[1].split(":", 1)[0]))
+        log.debug(f"🧅 Circuit rotated: port {circuit.port} slot {circuit.slot} → gen {circuit.generation}")
+
+    async def _retire(self, old_url: str, username: str):
+        """Purane circuit ki requests khatam hone do, phir control port se band karo (IfUnused)"""
+        deadline = time.monotonic() + settings.TERABOX_TIMEOUT * settings.TERABOX_MAX_RETRIES
+        while self._retiring.get(old_url, 0) > 0 and time.monotonic() < deadline:
+            await asyncio.sleep(1)
+        self._retiring.pop(old_url, None)
+        try:
+            await self._controller.close_circuits(await self._controller.circuits_for(username))
+        except (OSError, asyncio.TimeoutError, TorControlError) as e:
+            log.debug(f"Tor CLOSECIRCUIT skip ({username}): {e}")
+
+    async def _rotate_loop(self):
+        while True:
+            await asyncio.sleep(settings.TOR_CHECK_INTERVAL)
+            now = time.time()
+            for circuit in self._circuits:
+                if self._needs_rotation(circuit, now):
+                    self.rotate(circuit)
+
+            # Saare circuits ek saath fail ho rahe hain — shayad exit nodes blocked, NEWNYM
+            if all(c.entry.score < settings.TOR_CIRCUIT_MIN_SCORE for c in self._circuits) \
+                    and now - self._last_newnym > 10:
+                self._last_newnym = now
+                try:
+                    await self._controller.newnym()
+                    log.info("🧅 Tor NEWNYM (saare circuits unhealthy)")
+                except (OSError, asyncio.TimeoutError, TorControlError) as e:
+                    log.warning(f"Tor NEWNYM failed: {e}")
+
+    # ── Stats ─────────────────────────────────────────────────────────────────
+
+    def stats(self) -> dict:
+        now = time.time()
+        return {
+            "circuits": len(self._circuits),
+            "healthy": sum(1 for c in self._circuits if c.entry.is_alive),
+            "in_flight": sum(c.entry.in_flight for c in self._circuits),
+            "retiring": len(self._retiring),
+            "rotations": self._rotations,
+            "strategy": self._strategy.name,
+            "per_circuit": [
+                {
+                    "port": c.port,
+                    "slot": c.slot,
+                    "generation": c.generation,
+                    "age": round(now - c.born, 1),
+                    "in_flight": c.entry.in_flight,
+                    "score": round(c.entry.score, 3),
+                    "failures": c.entry.failures,
+                    "response_time": round(c.entry.response_time, 3),
+                }
+                for c in self._circuits
+            ],
+        }
@@ -1 +1 @@
-from app.routers import terabox_router, proxy_router
+from app.routers import terabox_router, proxy_router, admin_router
@@ -0,0 +1,69 @@
+import hmac
+import threading
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from app.core.config import settings
+from app.utils.tracing import trace_buffer
+from app.utils.profiler import profiler
+from app.utils.logger import log_stats
+
+
+async def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """
+    X-Admin-Token == ADMIN_TOKEN. Token set nahi hai toh /admin/* band (404) —
+    profiler, stack frames wale traces aur log level default deploy pe khule na rahein.
+    """
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+router = APIRouter(prefix="/admin", tags=["Admin"], dependencies=[Depends(require_admin)])
+
+
+# ── Traces ────────────────────────────────────────────────────────────────────
+
+@router.get("/traces", summary="Sampled slow-request traces")
+async def list_traces(limit: int = Query(50, ge=1, le=1000)):
+    """Ring buffer se slow requests ke span traces (naye pehle)"""
+    return {**trace_buffer.stats(), "traces": trace_buffer.list(limit)}
+
+
+@router.delete("/traces", summary="Trace buffer clear karo")
+async def clear_traces():
+    trace_buffer.clear()
+    return {"message": "Trace buffer cleared!"}
+
+
+# ── Profiler ──────────────────────────────────────────────────────────────────
+
+@router.post("/profiler/start", summary="Sampling profiler start karo")
+async def start_profiler(
+    interval_ms: float = Query(5.0, ge=1.0, le=1000.0, description="Sampling interval"),
+    duration: Optional[float] = Query(30.0, ge=1.0, le=600.0, description="Auto-stop (seconds)"),
+):
+    # Endpoint event loop thread pe chalta hai — wahi thread sample karo
+    started = profiler.start(interval_ms / 1000, duration, target_ident=threading.get_ident())
+    if not started:
+        raise HTTPException(status_code=409, detail="Profiler already chal raha hai")
+    return {"message": "Profiler started!", "interval_ms": interval_ms, "duration": duration}
+
+
+@router.post("/profiler/stop", summary="Sampling profiler stop karo")
+async def stop_profiler(top: int = Query(30, ge=1, le=500)):
+    profiler.stop()
+    return profiler.report(top)
+
+
+@router.get("/profiler", summary="Profiler report")
+async def profiler_report(top: int = Query(30, ge=1, le=500)):
+    return profiler.report(top)
+
+
+# ── Logging ───────────────────────────────────────────────────────────────────
+
+@router.get("/logging", summary="Log pipeline stats")
+async def logging_stats():
+    """Queue depth + sampled/dropped counts"""
+    return log_stats()
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, BackgroundTasks
 from app.core.proxy_pool import proxy_pool
+from app.core.domain_health import domain_health
 from app.utils.logger import log
 
 router = APIRouter(prefix="/proxy", tags=["Proxy Management"])
@@ -17,7 +18,10 @@ async def refresh_proxies(background_tasks: BackgroundTasks):
     Background mein proxy pool refresh karo.
     Response turant aata hai, refresh background mein hoti hai.
     """
-    background_tasks.add_task(proxy_pool.refresh_pool)
+    from app.core.shared_state import shared_state
+    # Shared state follower khud refresh nahi karta — coordinator ko bolo
+    if not shared_state.request_refresh():
+        background_tasks.add_task(proxy_pool.refresh_pool)
     return {
         "message": "Proxy refresh background mein start ho gayi!",
         "current_pool_size": proxy_pool.stats()["active_proxies"],
@@ -27,7 +31,7 @@ async def refresh_proxies(background_tasks: BackgroundTasks):
 @router.get("/current", summary="Current proxy URL dekho")
 async def current_proxy():
     """Abhi kaunsa proxy use ho raha hai"""
-    proxy = proxy_pool.get_proxy()
+    proxy = proxy_pool.peek_proxy()
     return {
         "proxy": proxy or "DIRECT (no proxy)",
         "tor_enabled": proxy_pool.stats()["tor_enabled"],
@@ -37,8 +41,21 @@ async def current_proxy():
 @router.post("/rotate", summary="Manually next proxy pe switch karo")
 async def rotate_proxy():
     """Force proxy rotation"""
-    old = proxy_pool.get_proxy()
-    proxy_pool._index += 1
-    new = proxy_pool.get_proxy()
+    old = proxy_pool.peek_proxy()
+    proxy_pool.rotate()
+    new = proxy_pool.peek_proxy()
     log.info(f"Manual rotation: {old} → {new}")
     return {"old_proxy": old, "new_proxy": new}
+
+
+@router.get("/shared", summary="Multi-worker shared state stats")
+async def shared_stats():
+    """Is worker ka role (leader/follower) aur shared table versions"""
+    from app.core.shared_state import shared_state
+    return shared_state.stats()
+
+
+@router.get("/domains", summary="Terabox API mirrors ki health")
+async def domain_stats():
+    """Har mirror host ka latency/error EWMA (sab proxies milake)"""
+    return domain_health.stats()
@@ -1,10 +1,16 @@
-from fastapi import APIRouter, Query, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Query, HTTPException, BackgroundTasks, Request
 from app.core.terabox import terabox
+from app.core.relay import StreamRelay
 from app.core.proxy_pool import proxy_pool
+from app.core.prefetch import prefetcher
+from app.core.admission import admission
+from app.core.resolver import resolver
 from app.utils.cache import cache
 from app.models.schemas import LinkRequest, LinkResponse, BatchRequest, BatchResponse
 from app.utils.logger import log
 import time
+import asyncio
+from contextlib import nullcontext
 
 router = APIRouter(prefix="/api", tags=["Terabox"])
 
@@ -17,6 +23,7 @@ router = APIRouter(prefix="/api", tags=["Terabox"])
     description="Terabox share URL se direct download link nikalo. Auto proxy rotation included.",
 )
 async def get_direct_link(
+    request: Request,
     url: str = Query(..., description="Terabox share URL", example="https://terabox.com/s/1AbCdEf"),
     force: bool = Query(False, description="Cache ignore karo aur fresh link lo"),
 ):
@@ -32,16 +39,15 @@ async def get_direct_link(
             cached["cached"] = True
             return cached
 
-    # Fetch
+    # Fetch — same URL ke parallel misses ek hi upstream fetch share karte hain;
+    # admission + cache fill resolver ke andar, client gaya toh fetch cancel
     start = time.time()
-    result = await terabox.get_direct_link(url)
+    tier = admission.tier_for(request.headers.get("x-api-key"))
+    result = await resolver.resolve(url, tier, request)
 
     if "error" in result:
         raise HTTPException(status_code=404, detail=result["error"])
 
-    # Cache mein save karo
-    cache.set(url, result)
-
     result["cached"] = False
     result["response_time_ms"] = round((time.time() - start) * 1000)
     return result
@@ -51,8 +57,28 @@ async def get_direct_link(
     "/get-link",
     summary="POST method se link generate karo",
 )
-async def get_direct_link_post(body: LinkRequest):
-    return await get_direct_link(url=body.url, force=False)
+async def get_direct_link_post(request: Request, body: LinkRequest):
+    return await get_direct_link(request, url=body.url, force=False)
+
+
+# ── Stream Relay ──────────────────────────────────────────────────────────────
+
+@router.get(
+    "/stream",
+    summary="File API ke through stream karo",
+    description="Share resolve karke file body relay karo — Range/resume support, "
+                "beech mein dlink expire ho toh khud refresh.",
+)
+async def stream_file(
+    request: Request,
+    url: str = Query(..., description="Terabox share URL", example="https://terabox.com/s/1AbCdEf"),
+):
+    allowed_domains = ["terabox.com", "teraboxapp.com", "1024terabox.com"]
+    if not any(d in url for d in allowed_domains):
+        raise HTTPException(status_code=400, detail="Sirf Terabox URLs allowed hain")
+
+    tier = admission.tier_for(request.headers.get("x-api-key"))
+    return await StreamRelay(url, tier=tier, request=request).response(request.headers.get("range"))
 
 
 # ── Batch Links ───────────────────────────────────────────────────────────────
@@ -62,8 +88,30 @@ async def get_direct_link_post(body: LinkRequest):
     summary="Multiple Terabox links ek baar mein",
     response_model=BatchResponse,
 )
-async def batch_links(body: BatchRequest):
-    results = await terabox.get_batch_links(body.urls)
+async def batch_links(request: Request, body: BatchRequest):
+    tier = admission.tier_for(request.headers.get("x-api-key"))
+
+    # Hits bina gate ke; misses ek unit ki tarah admit — pehla slot queue/shed se,
+    # baaki jitne abhi free hon. Misses utne hi parallel jitne slots mile, taaki
+    # batch capacity() ke hisaab se hi upstream pe load daale
+    hits = {}
+    for url in body.urls:
+        cached = cache.get(url)
+        if cached:
+            hits[url] = {**cached, "cached": True}
+    misses = {url for url in body.urls if url not in hits}
+
+    gate = admission.slots(tier, len(misses)) if misses else nullcontext(0)
+    async with gate as granted:
+        limit = asyncio.Semaphore(max(granted, 1))
+
+        async def resolve(url: str) -> dict:
+            if url in hits:
+                return hits[url]
+            async with limit:
+                return await resolver.resolve(url, tier, request, admitted=True)
+
+        results = await terabox.get_batch_links(body.urls, resolve=resolve)
 
     success = [r for r in results if r.get("success")]
     failed = [r for r in results if not r.get("success")]
@@ -85,6 +133,12 @@ async def clear_cache():
     return {"message": "Cache cleared!", "cleared_entries": stats["active_keys"]}
 
 
+@router.get("/admission", summary="Admission control / load shedding stats")
+async def admission_stats():
+    return {**admission.stats(), "resolver": resolver.stats()}
+
+
 @router.get("/cache/stats", summary="Cache statistics")
 async def cache_stats():
-    return cache.stats()
+    from app.core.persistence import persistent_store
+    return {**cache.stats(), "prefetch": prefetcher.stats(), "persistence": persistent_store.stats()}
@@ -1,3 +1,4 @@
+import copy
 import time
 import hashlib
 import json
@@ -13,14 +14,32 @@ class InMemoryCache:
         self._store: dict = {}
         self._hits = 0
         self._misses = 0
+        self._shared = None  # SharedState — multi-worker hot cache
+        self.access_listeners = []  # fn(url) — har get pe (refresh-ahead frequency tracking)
+        # fn(key, entry) — set pe entry, delete pe (key, None), clear pe (None, None)
+        self.change_listeners = []
+
+    def attach_shared(self, shared):
+        """Local miss pe shared snapshot dekho, har set shared mein publish karo"""
+        self._shared = shared
 
     def _make_key(self, url: str) -> str:
         return hashlib.md5(url.encode()).hexdigest()
 
     def get(self, url: str) -> Optional[Any]:
+        for listener in self.access_listeners:
+            listener(url)
+        if self._shared:
+            self._shared.cache_sync()  # doosre worker ka delete/clear pehle lagao
         key = self._make_key(url)
         entry = self._store.get(key)
 
+        if not entry and self._shared:
+            entry = self._shared.cache_lookup(key)
+            if entry and time.time() <= entry["expires_at"]:
+                self._store[key] = entry
+                log.debug(f"Cache SHARED HIT for: {url[:50]}")
+
         if not entry:
             self._misses += 1
             return None
@@ -34,7 +53,8 @@ class InMemoryCache:
 
         self._hits += 1
         log.debug(f"Cache HIT for: {url[:50]}")
-        return entry["data"]
+        # Copy — caller (router `cached["cached"] = True`) stored/shared entry na badle
+        return copy.copy(entry["data"])
 
     def set(self, url: str, data: Any, ttl: int = None):
         key = self._make_key(url)
@@ -44,16 +64,52 @@ class InMemoryCache:
             "expires_at": time.time() + ttl,
             "created_at": time.time(),
         }
+        if self._shared:
+            self._shared.cache_publish(key, self._store[key])
+        for listener in self.change_listeners:
+            listener(key, self._store[key])
         log.debug(f"Cache SET for: {url[:50]} (TTL: {ttl}s)")
 
+    def restore(self, entries: dict):
+        """Disk snapshot se entries wapas — listeners ko notify nahi karta"""
+        now = time.time()
+        self._store.update({k: v for k, v in entries.items() if v["expires_at"] > now})
+
+    def ttl_remaining(self, url: str) -> Optional[float]:
+        """Local entry kitne seconds aur valid hai — hit/miss count nahi hota"""
+        entry = self._store.get(self._make_key(url))
+        if not entry:
+            return None
+        return round(entry["expires_at"] - time.time(), 1)
+
     def delete(self, url: str):
         key = self._make_key(url)
         self._store.pop(key, None)
+        if self._shared:
+            self._shared.cache_invalidate(key)
+        for listener in self.change_listeners:
+            listener(key, None)
 
     def clear(self):
         self._store.clear()
+        if self._shared:
+            self._shared.cache_invalidate(None)
+        for listener in self.change_listeners:
+            listener(None, None)
         log.info("Cache cleared!")
 
+    def discard(self, key: Optional[str], before: Optional[float] = None):
+        """
+        Doosre worker ka delete/clear — shared/listeners ko wapas notify nahi karta.
+        key None = sab; `before` diya ho toh us waqt ke baad set hui entry bachti hai.
+        """
+        if key is None:
+            self._store.clear()
+            return
+        entry = self._store.get(key)
+        if entry and (before is None or entry["created_at"] <= before):
+            del self._store[key]
+
     def stats(self) -> dict:
         active = sum(
             1 for v in self._store.values()
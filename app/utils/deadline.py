@@ -0,0 +1,86 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Context, copy_context
+from typing import Optional
+from fastapi import Request
+from app.core.config import settings
+
+
+# Absolute time.monotonic() deadline — None = koi limit nahi
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """Request ka end-to-end time budget khatam"""
+
+
+class ClientDisconnected(Exception):
+    """Client chala gaya — jawab padhne wala koi nahi"""
+
+
+def remaining() -> Optional[float]:
+    """Deadline tak kitne seconds bache (None = unlimited)"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def clamp(seconds: float) -> float:
+    """
+    Timeout ko bache hue budget tak chhota karo. Budget khatam ho toh raise —
+    0.0 lautane pe callers ka `timeout or default` poora default wait kar leta.
+    """
+    left = remaining()
+    if left is None:
+        return seconds
+    if left <= 0:
+        raise DeadlineExceeded("Request deadline nikal gayi")
+    return min(seconds, left)
+
+
+def check():
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded("Request deadline nikal gayi")
+
+
+def without_deadline() -> Context:
+    """
+    Current context ki copy, sirf deadline hata ke — shared background kaam (coalesced
+    flight) trace/log context rakhe, par kisi ek caller ki deadline na dhoye.
+    """
+    ctx = copy_context()
+    ctx.run(_deadline.set, None)
+    return ctx
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]):
+    """Nested scope sirf deadline ko chhota kar sakta hai, bada nahi"""
+    if not seconds or seconds <= 0:
+        yield
+        return
+    new = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(new if current is None else min(current, new))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def _header_timeout(request: Request) -> Optional[float]:
+    raw = request.headers.get("x-request-timeout")
+    if raw:
+        try:
+            return min(float(raw), settings.REQUEST_TIMEOUT_MAX)
+        except ValueError:
+            pass
+    return settings.REQUEST_TIMEOUT_DEFAULT or None
+
+
+async def deadline_middleware(request: Request, call_next):
+    """`X-Request-Timeout: <seconds>` header se per-request end-to-end deadline"""
+    with deadline_scope(_header_timeout(request)):
+        return await call_next(request)
@@ -1,33 +1,262 @@
 import sys
+import os
+import json
+import time
+import queue
+import atexit
+import random
+import threading
+import traceback
+from datetime import datetime
+from typing import BinaryIO, List, Optional, TextIO, Tuple
 from loguru import logger
 from app.core.config import settings
+from app.utils.tracing import current_trace
 
 
-def setup_logger():
-    logger.remove()  # default handler hata do
+# ─── Sampling ─────────────────────────────────────────────────────────────────
 
-    # Console handler
-    logger.add(
-        sys.stdout,
-        format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | "
-               "<level>{level: <8}</level> | "
-               "<cyan>{name}</cyan>:<cyan>{line}</cyan> - "
-               "<level>{message}</level>",
-        level="DEBUG" if settings.DEBUG else "INFO",
-        colorize=True,
+class LogSampler:
+    """
+    Loguru filter — WARNING+ hamesha pass, INFO/DEBUG sampled + token-bucket
+    rate-limited. Filter formatting se pehle chalta hai, drop hue records ka
+    koi cost nahi.
+    """
+
+    def __init__(self):
+        self._tokens = float(settings.LOG_RATE_LIMIT)
+        self._last = time.monotonic()
+        self.dropped = 0
+
+    def __call__(self, record) -> bool:
+        if record["level"].no >= 30 or record["extra"].get("always"):
+            return True
+
+        if settings.LOG_SAMPLE_RATE < 1.0 and random.random() >= settings.LOG_SAMPLE_RATE:
+            self.dropped += 1
+            return False
+
+        limit = settings.LOG_RATE_LIMIT
+        if limit <= 0:
+            return True
+        now = time.monotonic()
+        self._tokens = min(float(limit), self._tokens + (now - self._last) * limit)
+        self._last = now
+        if self._tokens < 1.0:
+            self.dropped += 1
+            return False
+        self._tokens -= 1.0
+        return True
+
+
+# ─── Writer Thread ────────────────────────────────────────────────────────────
+
+# File sink hamesha INFO+ — DEBUG=True sirf console ko verbose karta hai
+FILE_LEVEL_NO = 20
+
+def _to_json(record) -> str:
+    data = {
+        "time": record["time"].isoformat(),
+        "level": record["level"].name,
+        "logger": record["name"],
+        "line": record["line"],
+        "message": record["message"],
+    }
+    if record["extra"]:
+        data.update(record["extra"])
+    if record["exception"]:
+        data["exception"] = "".join(traceback.format_exception(*record["exception"]))
+    return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def _to_text(record) -> str:
+    line = (
+        f"{record['time']:%Y-%m-%d %H:%M:%S} | {record['level'].name: <8} | "
+        f"{record['name']}:{record['line']} - {record['message']}"
     )
+    if record["exception"]:
+        line += "\n" + "".join(traceback.format_exception(*record["exception"])).rstrip()
+    return line
+
+
+class LogWriter(threading.Thread):
+    """
+    Queue se records utha ke format + write karo — event loop thread sirf
+    `put_nowait` karta hai. File rotation aur zip compression bhi yahin hota hai.
+    """
+
+    _STOP = object()
+
+    def __init__(self, console: Optional[TextIO], file_path: Optional[str]):
+        super().__init__(name="log-writer", daemon=True)
+        self.queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+        self.dropped = 0
+        self.dropped_errors = 0  # dropped mein se ERROR+ — queue full hone ka asli signal
+        self._console = console
+        self._file_path = file_path
+        self._file: Optional[BinaryIO] = None
+        self._file_size = 0
+        self._max_bytes = settings.LOG_FILE_MAX_MB * 1024 * 1024
+        self._format = _to_json if settings.LOG_JSON else _to_text
+
+    # ── Enqueue (caller thread) ───────────────────────────────────────────────
+
+    def sink(self, message):
+        """Loguru sink — record queue mein daalo, bas. Queue full pe drop, kabhi block nahi"""
+        record = message.record
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Event loop thread pe wait = har request ruk jaati — errors bhi gino aur chhodo
+            self.dropped += 1
+            if record["level"].no >= 40:
+                self.dropped_errors += 1
+
+    def stop(self, timeout: float = 2.0):
+        try:
+            self.queue.put(self._STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self.join(timeout)
+
+    # ── Writer (background thread) ────────────────────────────────────────────
+
+    def run(self):
+        while True:
+            batch = [self.queue.get()]
+            # Jo bhi queue mein pada hai ek saath likho — ek flush per batch
+            while len(batch) < 512:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = any(item is self._STOP for item in batch)
+            lines = [(r["level"].no, self._format(r)) for r in batch if r is not self._STOP]
+            if lines:
+                try:
+                    self._write(lines)
+                except Exception as e:
+                    sys.stderr.write(f"log writer error: {e}\n")
+            if stop:
+                self._close_file()
+                return
 
-    # File handler
+    def _write(self, lines: List[Tuple[int, str]]):
+        if self._console:
+            self._console.write("".join(f"{line}\n" for _, line in lines))
+            self._console.flush()
+        if self._file_path:
+            data = "".join(f"{line}\n" for no, line in lines if no >= FILE_LEVEL_NO).encode("utf-8")
+            if not data:
+                return
+            if self._file is None:
+                self._open_file()
+            self._file.write(data)
+            self._file.flush()
+            self._file_size += len(data)  # bytes — emoji/Hindi text chars se zyada bytes lete hain
+            if self._file_size >= self._max_bytes:
+                self._rotate()
+
+    def _open_file(self):
+        os.makedirs(os.path.dirname(self._file_path) or ".", exist_ok=True)
+        self._file = open(self._file_path, "ab")
+        self._file_size = self._file.tell()
+
+    def _close_file(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def _rotate(self):
+        """app.log → app.<timestamp>.log.zip, retention se purane delete"""
+        import glob
+        import zipfile
+        self._close_file()
+        base, ext = os.path.splitext(self._file_path)
+        rotated = f"{base}.{datetime.now():%Y-%m-%d_%H-%M-%S_%f}{ext}"
+        os.rename(self._file_path, rotated)
+        with zipfile.ZipFile(rotated + ".zip", "w", zipfile.ZIP_DEFLATED) as zf:
+            zf.write(rotated, os.path.basename(rotated))
+        os.remove(rotated)
+
+        cutoff = time.time() - settings.LOG_RETENTION_DAYS * 86400
+        for old in glob.glob(f"{base}.*{ext}.zip"):
+            if os.path.getmtime(old) < cutoff:
+                os.remove(old)
+        self._open_file()
+
+
+# ─── Setup ────────────────────────────────────────────────────────────────────
+
+def _add_trace_id(record):
+    """Active request ka trace_id har log line mein"""
+    trace = current_trace()
+    if trace is not None:
+        record["extra"]["trace_id"] = trace.trace_id
+
+
+sampler = LogSampler()
+writer: Optional[LogWriter] = None
+
+
+def _direct_sink(console: TextIO):
+    """
+    Serverless: invocation ke baad process freeze ho jaata hai — writer thread ki
+    queue mein pada record kho sakta hai. Seedha stdout, koi thread/file nahi.
+    """
+    fmt = _to_json if settings.LOG_JSON else _to_text
+
+    def sink(message):
+        console.write(fmt(message.record) + "\n")
+        console.flush()
+    return sink
+
+
+def setup_logger(console: Optional[TextIO] = sys.stdout, file_path: Optional[str] = settings.LOG_FILE):
+    global writer
+    logger.remove()  # default handler hata do
+    if writer is not None:
+        writer.stop()
+        writer = None
+
+    if settings.SERVERLESS:
+        sink = _direct_sink(console or sys.stdout)
+    else:
+        writer = LogWriter(console, file_path)
+        writer.start()
+        sink = writer.sink
+
+    logger.configure(patcher=_add_trace_id)
     logger.add(
-        "logs/app.log",
-        rotation="10 MB",
-        retention="7 days",
-        compression="zip",
-        level="INFO",
-        format="{time} | {level} | {name}:{line} | {message}",
+        sink,
+        format="{message}",
+        level="DEBUG" if settings.DEBUG else "INFO",
+        filter=sampler,
+        catch=True,
     )
 
     return logger
 
 
+@atexit.register
+def _flush_on_exit():
+    """Process exit pe queue mein pade records likh do"""
+    if writer is not None:
+        writer.stop()
+
+
+def log_stats() -> dict:
+    return {
+        "json": settings.LOG_JSON,
+        "queue_depth": writer.queue.qsize() if writer else 0,
+        "queue_size": settings.LOG_QUEUE_SIZE,
+        "dropped_queue_full": writer.dropped if writer else 0,
+        "dropped_errors": writer.dropped_errors if writer else 0,
+        "dropped_sampled": sampler.dropped,
+        "sample_rate": settings.LOG_SAMPLE_RATE,
+        "rate_limit_per_sec": settings.LOG_RATE_LIMIT,
+    }
+
+
 log = setup_logger()
@@ -0,0 +1,103 @@
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+from app.utils.logger import log
+
+
+class SamplingProfiler:
+    """
+    On-demand sampling profiler — ek background thread target thread (event loop)
+    ka stack har `interval` pe sample karta hai. Loop pe koi overhead nahi,
+    redeploy ke bina production mein hot spots dikh jaate hain.
+    """
+
+    def __init__(self):
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._stacks: Counter = Counter()
+        self._samples = 0
+        # Sampler thread naye stacks daalta hai jab report() unhe padh raha ho
+        self._lock = threading.Lock()
+        self._started_at: Optional[float] = None
+        self._stopped_at: Optional[float] = None
+        self._interval = 0.005
+        self._target_ident: Optional[int] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval: float = 0.005, duration: Optional[float] = None,
+              target_ident: Optional[int] = None) -> bool:
+        """Profiling shuru karo — already chal raha ho toh False"""
+        if self.running:
+            return False
+        with self._lock:
+            self._stacks.clear()
+            self._samples = 0
+        self._interval = interval
+        self._target_ident = target_ident or threading.main_thread().ident
+        self._started_at = time.time()
+        self._stopped_at = None
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(duration,), name="sampling-profiler", daemon=True
+        )
+        self._thread.start()
+        log.info(f"🔬 Profiler started (interval={interval * 1000:.1f}ms, duration={duration or '∞'}s)")
+        return True
+
+    def stop(self) -> bool:
+        if not self.running:
+            return False
+        self._stop.set()
+        self._thread.join(timeout=2)
+        log.info(f"🔬 Profiler stopped ({self._samples} samples)")
+        return True
+
+    def _run(self, duration: Optional[float]):
+        deadline = time.monotonic() + duration if duration else None
+        while not self._stop.wait(self._interval):
+            if deadline and time.monotonic() >= deadline:
+                break
+            frame = sys._current_frames().get(self._target_ident)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            key = ";".join(reversed(stack))
+            with self._lock:
+                self._stacks[key] += 1
+                self._samples += 1
+        self._stopped_at = time.time()
+
+    def report(self, top: int = 30) -> dict:
+        """Top collapsed stacks + self-time wale functions"""
+        with self._lock:
+            stacks = Counter(self._stacks)
+            samples = self._samples
+        leaf = Counter()
+        for stack, count in stacks.items():
+            leaf[stack.rsplit(";", 1)[-1]] += count
+        total = max(samples, 1)
+        return {
+            "running": self.running,
+            "samples": samples,
+            "interval_ms": round(self._interval * 1000, 2),
+            "started_at": self._started_at,
+            "stopped_at": self._stopped_at,
+            "top_functions": [
+                {"frame": f, "samples": c, "percent": round(c / total * 100, 2)}
+                for f, c in leaf.most_common(top)
+            ],
+            # flamegraph.pl / speedscope "collapsed" format
+            "collapsed": [f"{s} {c}" for s, c in stacks.most_common(top)],
+        }
+
+
+profiler = SamplingProfiler()
@@ -0,0 +1,190 @@
+import random
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Optional, List
+from fastapi import Request
+from app.core.config import settings
+
+
+@dataclass
+class Span:
+    name: str
+    start: float
+    duration: float
+    meta: dict = field(default_factory=dict)
+
+
+@dataclass
+class Trace:
+    """Ek request ki saari spans — lightweight, sirf perf_counter timings"""
+    method: str = ""
+    path: str = ""
+    trace_id: str = field(default_factory=lambda: uuid.uuid4().hex[:16])
+    started_at: float = field(default_factory=time.time)
+    t0: float = field(default_factory=time.perf_counter)
+    duration: float = 0.0
+    status_code: int = 0
+    spans: List[Span] = field(default_factory=list)
+
+    def add(self, name: str, start: float, duration: float, **meta):
+        self.spans.append(Span(name=name, start=start - self.t0, duration=duration, meta=meta))
+
+    def finish(self, status_code: int):
+        self.duration = time.perf_counter() - self.t0
+        self.status_code = status_code
+
+    def summary(self) -> dict:
+        """Span name → total ms (retries ke spans add ho jaate hain)"""
+        totals: dict = {}
+        for s in self.spans:
+            totals[s.name] = totals.get(s.name, 0.0) + s.duration
+        return {name: round(d * 1000, 2) for name, d in totals.items()}
+
+    def server_timing(self) -> str:
+        parts = [f"{name};dur={ms}" for name, ms in self.summary().items()]
+        parts.append(f"total;dur={round(self.duration * 1000, 2)}")
+        return ", ".join(parts)
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "method": self.method,
+            "path": self.path,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 2),
+            "status_code": self.status_code,
+            "summary_ms": self.summary(),
+            "spans": [
+                {
+                    "name": s.name,
+                    "offset_ms": round(s.start * 1000, 2),
+                    "duration_ms": round(s.duration * 1000, 2),
+                    **({"meta": s.meta} if s.meta else {}),
+                }
+                for s in self.spans
+            ],
+        }
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name: str, **meta):
+    """
+    Code block ko time karo — active trace na ho toh no-op.
+    Yield hua meta dict mutable hai; exception pe `error` khud set hota hai.
+
+        with span("shorturlinfo") as meta:
+            ...
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield meta
+        return
+    start = time.perf_counter()
+    try:
+        yield meta
+    except BaseException as e:
+        meta["error"] = type(e).__name__
+        raise
+    finally:
+        trace.add(name, start, time.perf_counter() - start, **meta)
+
+
+# httpcore trace events → Server-Timing names
+_HTTPCORE_SPANS = {
+    "connection.connect_tcp": "connect",
+    "connection.start_tls": "tls",
+    "http11.receive_response_headers": "ttfb",
+}
+
+
+def httpcore_trace():
+    """
+    httpx `extensions={"trace": ...}` hook banao — connect/TLS/TTFB alag se time karo,
+    jo warna pehli API call ke andar chhup jaata hai. Har request ka apna hook.
+    """
+    trace = _current_trace.get()
+    pending: dict = {}
+
+    async def hook(event_name: str, info: dict):
+        if trace is None:
+            return
+        name, _, phase = event_name.rpartition(".")
+        label = _HTTPCORE_SPANS.get(name)
+        if label is None:
+            return
+        if phase == "started":
+            pending[name] = time.perf_counter()
+        elif phase in ("complete", "failed") and name in pending:
+            start = pending.pop(name)
+            meta = {"failed": True} if phase == "failed" else {}
+            trace.add(label, start, time.perf_counter() - start, **meta)
+
+    return hook
+
+
+class TraceBuffer:
+    """Slow requests ke sampled traces ka bounded ring buffer"""
+
+    def __init__(self, size: int):
+        self._traces: deque = deque(maxlen=size)
+        self._recorded = 0
+        self._seen = 0
+
+    def maybe_record(self, trace: Trace):
+        self._seen += 1
+        if trace.duration * 1000 < settings.TRACE_SLOW_MS:
+            return
+        if random.random() >= settings.TRACE_SAMPLE_RATE:
+            return
+        self._traces.append(trace)
+        self._recorded += 1
+
+    def list(self, limit: int = 50) -> List[dict]:
+        """Naye traces pehle"""
+        return [t.to_dict() for t in list(self._traces)[::-1][:limit]]
+
+    def clear(self):
+        self._traces.clear()
+
+    def stats(self) -> dict:
+        return {
+            "buffered": len(self._traces),
+            "capacity": self._traces.maxlen,
+            "recorded_total": self._recorded,
+            "requests_seen": self._seen,
+            "slow_threshold_ms": settings.TRACE_SLOW_MS,
+            "sample_rate": settings.TRACE_SAMPLE_RATE,
+        }
+
+
+trace_buffer = TraceBuffer(settings.TRACE_BUFFER_SIZE)
+
+
+async def tracing_middleware(request: Request, call_next):
+    """Har request pe trace shuru karo, response pe Server-Timing header lagao"""
+    if not settings.TRACING_ENABLED:
+        return await call_next(request)
+
+    trace = Trace(method=request.method, path=request.url.path)
+    token = _current_trace.set(trace)
+    try:
+        response = await call_next(request)
+    finally:
+        _current_trace.reset(token)
+
+    trace.finish(response.status_code)
+    response.headers["Server-Timing"] = trace.server_timing()
+    response.headers["X-Trace-Id"] = trace.trace_id
+    trace_buffer.maybe_record(trace)
+    return response
@@ -0,0 +1,109 @@
+"""
+Logging benchmark — ek "request" (TeraboxFetcher jitni log lines) pe event loop
+thread kitna time log calls mein lagata hai: purana sync loguru setup vs naya
+queue-backed pipeline.
+
+    python -m benchmarks.bench_logging --requests 5000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from loguru import logger
+
+from app.core.config import settings
+from app.utils import logger as log_module
+
+
+def _legacy_setup(console, file_path: str):
+    """Original app/utils/logger.py config — colorized stdout + inline rotating file"""
+    logger.remove()
+    logger.configure(patcher=None)
+    logger.add(
+        console,
+        format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | "
+               "<level>{level: <8}</level> | "
+               "<cyan>{name}</cyan>:<cyan>{line}</cyan> - "
+               "<level>{message}</level>",
+        level="INFO",
+        colorize=True,
+    )
+    logger.add(
+        file_path,
+        rotation="10 MB",
+        retention="7 days",
+        compression="zip",
+        level="INFO",
+        format="{time} | {level} | {name}:{line} | {message}",
+    )
+
+
+def _one_request(n: int):
+    """Ek successful get_direct_link jitni log calls"""
+    proxy = f"http://10.0.{n % 256}.{n % 199}:8080"
+    logger.info(f"🔄 Attempt 1/{settings.TERABOX_MAX_RETRIES} | Proxy: {proxy}")
+    logger.debug("shorturlinfo response errno: 0")
+    logger.debug(f"File: video_{n}.mp4 | Size: 812.5 MB | fs_id: {n}")
+    logger.info(f"✅ Link generated in 1.23s via {proxy}")
+    logger.debug(f"Cache SET for: https://terabox.com/s/{n} (TTL: 300s)")
+
+
+async def _drive(requests: int) -> float:
+    """Loop thread pe log calls ka total time"""
+    spent = 0.0
+    for i in range(requests):
+        t0 = time.perf_counter()
+        _one_request(i)
+        spent += time.perf_counter() - t0
+        if i % 50 == 0:
+            await asyncio.sleep(0)  # writer thread ko GIL milne do, jaise real load mein
+    return spent
+
+
+def run(requests: int, sample_rate: float, rate_limit: int) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, "w") as devnull:
+        _legacy_setup(devnull, os.path.join(tmp, "legacy.log"))
+        legacy = asyncio.run(_drive(requests))
+        logger.complete()
+
+        settings.LOG_SAMPLE_RATE = sample_rate
+        settings.LOG_RATE_LIMIT = rate_limit
+        log_module.sampler = log_module.LogSampler()
+        log_module.setup_logger(devnull, os.path.join(tmp, "queued.log"))
+        queued = asyncio.run(_drive(requests))
+        drain_start = time.perf_counter()
+        log_module.writer.stop(timeout=30)
+        drain = time.perf_counter() - drain_start
+
+        results = {
+            "requests": requests,
+            "legacy_us_per_request": round(legacy / requests * 1e6, 2),
+            "queued_us_per_request": round(queued / requests * 1e6, 2),
+            "saved_us_per_request": round((legacy - queued) / requests * 1e6, 2),
+            "speedup": round(legacy / max(queued, 1e-9), 2),
+            "writer_drain_ms": round(drain * 1000, 2),
+            "sampled_out": log_module.sampler.dropped,
+            "dropped_queue_full": log_module.writer.dropped,
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--sample-rate", type=float, default=1.0, help="LOG_SAMPLE_RATE for the queued run")
+    parser.add_argument("--rate-limit", type=int, default=0, help="LOG_RATE_LIMIT for the queued run (0 = off)")
+    args = parser.parse_args()
+
+    res = run(args.requests, args.sample_rate, args.rate_limit)
+    width = max(len(k) for k in res)
+    for k, v in res.items():
+        print(f"{k.ljust(width)}  {v}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
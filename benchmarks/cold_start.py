@@ -0,0 +1,173 @@
+"""
+Cold start benchmark — har run ek naya Python process (serverless cold start jaisa):
+`import main` → lifespan startup → pehli cache-miss `/api/get-link` response.
+Mock Terabox + fake proxy fleet (benchmarks.loadtest) pe, offline.
+
+Modes:
+    default    — normal server startup (background refresh + writer thread + file log)
+    serverless — SERVERLESS=True, pool pehli miss pe on-demand sample se
+    snapshot   — SERVERLESS=True + PROXY_SNAPSHOT_PATH (pre-built, koi testing nahi)
+
+    python -m benchmarks.cold_start --runs 5 --proxies 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.loadtest.__main__ import Backend, ROOT
+from benchmarks.loadtest.fake_proxies import ProxyFleet
+from benchmarks.loadtest.mock_terabox import MockTerabox, MockConfig, Latency
+
+MODES = ("default", "serverless", "snapshot")
+SHARE_URL = "https://terabox.com/s/1coldstart"
+
+
+# ─── Child (measured process) ─────────────────────────────────────────────────
+
+def child():
+    t0 = time.perf_counter()
+    import httpx
+    from main import app
+    t1 = time.perf_counter()
+
+    async def run() -> dict:
+        async with app.router.lifespan_context(app):
+            t2 = time.perf_counter()
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+                res = await client.get("/api/get-link", params={"url": SHARE_URL})
+            t3 = time.perf_counter()
+            # Response ke baad bhi chal rahe tasks — serverless pe yeh freeze/kill hote hain
+            pending = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            import threading
+            body = res.json()
+            return {
+                "import_ms": (t1 - t0) * 1000,
+                "startup_ms": (t2 - t1) * 1000,
+                "first_response_ms": (t3 - t2) * 1000,
+                "total_ms": (t3 - t0) * 1000,
+                "status": res.status_code,
+                "via_proxy": bool(body.get("proxy_used")),
+                "pending_tasks": len(pending),
+                "threads": threading.active_count(),
+                "done_at": time.time(),
+            }
+
+    result = asyncio.run(run())
+    sys.stdout.write(json.dumps(result) + "\n")
+    sys.stdout.flush()
+    os._exit(0)  # atexit / writer thread flush benchmark mein nahi ginte
+
+
+# ─── Parent ───────────────────────────────────────────────────────────────────
+
+def mode_env(mode: str, mock: MockTerabox, snapshot: str, log_dir: str) -> dict:
+    env = {
+        **os.environ,
+        "TERABOX_API_BASE": mock.base_url,
+        "TERABOX_API_MIRRORS": "[]",
+        "PROXY_TEST_URL": f"{mock.base_url}/ip",
+        "PROXY_SOURCE_URLS": json.dumps([f"{mock.base_url}/proxies.txt"]),
+        "LOG_RATE_LIMIT": "0",
+    }
+    if mode == "default":
+        env["LOG_FILE"] = os.path.join(log_dir, "app.log")
+    else:
+        env["SERVERLESS"] = "true"
+        env["LOG_FILE"] = ""
+    if mode == "snapshot":
+        env["PROXY_SNAPSHOT_PATH"] = snapshot
+    return env
+
+
+def run_once(env: dict) -> dict:
+    start = time.time()
+    proc = subprocess.run(
+        [sys.executable, "-m", "benchmarks.cold_start", "--child"],
+        cwd=ROOT, env=env, capture_output=True, text=True, timeout=120,
+    )
+    lines = [l for l in proc.stdout.splitlines() if l.startswith('{"import_ms"')]
+    if not lines:
+        raise RuntimeError(f"Child failed:\n{proc.stderr[-2000:]}")
+    result = json.loads(lines[-1])
+    # Interpreter startup bhi — platform ko yahi dikhta hai
+    result["spawn_to_response_ms"] = (result.pop("done_at") - start) * 1000
+    return result
+
+
+def write_snapshot(path: str, addresses: list):
+    now = time.time()
+    entries = [
+        {"url": f"http://{a}", "failures": 0, "last_used": now, "last_checked": now,
+         "response_time": 0.05, "is_alive": True, "score": 1.0}
+        for a in addresses
+    ]
+    with open(path, "w") as f:
+        json.dump({"refreshed": now, "entries": entries}, f)
+
+
+def summarize(runs: list) -> dict:
+    out = {}
+    for key in ("import_ms", "startup_ms", "first_response_ms", "total_ms", "spawn_to_response_ms"):
+        values = sorted(r[key] for r in runs)
+        out[key] = {"median": round(statistics.median(values), 1), "max": round(values[-1], 1)}
+    out["ok"] = sum(1 for r in runs if r["status"] == 200)
+    out["via_proxy"] = sum(1 for r in runs if r["via_proxy"])
+    out["pending_tasks"] = max(r["pending_tasks"] for r in runs)
+    out["threads"] = max(r["threads"] for r in runs)
+    return out
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--runs", type=int, default=5)
+    p.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    p.add_argument("--proxies", type=int, default=200, help="Fake fleet size (= /proxies.txt)")
+    p.add_argument("--fast-ms", type=float, default=30.0)
+    p.add_argument("--slow-ms", type=float, default=1500.0)
+    p.add_argument("--slow-fraction", type=float, default=0.5)
+    p.add_argument("--json-out", default=None)
+    p.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = p.parse_args()
+    if args.child:
+        return child()
+
+    fleet = ProxyFleet(
+        args.proxies, fast=Latency(args.fast_ms, 0.3), slow=Latency(args.slow_ms, 0.3),
+        slow_fraction=args.slow_fraction, fail_rate=0.0, death_rate=0.0, seed=0,
+    )
+    mock = MockTerabox(
+        MockConfig(Latency(120, 0.3), Latency(150, 0.3), http_error_rate=0.0, errno_rate=0.0),
+        proxy_list=fleet.addresses,
+    )
+    backend = Backend(mock, fleet)
+    backend.start()
+
+    report = {"config": vars(args), "modes": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot = os.path.join(tmp, "proxies.json")
+        write_snapshot(snapshot, fleet.addresses()[:20])
+        try:
+            for mode in args.modes:
+                env = mode_env(mode, mock, snapshot, tmp)
+                runs = [run_once(env) for _ in range(args.runs)]
+                report["modes"][mode] = summarize(runs)
+                print(f"{mode:<11} {json.dumps(report['modes'][mode])}", file=sys.stderr)
+        finally:
+            backend.stop()
+
+    text = json.dumps(report, indent=2)
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
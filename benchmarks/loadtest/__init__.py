@@ -0,0 +1,5 @@
+"""
+Offline load-test harness — local Terabox stand-in + fake proxy fleet + load generator.
+
+    python -m benchmarks.loadtest --duration 30 --concurrency 50 --proxies 40
+"""
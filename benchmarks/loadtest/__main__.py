@@ -0,0 +1,234 @@
+"""
+Load-test runner — mocks + proxy fleet background thread ke event loop pe, API
+alag uvicorn process mein (real deployment jaisa), load generator main loop pe.
+
+    python -m benchmarks.loadtest --duration 30 --concurrency 50 --proxies 40 --json-out run.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from typing import Optional
+
+import httpx
+
+from benchmarks.loadtest.fake_proxies import ProxyFleet
+from benchmarks.loadtest.fake_tor import FakeTor, tor_env
+from benchmarks.loadtest.loadgen import run_load
+from benchmarks.loadtest.mock_terabox import MockTerabox, MockConfig, Latency
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class Backend:
+    """Mock Terabox + fleet apne thread/loop pe, taaki load generator se CPU na ladein"""
+
+    def __init__(self, mock: MockTerabox, fleet: ProxyFleet, tor: Optional[FakeTor] = None):
+        self.mock = mock
+        self.fleet = fleet
+        self.tor = tor
+        self.loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="loadtest-backend", daemon=True)
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self.fleet.start())
+        self.loop.run_until_complete(self.mock.start())
+        if self.tor:
+            self.loop.run_until_complete(self.tor.start())
+        self._ready.set()
+        self.loop.run_forever()
+
+    def start(self):
+        self._thread.start()
+        self._ready.wait(10)
+
+    def call(self, fn):
+        """Backend loop pe sync function chalao (stats snapshot ke liye)"""
+        async def _call():
+            return fn()
+        return asyncio.run_coroutine_threadsafe(_call(), self.loop).result(5)
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self.fleet.stop(), self.loop).result(5)
+        asyncio.run_coroutine_threadsafe(self.mock.stop(), self.loop).result(5)
+        if self.tor:
+            asyncio.run_coroutine_threadsafe(self.tor.stop(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_api(port: int, mock: MockTerabox, args, tor: Optional[FakeTor] = None) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "TERABOX_API_BASE": mock.base_url,
+        # Same mock doosre naam se — mirror ranking/race code path offline chalta hai
+        "TERABOX_API_MIRRORS": json.dumps([mock.base_url.replace("127.0.0.1", "localhost")]),
+        "PROXY_TEST_URL": f"{mock.base_url}/ip",
+        "PROXY_SOURCE_URLS": json.dumps([f"{mock.base_url}/proxies.txt"]),
+        "TERABOX_TIMEOUT": str(args.upstream_timeout),
+        "CACHE_TTL": str(args.cache_ttl),
+        "RATE_LIMIT_REQUESTS": "100000000",
+        "LOG_FILE": "",
+        "LOG_RATE_LIMIT": "20",
+        **(tor_env(tor) if tor else {}),
+    }
+    if tor:
+        env["TOR_CIRCUITS_PER_PORT"] = str(args.tor_circuits_per_port)
+    cmd = [
+        sys.executable, "-m", "uvicorn", "main:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(args.workers), "--log-level", "warning",
+    ]
+    out = None if args.verbose else subprocess.DEVNULL
+    return subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=out, stderr=out)
+
+
+async def wait_ready(base_url: str, timeout: float = 60.0) -> float:
+    """API up + proxy pool bhar gaya — kitna time laga"""
+    start = time.monotonic()
+    async with httpx.AsyncClient(base_url=base_url, timeout=2) as client:
+        while time.monotonic() - start < timeout:
+            try:
+                res = await client.get("/health")
+                if res.status_code == 200 and res.json().get("proxy_pool_size", 0) > 0:
+                    return time.monotonic() - start
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("API ready nahi hua — --verbose se logs dekho")
+
+
+async def fetch_json(base_url: str, path: str) -> dict:
+    async with httpx.AsyncClient(base_url=base_url, timeout=5) as client:
+        try:
+            return (await client.get(path)).json()
+        except Exception as e:
+            return {"error": str(e)}
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    g = p.add_argument_group("load")
+    g.add_argument("--duration", type=float, default=20.0)
+    g.add_argument("--concurrency", type=int, default=32)
+    g.add_argument("--unique-links", type=int, default=2000)
+    g.add_argument("--batch-ratio", type=float, default=0.1)
+    g.add_argument("--batch-size", type=int, default=5)
+    g.add_argument("--seed", type=int, default=0)
+    g = p.add_argument_group("api")
+    g.add_argument("--workers", type=int, default=1)
+    g.add_argument("--upstream-timeout", type=int, default=5)
+    g.add_argument("--cache-ttl", type=int, default=300)
+    g.add_argument("--api-url", default=None, help="Already-running API use karo (mock env khud set karna hoga)")
+    g = p.add_argument_group("mock terabox")
+    g.add_argument("--info-ms", type=float, default=120.0, help="shorturlinfo median latency")
+    g.add_argument("--dlink-ms", type=float, default=150.0, help="dlink median latency")
+    g.add_argument("--sigma", type=float, default=0.5, help="log-normal latency spread")
+    g.add_argument("--http-error-rate", type=float, default=0.02)
+    g.add_argument("--errno-rate", type=float, default=0.01)
+    g.add_argument("--hang-rate", type=float, default=0.0)
+    g.add_argument("--dlink-ttl", type=float, default=0.0, help="Signed dlink expiry (0 = never)")
+    g.add_argument("--file-drop-rate", type=float, default=0.0, help="/file body mid-transfer drops")
+    g = p.add_argument_group("proxy fleet")
+    g.add_argument("--proxies", type=int, default=40)
+    g.add_argument("--fast-ms", type=float, default=20.0)
+    g.add_argument("--slow-ms", type=float, default=800.0)
+    g.add_argument("--slow-fraction", type=float, default=0.2)
+    g.add_argument("--proxy-fail-rate", type=float, default=0.02)
+    g.add_argument("--proxy-death-rate", type=float, default=0.001)
+    g = p.add_argument_group("tor stand-in")
+    g.add_argument("--tor-ports", type=int, default=0, help="USE_TOR ko N fake SOCKS ports pe chalao")
+    g.add_argument("--tor-circuits-per-port", type=int, default=4)
+    g.add_argument("--tor-bad-circuit-rate", type=float, default=0.1)
+    p.add_argument("--json-out", default=None, help="Report JSON file mein likho")
+    p.add_argument("--verbose", action="store_true", help="API process ka output dikhao")
+    return p.parse_args()
+
+
+async def main_async(args) -> dict:
+    mock_cfg = MockConfig(
+        info_latency=Latency(args.info_ms, args.sigma),
+        dlink_latency=Latency(args.dlink_ms, args.sigma),
+        http_error_rate=args.http_error_rate,
+        errno_rate=args.errno_rate,
+        hang_rate=args.hang_rate,
+        dlink_ttl=args.dlink_ttl,
+        file_drop_rate=args.file_drop_rate,
+    )
+    fleet = ProxyFleet(
+        args.proxies,
+        fast=Latency(args.fast_ms, args.sigma),
+        slow=Latency(args.slow_ms, args.sigma),
+        slow_fraction=args.slow_fraction,
+        fail_rate=args.proxy_fail_rate,
+        death_rate=args.proxy_death_rate,
+        seed=args.seed,
+    )
+    mock = MockTerabox(mock_cfg, proxy_list=fleet.addresses)
+    tor = None
+    if args.tor_ports:
+        tor = FakeTor(args.tor_ports, Latency(args.fast_ms * 3, args.sigma), args.tor_bad_circuit_rate)
+    backend = Backend(mock, fleet, tor)
+    backend.start()
+
+    api = None
+    base_url = args.api_url
+    if not base_url:
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        api = start_api(port, mock, args, tor)
+    try:
+        ready_s = await wait_ready(base_url)
+        load = await run_load(
+            base_url, args.duration, args.concurrency,
+            unique_links=args.unique_links, batch_ratio=args.batch_ratio,
+            batch_size=args.batch_size, timeout=args.upstream_timeout * 10, seed=args.seed,
+        )
+        proxy_stats = await fetch_json(base_url, "/proxy/stats")
+        cache_stats = await fetch_json(base_url, "/api/cache/stats")
+    finally:
+        if api:
+            api.terminate()
+            api.wait(10)
+        fleet_stats = backend.call(fleet.stats)
+        mock_stats = backend.call(mock.stats)
+        tor_stats = backend.call(tor.stats) if tor else None
+        backend.stop()
+
+    fleet_stats["per_proxy"] = fleet_stats["per_proxy"][:10]
+    return {
+        "config": vars(args),
+        "ready_seconds": round(ready_s, 2),
+        "load": load.report(),
+        "proxy_fleet": fleet_stats,
+        "api_proxy_stats": proxy_stats,
+        "api_cache_stats": cache_stats,
+        "mock_terabox": mock_stats,
+        "fake_tor": tor_stats,
+    }
+
+
+def main():
+    args = parse_args()
+    report = asyncio.run(main_async(args))
+    text = json.dumps(report, indent=2, default=str)
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
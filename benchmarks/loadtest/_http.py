@@ -0,0 +1,92 @@
+"""Minimal HTTP/1.1 parsing for the local mocks — sirf utna jitna httpx bhejta hai."""
+import asyncio
+import json
+from dataclasses import dataclass, field
+from typing import Optional
+from urllib.parse import urlsplit, parse_qs
+
+REASONS = {
+    200: "OK", 206: "Partial Content", 404: "Not Found", 416: "Range Not Satisfiable",
+    500: "Internal Server Error", 502: "Bad Gateway", 503: "Service Unavailable",
+}
+
+
+@dataclass
+class Request:
+    method: str
+    target: str
+    version: str
+    headers: dict = field(default_factory=dict)
+    body: bytes = b""
+    raw_head: bytes = b""
+
+    @property
+    def path(self) -> str:
+        return urlsplit(self.target).path
+
+    @property
+    def query(self) -> dict:
+        return {k: v[0] for k, v in parse_qs(urlsplit(self.target).query).items()}
+
+    @property
+    def keep_alive(self) -> bool:
+        return self.headers.get("connection", "").lower() != "close"
+
+
+async def read_request(reader: asyncio.StreamReader) -> Optional[Request]:
+    try:
+        line = await reader.readline()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        return None
+    if not line:
+        return None
+    raw = [line]
+    method, target, version = line.decode("latin-1").rstrip("\r\n").split(" ", 2)
+    headers = {}
+    while True:
+        h = await reader.readline()
+        raw.append(h)
+        if h in (b"\r\n", b"\n", b""):
+            break
+        k, _, v = h.decode("latin-1").partition(":")
+        headers[k.strip().lower()] = v.strip()
+    body = b""
+    length = int(headers.get("content-length", 0) or 0)
+    if length:
+        body = await reader.readexactly(length)
+    return Request(method, target, version, headers, body, b"".join(raw))
+
+
+def response(status: int, body: bytes = b"", content_type: str = "application/json",
+             headers: Optional[dict] = None, keep_alive: bool = True) -> bytes:
+    lines = [
+        f"HTTP/1.1 {status} {REASONS.get(status, 'Unknown')}",
+        f"Content-Type: {content_type}",
+        f"Content-Length: {len(body)}",
+        f"Connection: {'keep-alive' if keep_alive else 'close'}",
+    ]
+    for k, v in (headers or {}).items():
+        lines.append(f"{k}: {v}")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+
+def json_response(status: int, data, keep_alive: bool = True) -> bytes:
+    return response(status, json.dumps(data).encode(), keep_alive=keep_alive)
+
+
+async def pipe(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """reader → writer jab tak EOF"""
+    try:
+        while True:
+            chunk = await reader.read(65536)
+            if not chunk:
+                break
+            writer.write(chunk)
+            await writer.drain()
+    except (ConnectionError, asyncio.CancelledError):
+        pass
+    finally:
+        try:
+            writer.close()
+        except Exception:
+            pass
@@ -0,0 +1,149 @@
+"""
+Local fake HTTP proxy fleet — har proxy ki apni slowness, per-request fail rate
+aur death rate. Plain `GET http://...` forwarding + `CONNECT` tunnelling dono.
+"""
+import asyncio
+import random
+from dataclasses import dataclass, field
+from typing import List, Optional
+from urllib.parse import urlsplit
+
+from benchmarks.loadtest._http import read_request, response, pipe
+from benchmarks.loadtest.mock_terabox import Latency
+
+
+@dataclass
+class ProxyProfile:
+    latency: Latency = field(default_factory=lambda: Latency(30, 0.4))
+    fail_rate: float = 0.02     # connection reset, per request
+    death_rate: float = 0.001   # per request — mar gaya toh port band
+
+
+class FakeProxy:
+    def __init__(self, profile: ProxyProfile):
+        self.profile = profile
+        self.port = 0
+        self.alive = True
+        self.requests = 0
+        self.failures = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def address(self) -> str:
+        return f"127.0.0.1:{self.port}"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+
+    def _die(self):
+        self.alive = False
+        if self._server:
+            self._server.close()  # naye connections refuse
+
+    async def _handle(self, reader, writer):
+        req = await read_request(reader)
+        if req is None or not self.alive:
+            writer.close()
+            return
+
+        self.requests += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            if random.random() < self.profile.death_rate:
+                self._die()
+            if random.random() < self.profile.fail_rate or not self.alive:
+                self.failures += 1
+                writer.close()
+                return
+
+            await asyncio.sleep(self.profile.latency.sample())
+
+            if req.method == "CONNECT":
+                await self._tunnel(req, reader, writer)
+            else:
+                await self._forward(req, writer)
+        except (ConnectionError, OSError):
+            self.failures += 1
+            writer.close()
+        finally:
+            self.in_flight -= 1
+
+    async def _tunnel(self, req, reader, writer):
+        host, _, port = req.target.partition(":")
+        up_reader, up_writer = await asyncio.open_connection(host, int(port or 443))
+        writer.write(b"HTTP/1.1 200 Connection established\r\n\r\n")
+        await writer.drain()
+        await asyncio.gather(pipe(reader, up_writer), pipe(up_reader, writer))
+
+    async def _forward(self, req, writer):
+        url = urlsplit(req.target)
+        if not url.hostname:
+            writer.write(response(502, b"absolute URI chahiye", "text/plain", keep_alive=False))
+            await writer.drain()
+            writer.close()
+            return
+        up_reader, up_writer = await asyncio.open_connection(url.hostname, url.port or 80)
+        path = url.path + (f"?{url.query}" if url.query else "")
+        head = [f"{req.method} {path} {req.version}"]
+        for k, v in req.headers.items():
+            if k in ("connection", "proxy-connection", "keep-alive"):
+                continue
+            head.append(f"{k}: {v}")
+        head.append("Connection: close")
+        up_writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + req.body)
+        await up_writer.drain()
+        # Upstream "Connection: close" bhejta hai — response ke baad dono band
+        await pipe(up_reader, writer)
+        up_writer.close()
+
+    def stats(self) -> dict:
+        return {
+            "address": self.address,
+            "alive": self.alive,
+            "median_latency_ms": self.profile.latency.median_ms,
+            "requests": self.requests,
+            "failures": self.failures,
+            "peak_in_flight": self.peak_in_flight,
+        }
+
+
+class ProxyFleet:
+    def __init__(self, size: int, fast: Latency, slow: Latency, slow_fraction: float = 0.2,
+                 fail_rate: float = 0.02, death_rate: float = 0.001, seed: Optional[int] = None):
+        rng = random.Random(seed)
+        self.proxies: List[FakeProxy] = []
+        for _ in range(size):
+            latency = slow if rng.random() < slow_fraction else fast
+            self.proxies.append(FakeProxy(ProxyProfile(latency, fail_rate, death_rate)))
+
+    async def start(self):
+        await asyncio.gather(*(p.start() for p in self.proxies))
+
+    async def stop(self):
+        await asyncio.gather(*(p.stop() for p in self.proxies))
+
+    def addresses(self) -> List[str]:
+        return [p.address for p in self.proxies]
+
+    def stats(self) -> dict:
+        per_proxy = [p.stats() for p in self.proxies]
+        used = [p for p in per_proxy if p["requests"]]
+        total = sum(p["requests"] for p in per_proxy)
+        return {
+            "size": len(per_proxy),
+            "alive": sum(p["alive"] for p in per_proxy),
+            "used": len(used),
+            "requests": total,
+            "failures": sum(p["failures"] for p in per_proxy),
+            "max_share": round(max((p["requests"] for p in per_proxy), default=0) / max(total, 1), 4),
+            "peak_in_flight": max((p["peak_in_flight"] for p in per_proxy), default=0),
+            "per_proxy": sorted(per_proxy, key=lambda p: -p["requests"]),
+        }
@@ -0,0 +1,171 @@
+"""
+Local Tor stand-in — N SOCKS5 ports (no-auth + username/password, CONNECT) jahan har
+(port, username) ek alag "circuit" hai apni latency ke saath, aur ek chhota control
+port (PROTOCOLINFO / AUTHENTICATE / SIGNAL NEWNYM / GETINFO circuit-status / CLOSECIRCUIT).
+"""
+import asyncio
+import ipaddress
+import json
+import random
+import struct
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+from benchmarks.loadtest._http import pipe
+from benchmarks.loadtest.mock_terabox import Latency
+
+
+@dataclass
+class FakeCircuit:
+    cid: int
+    port: int
+    username: str
+    latency: float
+    streams: int = 0
+    active: int = 0
+    closed: bool = False
+
+
+class FakeTor:
+    def __init__(self, ports: int = 2, latency: Latency = None, bad_circuit_rate: float = 0.1):
+        self.n_ports = ports
+        self.latency = latency or Latency(60, 0.6)
+        self.bad_circuit_rate = bad_circuit_rate
+        self.socks_ports: List[int] = []
+        self.control_port = 0
+        self.circuits: Dict[Tuple[int, str], FakeCircuit] = {}
+        self.newnyms = 0
+        self._next_cid = 1
+        self._servers: list = []
+
+    async def start(self):
+        for _ in range(self.n_ports):
+            server = await asyncio.start_server(self._socks, "127.0.0.1", 0)
+            self._servers.append(server)
+            self.socks_ports.append(server.sockets[0].getsockname()[1])
+        control = await asyncio.start_server(self._control, "127.0.0.1", 0)
+        self._servers.append(control)
+        self.control_port = control.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        for server in self._servers:
+            server.close()
+
+    def _circuit(self, port: int, username: str) -> FakeCircuit:
+        key = (port, username)
+        circuit = self.circuits.get(key)
+        if circuit is None or circuit.closed:
+            # Kuch circuits slow exit nodes pe bante hain
+            slow = random.random() < self.bad_circuit_rate
+            circuit = FakeCircuit(self._next_cid, port, username,
+                                  self.latency.sample() * (20 if slow else 1))
+            self._next_cid += 1
+            self.circuits[key] = circuit
+        return circuit
+
+    # ── SOCKS5 ────────────────────────────────────────────────────────────────
+
+    async def _socks(self, reader, writer):
+        port = writer.get_extra_info("sockname")[1]
+        try:
+            ver, n = await reader.readexactly(2)
+            methods = await reader.readexactly(n)
+            username = ""
+            if 2 in methods:
+                writer.write(b"\x05\x02")
+                await writer.drain()
+                _, ulen = await reader.readexactly(2)
+                username = (await reader.readexactly(ulen)).decode()
+                (plen,) = await reader.readexactly(1)
+                await reader.readexactly(plen)
+                writer.write(b"\x01\x00")
+            else:
+                writer.write(b"\x05\x00")
+            await writer.drain()
+
+            _, cmd, _, atyp = await reader.readexactly(4)
+            if atyp == 1:
+                host = str(ipaddress.IPv4Address(await reader.readexactly(4)))
+            elif atyp == 3:
+                (hlen,) = await reader.readexactly(1)
+                host = (await reader.readexactly(hlen)).decode()
+            else:
+                host = str(ipaddress.IPv6Address(await reader.readexactly(16)))
+            (dport,) = struct.unpack("!H", await reader.readexactly(2))
+
+            circuit = self._circuit(port, username)
+            circuit.streams += 1
+            circuit.active += 1
+            try:
+                await asyncio.sleep(circuit.latency)
+                up_reader, up_writer = await asyncio.open_connection(host, dport)
+                writer.write(b"\x05\x00\x00\x01" + bytes(4) + b"\x00\x00")
+                await writer.drain()
+                await asyncio.gather(pipe(reader, up_writer), pipe(up_reader, writer))
+            finally:
+                circuit.active -= 1
+        except (asyncio.IncompleteReadError, ConnectionError, OSError):
+            writer.close()
+
+    # ── Control Port ──────────────────────────────────────────────────────────
+
+    async def _control(self, reader, writer):
+        try:
+            while True:
+                line = (await reader.readline()).decode().strip()
+                if not line:
+                    break
+                cmd, _, arg = line.partition(" ")
+                cmd = cmd.upper()
+                if cmd == "PROTOCOLINFO":
+                    writer.write(b"250-PROTOCOLINFO 1\r\n250-AUTH METHODS=NULL\r\n"
+                                 b"250-VERSION Tor=\"0.4.8-fake\"\r\n250 OK\r\n")
+                elif cmd == "AUTHENTICATE":
+                    writer.write(b"250 OK\r\n")
+                elif cmd == "SIGNAL" and arg.upper() == "NEWNYM":
+                    self.newnyms += 1
+                    for c in self.circuits.values():
+                        c.closed = True
+                    writer.write(b"250 OK\r\n")
+                elif cmd == "GETINFO" and arg == "circuit-status":
+                    rows = [
+                        f'{c.cid} BUILT $FAKE~exit PURPOSE=GENERAL SOCKS_USERNAME="{c.username}"'
+                        for c in self.circuits.values() if not c.closed
+                    ]
+                    body = "".join(f"{r}\r\n" for r in rows)
+                    writer.write(f"250+circuit-status=\r\n{body}.\r\n250 OK\r\n".encode())
+                elif cmd == "CLOSECIRCUIT":
+                    cid = int(arg.split(" ", 1)[0])
+                    for c in self.circuits.values():
+                        if c.cid == cid and c.active == 0:
+                            c.closed = True
+                    writer.write(b"250 OK\r\n")
+                else:
+                    writer.write(b"510 Unrecognized command\r\n")
+                await writer.drain()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            writer.close()
+
+    def stats(self) -> dict:
+        circuits = list(self.circuits.values())
+        return {
+            "socks_ports": self.socks_ports,
+            "control_port": self.control_port,
+            "circuits_built": self._next_cid - 1,
+            "circuits_open": sum(1 for c in circuits if not c.closed),
+            "streams": sum(c.streams for c in circuits),
+            "newnyms": self.newnyms,
+            "max_streams_one_circuit": max((c.streams for c in circuits), default=0),
+        }
+
+
+def tor_env(tor: FakeTor) -> dict:
+    """API process ke liye env — USE_TOR ko stand-in pe point karo"""
+    return {
+        "USE_TOR": "True",
+        "TOR_SOCKS_PORTS": json.dumps(tor.socks_ports),
+        "TOR_CONTROL_PORT": str(tor.control_port),
+    }
+
@@ -0,0 +1,94 @@
+"""Closed-loop load generator for `/api/get-link` and `/api/batch`."""
+import asyncio
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import List
+
+import httpx
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[k]
+
+
+@dataclass
+class LoadResult:
+    latencies: List[float] = field(default_factory=list)
+    statuses: Counter = field(default_factory=Counter)
+    links_ok: int = 0
+    links_failed: int = 0
+    cached: int = 0
+    elapsed: float = 0.0
+
+    def report(self) -> dict:
+        n = len(self.latencies)
+        ms = [x * 1000 for x in self.latencies]
+        return {
+            "requests": n,
+            "throughput_rps": round(n / max(self.elapsed, 1e-9), 2),
+            "links_per_sec": round(self.links_ok / max(self.elapsed, 1e-9), 2),
+            "links_ok": self.links_ok,
+            "links_failed": self.links_failed,
+            "cache_hits": self.cached,
+            "status_codes": {str(k): v for k, v in sorted(self.statuses.items(), key=lambda kv: str(kv[0]))},
+            "latency_ms": {
+                "mean": round(sum(ms) / max(n, 1), 2),
+                "p50": round(percentile(ms, 50), 2),
+                "p90": round(percentile(ms, 90), 2),
+                "p99": round(percentile(ms, 99), 2),
+                "max": round(max(ms, default=0.0), 2),
+            },
+        }
+
+
+async def run_load(base_url: str, duration: float, concurrency: int, unique_links: int = 1000,
+                   batch_ratio: float = 0.1, batch_size: int = 5, timeout: float = 60.0,
+                   seed: int = 0) -> LoadResult:
+    """
+    `concurrency` workers `duration` seconds tak requests bhejte hain. Links
+    `unique_links` ke universe se random — chhota universe = zyada cache hits.
+    """
+    rng = random.Random(seed)
+    result = LoadResult()
+    deadline = time.monotonic() + duration
+
+    def link() -> str:
+        return f"https://terabox.com/s/1load{rng.randrange(unique_links)}"
+
+    async def worker(client: httpx.AsyncClient):
+        while time.monotonic() < deadline:
+            t0 = time.perf_counter()
+            try:
+                if rng.random() < batch_ratio:
+                    res = await client.post("/api/batch", json={"urls": [link() for _ in range(batch_size)]})
+                    if res.status_code == 200:
+                        body = res.json()
+                        result.links_ok += body["success"]
+                        result.links_failed += body["failed"]
+                    else:
+                        result.links_failed += batch_size
+                else:
+                    res = await client.get("/api/get-link", params={"url": link()})
+                    if res.status_code == 200:
+                        result.links_ok += 1
+                        result.cached += bool(res.json().get("cached"))
+                    else:
+                        result.links_failed += 1
+                result.statuses[res.status_code] += 1
+            except httpx.HTTPError as e:
+                result.statuses[type(e).__name__] += 1
+                result.links_failed += 1
+            result.latencies.append(time.perf_counter() - t0)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        result.elapsed = time.perf_counter() - start
+    return result
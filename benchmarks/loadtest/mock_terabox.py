@@ -0,0 +1,193 @@
+"""
+Local Terabox stand-in — `/api/shorturlinfo`, `/api/dlink`, `/file/<fs_id>` (Range ke saath),
+proxy test ke liye `/ip` aur PROXY_SOURCES ke liye `/proxies.txt`.
+"""
+import asyncio
+import math
+import random
+import time
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from benchmarks.loadtest._http import read_request, response, json_response
+
+
+@dataclass
+class Latency:
+    """Log-normal latency — median + spread, real upstream jaisi lambi tail"""
+    median_ms: float = 100.0
+    sigma: float = 0.5
+
+    def sample(self) -> float:
+        if self.median_ms <= 0:
+            return 0.0
+        return random.lognormvariate(math.log(self.median_ms / 1000), self.sigma)
+
+
+@dataclass
+class MockConfig:
+    info_latency: Latency = None
+    dlink_latency: Latency = None
+    http_error_rate: float = 0.02   # HTTP 500
+    errno_rate: float = 0.01        # errno != 0 JSON
+    hang_rate: float = 0.0          # response hi nahi — client timeout tak
+    hang_seconds: float = 60.0
+    file_size: int = 4 * 1024 * 1024
+    dlink_ttl: float = 0.0          # >0 = signed dlink itne seconds baad 403
+    file_drop_rate: float = 0.0     # /file body beech mein connection drop
+
+    def __post_init__(self):
+        self.info_latency = self.info_latency or Latency(120, 0.5)
+        self.dlink_latency = self.dlink_latency or Latency(150, 0.5)
+
+
+def file_bytes(fs_id: int, start: int, end: int) -> bytes:
+    """Deterministic file content — offset se derive, verify karna aasaan"""
+    block = 4096
+    out = bytearray()
+    first = start // block
+    for b in range(first, end // block + 1):
+        seed = zlib.crc32(f"{fs_id}:{b}".encode())
+        out += random.Random(seed).randbytes(block)
+    offset = start - first * block
+    return bytes(out[offset:offset + (end - start + 1)])
+
+
+class MockTerabox:
+    def __init__(self, config: MockConfig, proxy_list: Optional[Callable[[], List[str]]] = None):
+        self.config = config
+        self._proxy_list = proxy_list or (lambda: [])
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.port = 0
+        self.calls: Counter = Counter()
+        self.injected: Counter = Counter()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    async def start(self, port: int = 0):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                req = await read_request(reader)
+                if req is None:
+                    break
+                data = await self._route(req)
+                if data is None:
+                    break
+                close = not req.keep_alive
+                if isinstance(data, tuple):
+                    data, close = data
+                writer.write(data)
+                await writer.drain()
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _inject(self, name: str, latency: Latency, keep_alive: bool) -> Optional[bytes]:
+        """Latency + error distribution apply karo; error ho toh response bytes"""
+        cfg = self.config
+        await asyncio.sleep(latency.sample())
+        roll = random.random()
+        if roll < cfg.hang_rate:
+            self.injected[f"{name}:hang"] += 1
+            await asyncio.sleep(cfg.hang_seconds)
+            return None
+        roll -= cfg.hang_rate
+        if roll < cfg.http_error_rate:
+            self.injected[f"{name}:http500"] += 1
+            return json_response(500, {"error": "injected"}, keep_alive)
+        roll -= cfg.http_error_rate
+        if roll < cfg.errno_rate:
+            self.injected[f"{name}:errno"] += 1
+            return json_response(200, {"errno": 2}, keep_alive)
+        return b""
+
+    async def _route(self, req) -> Optional[bytes]:
+        path = req.path
+        q = req.query
+        ka = req.keep_alive
+        self.calls[path if not path.startswith("/file/") else "/file"] += 1
+
+        if path == "/ip":
+            return json_response(200, {"origin": "127.0.0.1"}, ka)
+
+        if path == "/proxies.txt":
+            body = "\n".join(self._proxy_list()).encode()
+            return response(200, body, "text/plain", keep_alive=ka)
+
+        if path == "/api/shorturlinfo":
+            err = await self._inject("shorturlinfo", self.config.info_latency, ka)
+            if err != b"":
+                return err
+            surl = q.get("shorturl", "x")
+            fs_id = zlib.crc32(surl.encode())
+            return json_response(200, {
+                "errno": 0,
+                "shareid": fs_id % 10_000_000,
+                "uk": 4400000000 + fs_id % 1000,
+                "sign": f"sig{fs_id:x}",
+                "timestamp": 1700000000,
+                "list": [{
+                    "fs_id": fs_id,
+                    "server_filename": f"{surl}.mp4",
+                    "size": self.config.file_size,
+                    "thumbs": {"url3": f"{self.base_url}/thumb/{fs_id}.jpg"},
+                }],
+            }, ka)
+
+        if path == "/api/dlink":
+            err = await self._inject("dlink", self.config.dlink_latency, ka)
+            if err != b"":
+                return err
+            fs_id = q.get("fs_id", "0")
+            expires = int(time.time() + self.config.dlink_ttl) if self.config.dlink_ttl else 0
+            return json_response(200, {
+                "errno": 0,
+                "dlink": f"{self.base_url}/file/{fs_id}?sign={q.get('sign', '')}&exp={expires}",
+            }, ka)
+
+        if path.startswith("/file/"):
+            expires = int(q.get("exp", 0) or 0)
+            if expires and time.time() > expires:
+                self.injected["file:expired"] += 1
+                return json_response(403, {"error": "link expired"}, ka)
+            data = self._serve_file(int(path.rsplit("/", 1)[-1] or 0), req.headers.get("range"), ka)
+            if random.random() < self.config.file_drop_rate:
+                self.injected["file:drop"] += 1
+                return data[:random.randrange(len(data) // 4, len(data))], True
+            return data
+
+        return json_response(404, {"error": "not found"}, ka)
+
+    def _serve_file(self, fs_id: int, range_header: Optional[str], ka: bool) -> bytes:
+        size = self.config.file_size
+        headers = {"Accept-Ranges": "bytes"}
+        if not range_header:
+            return response(200, file_bytes(fs_id, 0, size - 1), "application/octet-stream", headers, ka)
+        spec = range_header.split("=", 1)[-1].split(",")[0].strip()
+        first, _, last = spec.partition("-")
+        if first == "":
+            start, end = max(size - int(last), 0), size - 1
+        else:
+            start, end = int(first), min(int(last) if last else size - 1, size - 1)
+        if start >= size or start > end:
+            return response(416, b"", headers={"Content-Range": f"bytes */{size}"}, keep_alive=ka)
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        return response(206, file_bytes(fs_id, start, end), "application/octet-stream", headers, ka)
+
+    def stats(self) -> dict:
+        return {"calls": dict(self.calls), "injected": dict(self.injected)}
@@ -0,0 +1,294 @@
+"""
+Proxy-selection strategy simulator — discrete-event, offline, seconds mein.
+
+Real `ProxyEntry` + `app.core.proxy_strategy` strategies ko synthetic ya recorded
+proxy latency/failure traces pe replay karta hai aur har strategy ke liye
+success rate, mean attempts aur tail latency report karta hai.
+
+    python -m benchmarks.proxy_sim                                  # synthetic fleet
+    python -m benchmarks.proxy_sim --trace outcomes.jsonl           # recorded JSONL
+    python -m benchmarks.proxy_sim --trace admin_traces.json        # GET /admin/traces dump
+
+Recorded JSONL format — ek line per proxy attempt:
+    {"proxy": "http://1.2.3.4:80", "t": 1700000000.0, "latency": 0.42, "ok": true}
+"""
+import argparse
+import bisect
+import heapq
+import json
+import math
+import random
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from app.core.config import settings
+from app.core.proxy_pool import ProxyEntry
+from app.core.proxy_strategy import STRATEGIES, make_strategy
+
+
+# ─── Proxy Models ─────────────────────────────────────────────────────────────
+
+@dataclass
+class SyntheticProxy:
+    """
+    Log-normal latency + base fail rate; `capacity` se zyada concurrent load pe
+    latency aur failures badhte hain (free proxies aise hi collapse hote hain).
+    """
+    median: float = 0.3
+    sigma: float = 0.6
+    fail_rate: float = 0.05
+    capacity: int = 2
+    overload_penalty: float = 0.5
+    death_at: Optional[float] = None
+
+    def alive(self, t: float) -> bool:
+        return self.death_at is None or t < self.death_at
+
+    def sample(self, rng: random.Random, t: float, in_flight: int) -> Tuple[float, bool]:
+        if not self.alive(t):
+            return rng.uniform(0.05, 0.5), False  # connection refused / reset
+        over = max(0, in_flight - self.capacity)
+        latency = rng.lognormvariate(math.log(self.median), self.sigma) * (1 + over * self.overload_penalty)
+        fail = min(0.95, self.fail_rate + over * self.overload_penalty * 0.1)
+        return latency, rng.random() >= fail
+
+
+@dataclass
+class TraceProxy:
+    """Recorded outcomes — time t ke aas-paas ke records mein se sample"""
+    times: List[float] = field(default_factory=list)
+    outcomes: List[Tuple[float, bool]] = field(default_factory=list)
+    window: float = 60.0
+
+    def alive(self, t: float) -> bool:
+        return True
+
+    def sample(self, rng: random.Random, t: float, in_flight: int) -> Tuple[float, bool]:
+        lo = bisect.bisect_left(self.times, t - self.window)
+        hi = bisect.bisect_right(self.times, t + self.window)
+        if lo >= hi:
+            lo, hi = 0, len(self.outcomes)
+        return self.outcomes[rng.randrange(lo, hi)]
+
+
+def synthetic_fleet(size: int, rng: random.Random, duration: float, slow_fraction: float = 0.3,
+                    death_fraction: float = 0.2, capacity: int = 2) -> Dict[str, SyntheticProxy]:
+    fleet = {}
+    for i in range(size):
+        slow = rng.random() < slow_fraction
+        fleet[f"http://10.0.{i // 256}.{i % 256}:8080"] = SyntheticProxy(
+            median=rng.uniform(1.5, 4.0) if slow else rng.uniform(0.15, 0.6),
+            fail_rate=rng.uniform(0.1, 0.4) if slow else rng.uniform(0.01, 0.08),
+            capacity=capacity,
+            death_at=rng.uniform(0, duration) if rng.random() < death_fraction else None,
+        )
+    return fleet
+
+
+def load_trace(path: str, window: float) -> Tuple[Dict[str, TraceProxy], float]:
+    """JSONL outcomes ya /admin/traces ka JSON dump → per-proxy models + trace duration"""
+    records: List[Tuple[str, float, float, bool]] = []
+    with open(path) as f:
+        text = f.read()
+    if text.lstrip().startswith("{") and '"traces"' in text[:2000]:
+        for tr in json.loads(text)["traces"]:
+            for s in tr["spans"]:
+                meta = s.get("meta", {})
+                if s["name"] != "attempt" or meta.get("proxy", "DIRECT") == "DIRECT":
+                    continue
+                records.append((meta["proxy"], tr["started_at"] + s["offset_ms"] / 1000,
+                                s["duration_ms"] / 1000, "error" not in meta))
+    else:
+        for line in text.splitlines():
+            if line.strip():
+                r = json.loads(line)
+                records.append((r["proxy"], float(r["t"]), float(r["latency"]), bool(r["ok"])))
+    if not records:
+        raise ValueError(f"{path} mein koi proxy outcome nahi mila")
+
+    t0 = min(r[1] for r in records)
+    models: Dict[str, TraceProxy] = {}
+    for proxy, t, latency, ok in sorted(records, key=lambda r: r[1]):
+        m = models.setdefault(proxy, TraceProxy(window=window))
+        m.times.append(t - t0)
+        m.outcomes.append((latency, ok))
+    return models, max(r[1] for r in records) - t0
+
+
+# ─── Simulator ────────────────────────────────────────────────────────────────
+
+@dataclass
+class _Req:
+    start: float
+    attempts: int = 0
+
+
+class Simulator:
+    ARRIVAL, DONE, REFRESH = 0, 1, 2
+
+    def __init__(self, models: Dict[str, object], strategy_name: str, rate: float, duration: float,
+                 max_retries: int, timeout: float, refresh_interval: float, seed: int):
+        self.models = models
+        self.strategy = make_strategy(strategy_name, rng=random.Random(seed + 2))
+        self.rate = rate
+        self.duration = duration
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.refresh_interval = refresh_interval
+        self._arrivals = random.Random(seed)
+        self._outcomes = random.Random(seed + 1)
+        self._events: list = []
+        self._seq = 0
+        self.pool: List[ProxyEntry] = []
+        self._model_of: Dict[int, object] = {}
+
+        self.latencies: List[float] = []
+        self.ok = 0
+        self.failed = 0
+        self.attempts = 0
+        self.usage: Dict[str, int] = {}
+
+    def _push(self, t: float, kind: int, payload=None):
+        self._seq += 1
+        heapq.heappush(self._events, (t, self._seq, kind, payload))
+
+    def _refresh(self, t: float):
+        """refresh_pool jaisa — jo proxies test pass karein unki fresh entries"""
+        self.pool = []
+        self._model_of = {}
+        for url, model in self.models.items():
+            latency, ok = model.sample(self._outcomes, t, 0)
+            if not ok or latency > settings.PROXY_TEST_TIMEOUT:
+                continue
+            entry = ProxyEntry(url=url)
+            entry.mark_success(latency)
+            self.pool.append(entry)
+            self._model_of[id(entry)] = model
+        self.pool.sort(key=lambda e: e.response_time)
+
+    def _attempt(self, t: float, req: _Req):
+        alive = [p for p in self.pool if p.is_alive]
+        req.attempts += 1
+        self.attempts += 1
+        if not alive:
+            self._finish(t, req, ok=False, retry=False)
+            return
+        entry = self.strategy.select(alive)
+        entry.in_flight += 1
+        self.usage[entry.url] = self.usage.get(entry.url, 0) + 1
+        latency, ok = self._model_of[id(entry)].sample(self._outcomes, t, entry.in_flight)
+        if latency >= self.timeout:
+            latency, ok = self.timeout, False
+        self._push(t + latency, self.DONE, (req, entry, latency, ok))
+
+    def _finish(self, t: float, req: _Req, ok: bool, retry: bool = True):
+        if not ok and retry and req.attempts < self.max_retries:
+            self._attempt(t, req)
+            return
+        self.latencies.append(t - req.start)
+        if ok:
+            self.ok += 1
+        else:
+            self.failed += 1
+
+    def run(self) -> dict:
+        self._refresh(0.0)
+        self._push(self._arrivals.expovariate(self.rate), self.ARRIVAL)
+        if self.refresh_interval > 0:
+            self._push(self.refresh_interval, self.REFRESH)
+
+        while self._events:
+            t, _, kind, payload = heapq.heappop(self._events)
+            if kind == self.ARRIVAL:
+                if t > self.duration:
+                    continue
+                self._attempt(t, _Req(start=t))
+                self._push(t + self._arrivals.expovariate(self.rate), self.ARRIVAL)
+            elif kind == self.REFRESH:
+                if t > self.duration:
+                    continue
+                self._refresh(t)
+                self._push(t + self.refresh_interval, self.REFRESH)
+            else:
+                req, entry, latency, ok = payload
+                entry.in_flight = max(0, entry.in_flight - 1)
+                if ok:
+                    self.strategy.on_success(entry, latency)
+                else:
+                    self.strategy.on_failure(entry)
+                self._finish(t, req, ok)
+        return self.report()
+
+    def report(self) -> dict:
+        total = self.ok + self.failed
+        lat = sorted(self.latencies)
+
+        def pct(p):
+            return round(lat[min(len(lat) - 1, int(p / 100 * len(lat)))] * 1000, 1) if lat else 0.0
+
+        used = sorted(self.usage.values(), reverse=True)
+        return {
+            "strategy": self.strategy.name,
+            "requests": total,
+            "success_rate": round(self.ok / max(total, 1) * 100, 2),
+            "mean_attempts": round(self.attempts / max(total, 1), 3),
+            "p50_ms": pct(50),
+            "p90_ms": pct(90),
+            "p99_ms": pct(99),
+            "proxies_used": len(used),
+            "top_proxy_share": round(used[0] / max(sum(used), 1) * 100, 2) if used else 0.0,
+        }
+
+
+# ─── CLI ──────────────────────────────────────────────────────────────────────
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--strategies", default=",".join(STRATEGIES), help="Comma-separated")
+    p.add_argument("--trace", default=None, help="Recorded JSONL ya /admin/traces JSON dump")
+    p.add_argument("--trace-window", type=float, default=60.0, help="Recorded sample window (s)")
+    p.add_argument("--proxies", type=int, default=60)
+    p.add_argument("--slow-fraction", type=float, default=0.3)
+    p.add_argument("--death-fraction", type=float, default=0.2)
+    p.add_argument("--capacity", type=int, default=2, help="Concurrent requests before a proxy degrades")
+    p.add_argument("--rate", type=float, default=20.0, help="Requests per second (Poisson)")
+    p.add_argument("--duration", type=float, default=600.0, help="Simulated seconds")
+    p.add_argument("--max-retries", type=int, default=settings.TERABOX_MAX_RETRIES)
+    p.add_argument("--timeout", type=float, default=settings.TERABOX_TIMEOUT)
+    p.add_argument("--refresh-interval", type=float, default=settings.PROXY_REFRESH_INTERVAL)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--json", action="store_true", help="Table ki jagah JSON")
+    args = p.parse_args()
+
+    logger.disable("app")  # mark_failed ke "Proxy DEAD" warnings simulator mein noise hain
+
+    if args.trace:
+        models, span_s = load_trace(args.trace, args.trace_window)
+        duration = args.duration if "--duration" in sys.argv else max(span_s, 1.0)
+    else:
+        models = synthetic_fleet(args.proxies, random.Random(args.seed), args.duration,
+                                 args.slow_fraction, args.death_fraction, args.capacity)
+        duration = args.duration
+
+    results = []
+    for name in [s.strip() for s in args.strategies.split(",") if s.strip()]:
+        sim = Simulator(models, name, args.rate, duration, args.max_retries,
+                        args.timeout, args.refresh_interval, args.seed)
+        results.append(sim.run())
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    cols = list(results[0].keys())
+    widths = {c: max(len(c), *(len(str(r[c])) for r in results)) for c in cols}
+    print("  ".join(c.ljust(widths[c]) for c in cols))
+    for r in results:
+        print("  ".join(str(r[c]).ljust(widths[c]) for c in cols))
+
+
+if __name__ == "__main__":
+    main()
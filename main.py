@@ -3,12 +3,15 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 
 from app.core.config import settings
-from app.core.proxy_pool import proxy_pool
-from app.routers import terabox_router, proxy_router
+from app.core.proxy_pool import proxy_pool, ProxyPoolSaturated
+from app.core.admission import admission, AdmissionRejected
+from app.routers import terabox_router, proxy_router, admin_router
 from app.utils.rate_limiter import rate_limit_middleware
+from app.utils.tracing import tracing_middleware
+from app.utils.deadline import deadline_middleware, DeadlineExceeded, ClientDisconnected
 from app.utils.logger import log
 
 
@@ -21,14 +24,39 @@ START_TIME = time.time()
 async def lifespan(app: FastAPI):
     """Startup aur shutdown events"""
     log.info(f"🚀 {settings.APP_NAME} v{settings.APP_VERSION} starting...")
-    # Vercel serverless pe background tasks nahi chalte
-    # Proxy pool lazy-load hoga pehli request pe
+    if settings.SERVERLESS:
+        # Vercel serverless pe background tasks freeze/kill ho jaate hain — kuch start
+        # nahi hota. Proxy pool pehli cache miss pe snapshot/sample se (ensure_ready).
+        log.info("✅ Startup done! (serverless — pool on-demand)")
+        yield
+        return
+
+    # Optional subsystems — sirf enabled hon tab import (cold start chhota)
     import asyncio
-    asyncio.create_task(proxy_pool.start())
+    from app.core.prefetch import prefetcher
+    warm = False
+    if settings.PERSIST_ENABLED:
+        from app.core.persistence import persistent_store
+        # Disk snapshot — cache + proxy table pehli request se pehle memory mein
+        warm = await persistent_store.start()
+    if settings.SHARED_STATE:
+        from app.core.shared_state import shared_state
+        # Ek worker (ya sidecar) refresh karega, baaki shared memory se padhenge
+        await shared_state.start()
+    else:
+        asyncio.create_task(proxy_pool.start(initial_refresh=not warm))
+    if settings.PREFETCH_ENABLED:
+        await prefetcher.start()
     log.info("✅ Startup done!")
     yield
     log.info("🛑 Shutting down...")
-    await proxy_pool.stop()
+    await prefetcher.stop()
+    if settings.SHARED_STATE:
+        await shared_state.stop()
+    else:
+        await proxy_pool.stop()
+    if settings.PERSIST_ENABLED:
+        await persistent_store.stop()
 
 
 # ─── App Init ─────────────────────────────────────────────────────────────────
@@ -67,11 +95,45 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Innermost — deadline sirf handler ke kaam pe, rate limiter pe nahi
+app.middleware("http")(deadline_middleware)
 app.middleware("http")(rate_limit_middleware)
+# Last add = outermost — rate limiter ka time bhi trace mein aata hai
+app.middleware("http")(tracing_middleware)
 
 
 # ─── Exception Handlers ───────────────────────────────────────────────────────
 
+@app.exception_handler(ProxyPoolSaturated)
+async def proxy_saturated_handler(request: Request, exc: ProxyPoolSaturated):
+    # Broken proxies pe dher lagane se behtar — client thodi der baad aaye
+    return JSONResponse(
+        status_code=503,
+        content={"error": "Saare proxies busy hain", "detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    return JSONResponse(
+        status_code=503,
+        content={"error": "Server busy", "detail": str(exc), "tier": exc.tier},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded_handler(request: Request, exc: DeadlineExceeded):
+    return JSONResponse(status_code=504, content={"error": "Deadline exceeded", "detail": str(exc)})
+
+
+@app.exception_handler(ClientDisconnected)
+async def client_disconnected_handler(request: Request, exc: ClientDisconnected):
+    # Client ja chuka hai — yeh response koi nahi padhega (nginx convention: 499)
+    return Response(status_code=499)
+
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     log.error(f"Unhandled exception: {exc}")
@@ -85,6 +147,7 @@ async def global_exception_handler(request: Request, exc: Exception):
 
 app.include_router(terabox_router.router)
 app.include_router(proxy_router.router)
+app.include_router(admin_router.router)
 
 
 # ─── Root Endpoints ───────────────────────────────────────────────────────────
@@ -102,6 +165,8 @@ async def root():
             "proxy_stats": "GET /proxy/stats",
             "proxy_refresh": "POST /proxy/refresh",
             "cache_stats": "GET /api/cache/stats",
+            "traces": "GET /admin/traces",
+            "profiler": "POST /admin/profiler/start",
         },
     }
 
@@ -121,4 +186,6 @@ async def health():
         "uptime_seconds": uptime,
         "proxy_pool_size": stats["active_proxies"],
         "tor_enabled": stats["tor_enabled"],
+        "proxy_queue_depth": stats["queue"]["depth"],
+        "admission_queue_depth": admission.queue_depth(),
     }
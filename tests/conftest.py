@@ -0,0 +1,52 @@
+import os
+
+# Tests mein log file nahi — sirf stdout (settings import se pehle set hona chahiye)
+os.environ.setdefault("LOG_FILE", "")
+os.environ.setdefault("LOG_RATE_LIMIT", "0")
+
+import asyncio
+
+import httpx
+import pytest
+
+from app.utils.cache import cache
+
+
+@pytest.fixture(autouse=True)
+def clean_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+class MockTeraboxApi:
+    """Terabox API hosts ka MockTransport — per-host delay / failure script kar sakte hain"""
+
+    def __init__(self):
+        self.delays = {}
+        self.failing = set()
+        self.calls = []
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        host = f"{request.url.scheme}://{request.url.host}"
+        self.calls.append((host, request.url.path))
+        await asyncio.sleep(self.delays.get(host, 0))
+        if host in self.failing:
+            return httpx.Response(502)
+        if request.url.path == "/api/shorturlinfo":
+            return httpx.Response(200, json={
+                "errno": 0, "shareid": 1, "uk": 2, "sign": "s", "timestamp": 3,
+                "list": [{"fs_id": 42, "server_filename": "a.bin", "size": 1024}],
+            })
+        return httpx.Response(200, json={"dlink": f"{host}/file/42"})
+
+    def client(self, proxy_url=None, timeout=None) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.MockTransport(self.handler))
+
+
+@pytest.fixture
+def terabox_api(monkeypatch):
+    from app.core import terabox as terabox_module
+    api = MockTeraboxApi()
+    monkeypatch.setattr(terabox_module, "build_client", api.client)
+    return api
@@ -0,0 +1,23 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from main import app
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)  # lifespan nahi — pool/background tasks start nahi hote
+
+
+def test_admin_closed_without_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", None)
+    assert client.get("/admin/traces").status_code == 404
+    assert client.post("/admin/profiler/start").status_code == 404
+
+
+def test_admin_requires_matching_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "s3cret")
+    assert client.get("/admin/traces").status_code == 401
+    assert client.get("/admin/traces", headers={"X-Admin-Token": "wrong"}).status_code == 401
+    assert client.get("/admin/traces", headers={"X-Admin-Token": "s3cret"}).status_code == 200
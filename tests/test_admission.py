@@ -0,0 +1,121 @@
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import admission as admission_module
+from app.core import resolver as resolver_module
+from app.core.admission import AdmissionController, AdmissionRejected
+from app.core.config import settings
+from app.core.proxy_pool import ProxyPoolManager
+from app.core.terabox import terabox
+from app.routers import terabox_router
+from app.utils.cache import cache
+from main import app
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = ProxyPoolManager()
+    monkeypatch.setattr(admission_module, "proxy_pool", pool)
+    monkeypatch.setattr(settings, "ADMISSION_ENABLED", True)
+    monkeypatch.setattr(settings, "SERVERLESS", False)
+    monkeypatch.setattr(settings, "ADMISSION_DIRECT_CAPACITY", 2)
+    monkeypatch.setattr(settings, "PROXY_MAX_CONCURRENCY", 2)
+    return pool
+
+
+def _entries(n):
+    return [{"url": f"http://10.0.0.{i}:8080", "score": 1.0} for i in range(n)]
+
+
+def _burst(controller, n, hold):
+    async def one():
+        async with controller.slot("standard"):
+            await asyncio.sleep(hold)
+        return "ok"
+    return [one() for _ in range(n)]
+
+
+def test_warmup_waits_for_first_pool_load_instead_of_shedding(pool):
+    controller = AdmissionController()
+
+    async def main():
+        async def load_later():
+            await asyncio.sleep(0.1)
+            pool.load_entries(_entries(10), time.time())  # follower ko leader ka publish mila
+
+        results = await asyncio.gather(load_later(), *_burst(controller, 12, 0.05), return_exceptions=True)
+        return results[1:]
+
+    assert controller.warming()
+    results = asyncio.run(main())
+    assert results == ["ok"] * 12
+    assert not controller.warming()
+    assert sum(controller.shed.values()) == 0
+
+
+def test_empty_pool_after_load_still_sheds_on_fallback(pool, monkeypatch):
+    monkeypatch.setitem(settings.ADMISSION_MAX_WAIT, "standard", 0.0)
+    pool.load_entries([], time.time())  # pool load hua, par koi zinda proxy nahi
+    controller = AdmissionController()
+    assert not controller.warming()
+
+    async def main():
+        return await asyncio.gather(*_burst(controller, 4, 0.05), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert results.count("ok") == 2
+    assert sum(isinstance(r, AdmissionRejected) for r in results) == 2
+
+
+def test_batch_misses_limited_to_granted_slots(pool, monkeypatch):
+    pool.load_entries(_entries(1), time.time())  # capacity 2 × standard share 0.85 → 2 slots
+    controller = AdmissionController()
+    monkeypatch.setattr(terabox_router, "admission", controller)
+    monkeypatch.setattr(resolver_module, "admission", controller)
+    calls = []
+    running = {"now": 0, "peak": 0}
+
+    async def fake_get_direct_link(url):
+        calls.append(url)
+        running["now"] += 1
+        running["peak"] = max(running["peak"], running["now"])
+        await asyncio.sleep(0.02)
+        running["now"] -= 1
+        return {"success": True, "direct_link": f"https://d/{url[-1]}"}
+
+    monkeypatch.setattr(terabox, "get_direct_link", fake_get_direct_link)
+    cache.set("https://terabox.com/s/1hit", {"success": True, "direct_link": "https://d/hit"})
+    urls = [f"https://terabox.com/s/1batch{i}" for i in range(9)] + ["https://terabox.com/s/1hit"]
+
+    res = TestClient(app).post("/api/batch", json={"urls": urls})
+    assert res.status_code == 200
+    assert res.json()["success"] == 10
+    assert len(calls) == 9
+    assert sum(controller.admitted.values()) == 2
+    assert running["peak"] == 2  # 9 misses, par upstream pe utne hi jitne slots
+    assert controller.stats()["in_flight"] == 0
+
+
+def test_batch_sheds_as_a_whole_when_no_capacity(pool, monkeypatch):
+    pool.load_entries(_entries(1), time.time())
+    monkeypatch.setitem(settings.ADMISSION_MAX_WAIT, "standard", 0.0)
+    controller = AdmissionController()
+    controller._in_flight = 2
+    monkeypatch.setattr(terabox_router, "admission", controller)
+
+    res = TestClient(app).post("/api/batch", json={"urls": ["https://terabox.com/s/1batch0"]})
+    assert res.status_code == 503
+
+
+def test_batch_of_hits_skips_admission(pool, monkeypatch):
+    controller = AdmissionController()
+    monkeypatch.setattr(terabox_router, "admission", controller)
+    url = "https://terabox.com/s/1hit"
+    cache.set(url, {"success": True, "direct_link": "https://d/hit"})
+
+    res = TestClient(app).post("/api/batch", json={"urls": [url]})
+    assert res.json()["results"][0]["cached"] is True
+    assert sum(controller.admitted.values()) == 0
@@ -0,0 +1,109 @@
+import asyncio
+import time
+
+import pytest
+
+from app.core import domain_health as domain_health_module
+from app.core import terabox as terabox_module
+from app.core.config import settings
+from app.core.domain_health import DomainHealth
+from app.core.terabox import terabox
+
+H0, H1, H2 = "https://h0.test", "https://h1.test", "https://h2.test"
+HOSTS = [H0, H1, H2]
+PROXY = "http://10.0.0.1:8080"
+PATH = "/api/shorturlinfo?shorturl=abc"
+
+
+@pytest.fixture(autouse=True)
+def no_explore(monkeypatch):
+    monkeypatch.setattr(domain_health_module, "EXPLORE_RATE", 0.0)
+
+
+@pytest.fixture
+def health(monkeypatch):
+    health = DomainHealth()
+    monkeypatch.setattr(terabox_module, "domain_health", health)
+    monkeypatch.setattr(settings, "TERABOX_RACE_DELAY_MS", 100)
+    return health
+
+
+# ── rank ──────────────────────────────────────────────────────────────────────
+
+def test_unknown_hosts_keep_config_order():
+    assert DomainHealth().rank(PROXY, HOSTS) == HOSTS
+
+
+def test_failing_host_is_demoted():
+    health = DomainHealth()
+    health.record(PROXY, H0, False)
+    health.record(PROXY, H1, True, 0.2)
+    assert health.rank(PROXY, HOSTS)[-1] == H0
+    assert health.rank(PROXY, HOSTS)[0] == H2  # unknown — ek baar try ho jaye
+
+
+def test_pair_stats_beat_global_stats():
+    health = DomainHealth()
+    for _ in range(3):
+        health.record("http://blocked:1", H0, False)  # is proxy ke region se H0 block
+    health.record(PROXY, H0, True, 0.05)
+    health.record(PROXY, H1, True, 0.5)
+    assert health.rank(PROXY, [H0, H1]) == [H0, H1]
+    assert health.rank("http://blocked:1", [H0, H1]) == [H1, H0]
+
+
+def test_explore_swaps_top_two(monkeypatch):
+    monkeypatch.setattr(domain_health_module, "EXPLORE_RATE", 1.0)
+    assert DomainHealth().rank(PROXY, HOSTS)[:2] == [H1, H0]
+
+
+# ── _race ─────────────────────────────────────────────────────────────────────
+
+def _race(api, hosts=(H0, H1)):
+    async def main():
+        async with api.client() as client:
+            return await terabox._race(client, list(hosts), PATH, PROXY)
+    return asyncio.run(main())
+
+
+def test_race_slow_first_host_loses_after_delay(terabox_api, health):
+    terabox_api.delays[H0] = 1.0
+    start = time.monotonic()
+    host, info = _race(terabox_api)
+    assert host == H1 and info["errno"] == 0
+    assert time.monotonic() - start < 0.5
+    assert health._pairs[(PROXY, H0)].failures == 0  # haara, fail nahi hua
+    assert health._pairs[(PROXY, H0)].latency > 0
+
+
+def test_race_failed_first_host_starts_second_immediately(terabox_api, health, monkeypatch):
+    monkeypatch.setattr(settings, "TERABOX_RACE_DELAY_MS", 5000)
+    terabox_api.failing.add(H0)
+    start = time.monotonic()
+    host, _ = _race(terabox_api)
+    assert host == H1
+    assert time.monotonic() - start < 1.0
+    assert health._pairs[(PROXY, H0)].failures == 1
+
+
+def test_race_fast_first_host_never_starts_second(terabox_api, health):
+    host, _ = _race(terabox_api)
+    assert host == H0
+    assert [h for h, _ in terabox_api.calls] == [H0]
+
+
+def test_race_cancelled_during_delay_window_cleans_up(terabox_api, health):
+    terabox_api.delays[H0] = 1.0
+
+    async def main():
+        async with terabox_api.client() as client:
+            race = asyncio.create_task(terabox._race(client, [H0, H1], PATH, PROXY))
+            await asyncio.sleep(0.02)  # abhi delay window mein
+            race.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await race
+        return [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+
+    assert asyncio.run(main()) == []
+    assert (PROXY, H0) not in health._pairs  # client ke jaane ko host ki galti nahi ginte
+    assert [h for h, _ in terabox_api.calls] == [H0]
@@ -0,0 +1,165 @@
+import asyncio
+import os
+import re
+
+import httpx
+import pytest
+
+from app.core import downloader as downloader_module
+from app.core.config import settings
+from app.core.downloader import SegmentedDownloader, DownloadError
+from app.core.proxy_pool import ProxyPoolSaturated
+
+SHARE = "https://terabox.com/s/1download"
+DATA = os.urandom(64 * 1024)
+INFO = {"direct_link": "https://d.terabox.com/file/1", "size_bytes": len(DATA), "filename": "a.bin"}
+
+
+class Upstream:
+    def __init__(self):
+        self.resets = 0  # itne responses beech mein tootenge
+        self.scripted = []  # pehle yeh responses (status, headers, body), phir normal
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        if self.scripted:
+            status, headers, body = self.scripted.pop(0)
+            return httpx.Response(status, headers=headers, content=body)
+        start, end = map(int, re.match(r"bytes=(\d+)-(\d+)", request.headers["range"]).groups())
+        body = DATA[start:end + 1]
+        reset = self.resets > 0
+        self.resets -= reset
+
+        async def stream():
+            yield body[:len(body) // 2]
+            if reset:
+                raise httpx.ReadError("connection reset", request=request)
+            yield body[len(body) // 2:]
+
+        return httpx.Response(206, headers={"Content-Range": f"bytes {start}-{end}/{len(DATA)}"},
+                              content=stream())
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    up = Upstream()
+    monkeypatch.setattr(downloader_module, "build_client",
+                        lambda proxy: httpx.AsyncClient(transport=httpx.MockTransport(up.handler)))
+    monkeypatch.setattr(settings, "STREAM_CHUNK_SIZE", 4096)
+    monkeypatch.setattr(settings, "DOWNLOAD_SEGMENT_RETRIES", 1)
+    return up
+
+
+def _download(tmp_path, **kwargs) -> dict:
+    out = str(tmp_path / "a.bin")
+    dl = SegmentedDownloader(SHARE, out, connections=2, segment_size=16 * 1024,
+                             info=dict(INFO), use_proxies=False, **kwargs)
+    result = asyncio.run(dl.run())
+    with open(out, "rb") as f:
+        assert f.read() == DATA
+    return result
+
+
+def test_slow_abandons_do_not_count_as_failures(upstream, tmp_path, monkeypatch):
+    abandons = iter(range(6))
+    monkeypatch.setattr(SegmentedDownloader, "_too_slow",
+                        lambda self, seg: next(abandons, None) is not None)
+    result = _download(tmp_path)
+    assert result["slow_abandons"] == 6  # retries=1 ke bawajood download poora
+
+
+def test_saturated_pool_does_not_count_as_failure(upstream, tmp_path, monkeypatch):
+    attempts = []
+
+    async def acquire_proxy(timeout=None):
+        attempts.append(1)
+        if len(attempts) <= 5:
+            raise ProxyPoolSaturated("Proxy admission queue full")
+        return None
+
+    monkeypatch.setattr(downloader_module.proxy_pool, "acquire_proxy", acquire_proxy)
+    out = str(tmp_path / "a.bin")
+    dl = SegmentedDownloader(SHARE, out, connections=1, segment_size=16 * 1024, info=dict(INFO))
+    asyncio.run(dl.run())
+    assert len(attempts) > 5
+
+
+def test_real_errors_still_exhaust_retries(upstream, tmp_path):
+    upstream.resets = 100
+    with pytest.raises(DownloadError, match="baar baar fail"):
+        _download(tmp_path)
+
+
+def test_transient_errors_resume_without_duplicate_bytes(upstream, tmp_path):
+    upstream.resets = 2
+    _download(tmp_path)
+
+
+def test_short_pwrite_is_completed(upstream, tmp_path, monkeypatch):
+    real = os.pwrite
+    monkeypatch.setattr(os, "pwrite", lambda fd, data, offset: real(fd, bytes(data[:1000]), offset))
+    _download(tmp_path)
+
+
+def test_missing_bytes_fail_the_download(upstream, tmp_path, monkeypatch):
+    original = SegmentedDownloader._write
+    written = []
+
+    async def lossy_write(self, offset, data):
+        if written:  # pehle ke baad sab writes gum — file preallocated hai, size sahi dikhega
+            return
+        written.append(len(data))
+        await original(self, offset, data)
+
+    monkeypatch.setattr(SegmentedDownloader, "_write", lossy_write)
+    out = str(tmp_path / "a.bin")
+    dl = SegmentedDownloader(SHARE, out, connections=1, segment_size=16 * 1024,
+                             info=dict(INFO), use_proxies=False)
+    with pytest.raises(DownloadError, match="match nahi karte"):
+        asyncio.run(dl.run())
+    assert os.path.getsize(out) == len(DATA)
+
+
+def test_transient_statuses_are_retried_not_fatal(upstream, tmp_path):
+    upstream.scripted = [
+        (503, {}, b"busy"),
+        (429, {}, b"slow down"),
+        (502, {}, b"<html>proxy error</html>"),
+        (200, {}, b"<html>proxy login</html>"),  # proxy ka page, file nahi
+    ]
+    _download(tmp_path)
+
+
+def test_malformed_content_range_is_retried(upstream, tmp_path):
+    upstream.scripted = [
+        (206, {"Content-Range": "bytes garbage"}, b"x"),
+        (206, {"Content-Range": f"bytes 5-9/{len(DATA)}"}, b"x" * 5),  # galat offset
+    ]
+    _download(tmp_path)
+
+
+def test_server_ignoring_range_is_fatal(upstream, tmp_path):
+    upstream.scripted = [(200, {}, DATA)] * 4
+    with pytest.raises(DownloadError, match="Range support"):
+        _download(tmp_path)
+
+
+def test_checkpoint_snapshots_ranges_before_fsync(upstream, tmp_path, monkeypatch):
+    events = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(os, "fsync", lambda fd: (events.append("fsync"), real_fsync(fd)))
+    original = SegmentedDownloader._remaining_ranges
+
+    def ranges(self):
+        events.append("ranges")
+        return original(self)
+
+    monkeypatch.setattr(SegmentedDownloader, "_remaining_ranges", ranges)
+    monkeypatch.setattr(SegmentedDownloader, "_write_checkpoint",
+                        lambda self, r: events.append("write"))
+    monkeypatch.setattr(os, "remove", lambda path: None)  # checkpoint likha hi nahi
+    _download(tmp_path)
+    assert "write" in events
+    # Har write se pehle: ranges → fsync
+    for i, e in enumerate(events):
+        if e == "write":
+            assert events[i - 2:i] == ["ranges", "fsync"]
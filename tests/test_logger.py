@@ -0,0 +1,50 @@
+import io
+import time
+
+from loguru import logger
+
+from app.core.config import settings
+from app.utils.logger import LogWriter
+
+
+def _capture(writer):
+    handler = logger.add(writer.sink, format="{message}", level="DEBUG")
+    return handler
+
+
+def test_full_queue_drops_errors_without_blocking(monkeypatch):
+    monkeypatch.setattr(settings, "LOG_QUEUE_SIZE", 1)
+    writer = LogWriter(io.StringIO(), None)  # thread start nahi — queue bhari hi rahegi
+    handler = _capture(writer)
+    try:
+        start = time.perf_counter()
+        for _ in range(5):
+            logger.error("boom")
+        elapsed = time.perf_counter() - start
+    finally:
+        logger.remove(handler)
+    assert elapsed < 0.1
+    assert writer.dropped == 4
+    assert writer.dropped_errors == 4
+
+
+def test_file_sink_stays_info_and_counts_bytes(tmp_path, monkeypatch):
+    path = str(tmp_path / "app.log")
+    console = io.StringIO()
+    monkeypatch.setattr(settings, "LOG_JSON", False)
+    writer = LogWriter(console, path)
+    writer.start()
+    handler = _capture(writer)
+    try:
+        logger.debug("sirf console")
+        logger.info("🚀 dono jagah")
+    finally:
+        logger.remove(handler)
+        writer.stop()
+
+    assert "sirf console" in console.getvalue()
+    with open(path, "rb") as f:
+        data = f.read()
+    assert b"sirf console" not in data
+    assert "🚀 dono jagah".encode("utf-8") in data
+    assert writer._file_size == len(data)
@@ -0,0 +1,36 @@
+import asyncio
+import sqlite3
+import time
+
+from app.core.config import settings
+from app.core.persistence import PersistentStore
+from app.core.proxy_pool import ProxyPoolManager
+from app.utils.cache import InMemoryCache
+
+URL = "https://terabox.com/s/1persist"
+
+
+def test_stop_waits_for_write_running_in_thread(tmp_path, monkeypatch):
+    path = str(tmp_path / "state.db")
+    monkeypatch.setattr(settings, "PERSIST_PATH", path)
+    monkeypatch.setattr(settings, "PERSIST_FLUSH_INTERVAL", 0.01)
+    store = PersistentStore(ProxyPoolManager(), InMemoryCache())
+    original = store._write
+
+    def slow_write(batch):
+        time.sleep(0.2)  # loop ka flush thread mein atka hai jab shutdown aata hai
+        original(batch)
+
+    monkeypatch.setattr(store, "_write", slow_write)
+
+    async def main():
+        await store.start()
+        store.cache.set(URL, {"direct_link": "x"})
+        while not store._writes:
+            await asyncio.sleep(0.005)
+        await store.stop()
+
+    asyncio.run(main())
+    assert store._db is None
+    rows = sqlite3.connect(path).execute("SELECT key FROM cache").fetchall()
+    assert rows == [(store.cache._make_key(URL),)]
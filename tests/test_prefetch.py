@@ -0,0 +1,55 @@
+import asyncio
+import random
+import time
+
+from app.core import prefetch as prefetch_module
+from app.core.config import settings
+from app.core.prefetch import HotKeys, RefreshAhead
+from app.core.terabox import terabox
+from app.utils.cache import InMemoryCache
+
+URL = "https://terabox.com/s/1prefetch"
+
+
+def test_hot_keys_match_brute_force_top_k():
+    rng = random.Random(7)
+    hot = HotKeys(k=20)
+    for step in range(20000):
+        hot.record(f"u{int(rng.paretovariate(1.2))}")
+        if step == 10000:
+            hot.decay()
+        # Tracked keys mein coldest sach mein sabse kam estimate wala ho
+        if step % 997 == 0 and len(hot._top) == hot.k:
+            assert hot._coldest().estimate == min(h.estimate for h in hot._top.values())
+    assert len(hot._top) == 20
+    assert len(hot._heap) <= 4 * hot.k + 16
+    assert hot.hottest()[0].url == "u1"
+
+
+def test_failed_refresh_backs_off_per_key(monkeypatch):
+    monkeypatch.setattr(settings, "PREFETCH_MIN_HITS", 1)
+    monkeypatch.setattr(settings, "PREFETCH_BACKOFF", 30.0)
+    calls = []
+
+    async def failing(url):
+        calls.append(url)
+        return {"error": "share not found"}
+
+    monkeypatch.setattr(terabox, "get_direct_link", failing)
+    prefetcher = RefreshAhead(InMemoryCache())
+    for _ in range(3):
+        prefetcher.hot.record(URL)
+    assert [h.url for h in prefetcher.due()] == [URL]
+
+    asyncio.run(prefetcher._refresh(URL))
+    assert prefetcher.due() == []  # backoff ke andar
+
+    now = time.monotonic()
+    with monkeypatch.context() as m:
+        m.setattr(prefetch_module.time, "monotonic", lambda: now + 31)
+        assert [h.url for h in prefetcher.due()] == [URL]
+
+    asyncio.run(prefetcher._refresh(URL))
+    assert len(calls) == 2
+    retry_at, fails = prefetcher._backoff[URL]
+    assert fails == 2 and retry_at - time.monotonic() > 55  # doosre fail pe double
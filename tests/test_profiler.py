@@ -0,0 +1,23 @@
+import time
+
+from app.utils.profiler import SamplingProfiler
+
+
+def test_report_while_sampling_does_not_race():
+    profiler = SamplingProfiler()
+    profiler.start(interval=0.0001, duration=5)
+    errors = 0
+    end = time.monotonic() + 1.5
+    try:
+        # Main thread hi target hai — har report() call naye stacks banata hai
+        while time.monotonic() < end:
+            try:
+                profiler.report()
+            except RuntimeError:
+                errors += 1
+    finally:
+        profiler.stop()
+    report = profiler.report()
+    assert errors == 0
+    assert report["samples"] > 0
+    assert sum(f["samples"] for f in report["top_functions"]) <= report["samples"]
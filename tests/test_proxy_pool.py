@@ -0,0 +1,140 @@
+import asyncio
+
+from app.core import proxy_pool as proxy_pool_module
+from app.core.config import settings
+from app.core.proxy_pool import ProxyPoolManager
+
+
+def _fake_sampler(pool, calls):
+    async def sample():
+        calls.append(1)
+        await pool._install([])  # kuch zinda nahi mila
+    return sample
+
+
+def test_first_serverless_sample_runs_right_after_boot(monkeypatch):
+    # Fresh microVM — monotonic() abhi SERVERLESS_RESAMPLE_INTERVAL se chhota
+    monkeypatch.setattr(proxy_pool_module.time, "monotonic", lambda: 5.0)
+    monkeypatch.setattr(settings, "PROXY_SNAPSHOT_PATH", "")
+    pool = ProxyPoolManager()
+    calls = []
+    monkeypatch.setattr(pool, "_sample", _fake_sampler(pool, calls))
+
+    asyncio.run(pool.ensure_ready())
+    assert calls == [1]
+
+
+def test_resample_backs_off_after_a_sample_ran(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(proxy_pool_module.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(settings, "PROXY_SNAPSHOT_PATH", "")
+    pool = ProxyPoolManager()
+    calls = []
+    monkeypatch.setattr(pool, "_sample", _fake_sampler(pool, calls))
+
+    async def main():
+        await pool.ensure_ready()
+        await asyncio.sleep(0)
+        await pool.ensure_ready()  # abhi backoff — direct
+        now[0] += settings.SERVERLESS_RESAMPLE_INTERVAL + 1
+        await pool.ensure_ready()
+
+    asyncio.run(main())
+    assert calls == [1, 1]
+
+
+# ── Saturation queue ──────────────────────────────────────────────────────────
+
+import pytest
+
+from app.core.proxy_pool import ProxyPoolSaturated
+
+PROXY = "http://10.0.0.1:8080"
+
+
+@pytest.fixture
+def saturated(monkeypatch):
+    """Ek proxy, ek slot — aur woh slot pehle se pakda hua"""
+    monkeypatch.setattr(settings, "SERVERLESS", False)
+    monkeypatch.setattr(settings, "USE_TOR", False)
+    monkeypatch.setattr(settings, "PROXY_MAX_CONCURRENCY", 1)
+    monkeypatch.setattr(settings, "PROXY_QUEUE_SIZE", 2)
+    monkeypatch.setattr(settings, "PROXY_QUEUE_TIMEOUT", 5.0)
+    pool = ProxyPoolManager()
+    pool.load_entries([{"url": PROXY}])
+    return pool
+
+
+def _in_flight(pool):
+    return pool.alive_entries()[0].in_flight
+
+
+def test_full_queue_rejects_immediately(saturated):
+    async def main():
+        assert await saturated.acquire_proxy() == PROXY
+        waiters = [asyncio.create_task(saturated.acquire_proxy()) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(ProxyPoolSaturated, match="queue full"):
+            await saturated.acquire_proxy()
+        for w in waiters:
+            w.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+
+    asyncio.run(main())
+    assert saturated.queue_stats()["rejected"] == 1
+    assert saturated.queue_stats()["depth"] == 0
+
+
+def test_wait_timeout_becomes_saturated(saturated):
+    async def main():
+        await saturated.acquire_proxy()
+        with pytest.raises(ProxyPoolSaturated) as exc:
+            await saturated.acquire_proxy(timeout=0.05)
+        return exc.value
+
+    err = asyncio.run(main())
+    assert err.retry_after == 2
+    assert saturated.queue_stats()["timeouts"] == 1
+    assert saturated.queue_stats()["depth"] == 0
+
+
+def test_released_slot_goes_to_first_waiter(saturated):
+    async def main():
+        await saturated.acquire_proxy()
+        order = []
+
+        async def waiter(name):
+            proxy = await saturated.acquire_proxy()
+            order.append(name)
+            return proxy
+
+        first = asyncio.create_task(waiter("first"))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(waiter("second"))
+        await asyncio.sleep(0)
+
+        saturated.release(PROXY)
+        assert await first == PROXY
+        assert not second.done() and _in_flight(saturated) == 1
+        saturated.report_success(PROXY, 0.1)
+        assert await second == PROXY
+        return order
+
+    assert asyncio.run(main()) == ["first", "second"]
+    assert _in_flight(saturated) == 1
+
+
+def test_waiter_cancelled_after_grant_returns_slot(saturated):
+    async def main():
+        await saturated.acquire_proxy()
+        waiter = asyncio.create_task(saturated.acquire_proxy())
+        await asyncio.sleep(0)
+        saturated.release(PROXY)  # slot seedha waiter ke future mein
+        assert _in_flight(saturated) == 1
+        waiter.cancel()  # waiter jaagne se pehle hi chala gaya
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+    asyncio.run(main())
+    assert _in_flight(saturated) == 0
+    assert saturated.queue_stats()["depth"] == 0
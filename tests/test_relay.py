@@ -0,0 +1,146 @@
+import asyncio
+import re
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.core import relay as relay_module
+from app.core.config import settings
+from app.core.proxy_pool import ProxyPoolManager
+from app.core.relay import StreamRelay
+from app.utils.cache import cache
+
+SHARE = "https://terabox.com/s/1relay"
+PROXY = "http://10.0.0.1:8080"
+DATA = bytes(range(256)) * 40  # 10 KiB
+
+
+class Upstream:
+    """dlink server — Range support, aur script kiye hue connect / mid-body failures"""
+
+    def __init__(self):
+        self.connect_failures = 0
+        self.drops = []  # har response ke liye: itne bytes ke baad connection toot jaaye
+        self.ranges = []
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        if self.connect_failures:
+            self.connect_failures -= 1
+            raise httpx.ConnectError("connect refused", request=request)
+        start, end = map(int, re.match(r"bytes=(\d+)-(\d+)", request.headers["range"]).groups())
+        self.ranges.append((start, end))
+        body = DATA[start:end + 1]
+        drop = self.drops.pop(0) if self.drops else None
+
+        async def stream():
+            if drop is None:
+                yield body
+                return
+            yield body[:drop]
+            raise httpx.ReadError("connection reset", request=request)
+
+        return httpx.Response(
+            206, headers={"Content-Range": f"bytes {start}-{end}/{len(DATA)}"},
+            content=stream(),
+        )
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    up = Upstream()
+    pool = ProxyPoolManager()
+    pool.load_entries([{"url": PROXY}])
+    up.pool = pool
+    monkeypatch.setattr(relay_module, "proxy_pool", pool)
+    monkeypatch.setattr(relay_module, "build_client",
+                        lambda proxy: httpx.AsyncClient(transport=httpx.MockTransport(up.handler)))
+    monkeypatch.setattr(settings, "STREAM_MAX_REFRESHES", 3)
+    monkeypatch.setattr(settings, "STREAM_CHUNK_SIZE", 500)  # drops chunk boundary pe
+    cache.set(SHARE, {"direct_link": "https://d.terabox.com/file/1", "size_bytes": len(DATA),
+                      "filename": "a.bin", "proxy_used": PROXY})
+    return up
+
+
+def _stream(range_header=None, during=None):
+    async def main():
+        relay = StreamRelay(SHARE)
+        res = await relay.response(range_header)
+        chunks = []
+        try:
+            async for chunk in res.body_iterator:
+                chunks.append(chunk)
+                if during:
+                    during()
+        except httpx.HTTPError as e:
+            return res, b"".join(chunks), relay, e
+        return res, b"".join(chunks), relay, None
+    return asyncio.run(main())
+
+
+def test_range_request_returns_exact_slice(upstream):
+    res, body, _, err = _stream("bytes=100-4999")
+    assert err is None
+    assert res.status_code == 206
+    assert res.headers["content-range"] == f"bytes 100-4999/{len(DATA)}"
+    assert body == DATA[100:5000]
+
+
+def test_initial_open_retries_transport_errors(upstream):
+    upstream.connect_failures = 2
+    res, body, relay, err = _stream()
+    assert err is None and body == DATA
+    assert relay.refreshes == 2
+
+
+def test_initial_open_gives_up_after_max_refreshes(upstream):
+    upstream.connect_failures = 10
+    with pytest.raises(HTTPException) as exc:
+        _stream()
+    assert exc.value.status_code == 502
+    assert upstream.pool.alive_entries()[0].in_flight == 0
+
+
+def test_mid_body_drop_resumes_from_offset(upstream):
+    upstream.drops = [1000, 500]
+    res, body, relay, err = _stream("bytes=200-9999")
+    assert err is None
+    assert body == DATA[200:10000]
+    assert upstream.ranges == [(200, 9999), (1200, 9999), (1700, 9999)]
+
+
+def test_exhausted_refreshes_abort_instead_of_short_body(upstream):
+    upstream.drops = [100] * 10
+    res, body, relay, err = _stream()
+    assert isinstance(err, httpx.ReadError)
+    assert len(body) < len(DATA)
+    assert relay.refreshes == settings.STREAM_MAX_REFRESHES
+
+
+def test_stream_holds_proxy_slot_for_its_lifetime(upstream):
+    entry = upstream.pool.alive_entries()[0]
+    seen = []
+    _stream(during=lambda: seen.append(entry.in_flight))
+    assert seen and all(n == 1 for n in seen)
+    assert entry.in_flight == 0
+
+
+def test_non_latin1_filename_uses_rfc5987(upstream):
+    info = cache.get(SHARE)
+    cache.set(SHARE, {**info, "filename": "फ़िल्म \"2024\".mp4"})
+    res, body, _, err = _stream()
+    assert err is None and body == DATA
+    header = res.headers["content-disposition"]
+    header.encode("latin-1")
+    assert "filename*=UTF-8''%E0%A4%AB" in header
+    assert 'filename="' in header and '\\"' not in header
+
+
+def test_response_build_error_releases_upstream_and_slot(upstream, monkeypatch):
+    def broken(*args, **kwargs):
+        raise UnicodeEncodeError("latin-1", "x", 0, 1, "boom")
+
+    monkeypatch.setattr(relay_module, "StreamingResponse", broken)
+    with pytest.raises(UnicodeEncodeError):
+        _stream()
+    assert upstream.pool.alive_entries()[0].in_flight == 0
@@ -0,0 +1,230 @@
+import asyncio
+
+import pytest
+
+from app.core import resolver as resolver_module
+from app.core.admission import AdmissionController, AdmissionRejected
+from app.core.config import settings
+from app.core.proxy_pool import ProxyPoolManager
+from app.core.resolver import LinkResolver
+from app.core.terabox import terabox
+from app.utils.cache import cache
+from app.utils.deadline import DeadlineExceeded, ClientDisconnected, deadline_scope, clamp
+
+URL = "https://terabox.com/s/1resolver"
+
+
+class FakeRequest:
+    """Sirf receive() — `disconnect_after` seconds baad http.disconnect"""
+
+    def __init__(self, disconnect_after=None):
+        self.disconnect_after = disconnect_after
+
+    async def receive(self):
+        if self.disconnect_after is None:
+            await asyncio.Event().wait()
+        await asyncio.sleep(self.disconnect_after)
+        return {"type": "http.disconnect"}
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    calls = []
+
+    async def fake_get_direct_link(url):
+        calls.append(url)
+        await asyncio.sleep(upstream.delay)
+        return {"success": True, "direct_link": f"https://d/{url[-4:]}"}
+
+    upstream.delay = 0.3
+    upstream.calls = calls
+    monkeypatch.setattr(terabox, "get_direct_link", fake_get_direct_link)
+    return upstream
+
+
+@pytest.fixture
+def admission(monkeypatch):
+    controller = AdmissionController()
+    monkeypatch.setattr(controller, "warming", lambda: False)  # pool loaded maano
+    monkeypatch.setattr(resolver_module, "admission", controller)
+    monkeypatch.setattr(settings, "ADMISSION_ENABLED", True)
+    return controller
+
+
+def test_flight_does_not_inherit_first_waiters_deadline(upstream, admission):
+    resolver = LinkResolver()
+
+    async def short():
+        with deadline_scope(0.1):
+            return await resolver.resolve(URL, "standard")
+
+    async def main():
+        return await asyncio.gather(short(), resolver.resolve(URL, "standard"), return_exceptions=True)
+
+    first, second = asyncio.run(main())
+    assert isinstance(first, DeadlineExceeded)
+    assert second["success"] is True
+    assert len(upstream.calls) == 1
+    assert cache.get(URL)["success"] is True
+
+
+def test_premium_waiter_promotes_free_flight(upstream, admission, monkeypatch):
+    monkeypatch.setattr(admission, "capacity", lambda: 1.0)
+    monkeypatch.setitem(settings.ADMISSION_MAX_WAIT, "free", 0.0)
+    upstream.delay = 0.01
+    resolver = LinkResolver()
+
+    async def main():
+        admission._in_flight = 1  # koi aur miss slot pakde hue hai
+
+        async def free_slot():
+            await asyncio.sleep(0.05)
+            admission._release()
+
+        return await asyncio.gather(
+            resolver.resolve(URL, "free"),
+            resolver.resolve(URL, "premium"),
+            free_slot(),
+            return_exceptions=True,
+        )
+
+    free, premium, _ = asyncio.run(main())
+    # Flight premium pe queue hui — free waiter bhi usi result se serve
+    assert premium["success"] is True
+    assert free["success"] is True
+    assert admission.admitted["premium"] == 1
+    assert not admission.shed["free"]
+
+
+def test_free_flight_alone_is_still_shed(upstream, admission, monkeypatch):
+    monkeypatch.setattr(admission, "capacity", lambda: 1.0)
+    monkeypatch.setitem(settings.ADMISSION_MAX_WAIT, "free", 0.0)
+    resolver = LinkResolver()
+
+    async def main():
+        admission._in_flight = 1
+        return await resolver.resolve(URL, "free")
+
+    with pytest.raises(AdmissionRejected):
+        asyncio.run(main())
+
+
+def test_hot_url_fetch_kept_after_disconnect_without_prefetch(upstream, admission, monkeypatch):
+    monkeypatch.setattr(settings, "PREFETCH_ENABLED", False)
+    monkeypatch.setattr(settings, "DISCONNECT_KEEP_MIN_HITS", 3)
+    resolver = LinkResolver()
+    for _ in range(3):
+        cache.get(URL)  # router har request pe pehle cache dekhta hai
+
+    async def main():
+        with pytest.raises(ClientDisconnected):
+            await resolver.resolve(URL, "standard", FakeRequest(disconnect_after=0.05))
+        await asyncio.sleep(0.4)
+
+    asyncio.run(main())
+    assert resolver.kept_for_cache == 1
+    assert cache.get(URL)["success"] is True
+
+
+def test_cold_url_fetch_cancelled_after_disconnect(upstream, admission, monkeypatch):
+    monkeypatch.setattr(settings, "DISCONNECT_KEEP_MIN_HITS", 3)
+    resolver = LinkResolver()
+
+    async def main():
+        with pytest.raises(ClientDisconnected):
+            await resolver.resolve(URL, "standard", FakeRequest(disconnect_after=0.05))
+        await asyncio.sleep(0.4)
+
+    asyncio.run(main())
+    assert resolver.cancelled == 1
+    assert cache.get(URL) is None
+
+
+def test_clamp_raises_when_budget_spent():
+    async def main():
+        with deadline_scope(0.01):
+            await asyncio.sleep(0.02)
+            clamp(5.0)
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(main())
+
+
+def test_deadline_during_proxy_queue_wait_is_504_not_503(monkeypatch):
+    monkeypatch.setattr(settings, "PROXY_MAX_CONCURRENCY", 1)
+    monkeypatch.setattr(settings, "USE_TOR", False)
+    pool = ProxyPoolManager()
+    pool.load_entries([{"url": "http://127.0.0.1:9"}])
+
+    async def main():
+        assert await pool.acquire_proxy() == "http://127.0.0.1:9"
+        with deadline_scope(0.05):
+            await pool.acquire_proxy(timeout=clamp(settings.PROXY_QUEUE_TIMEOUT))
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(main())
+
+
+def test_deadline_during_admission_wait_is_504_not_503(admission, monkeypatch):
+    monkeypatch.setattr(admission, "capacity", lambda: 1.0)
+    admission._latency = 0.01  # expected wait chhota — request queue hota hai
+
+    async def main():
+        admission._in_flight = 1
+        with deadline_scope(0.05):
+            async with admission.slot("premium"):
+                pass
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(main())
+
+
+def test_deadline_shorter_than_expected_admission_wait_is_504(admission, monkeypatch):
+    monkeypatch.setattr(admission, "capacity", lambda: 1.0)
+    admission._latency = 2.0
+
+    async def main():
+        admission._in_flight = 1
+        with deadline_scope(0.05):
+            async with admission.slot("premium"):
+                pass
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(main())
+    assert not admission.shed["premium"]
+
+
+def test_miss_keeps_request_trace_in_flight(terabox_api, monkeypatch):
+    from fastapi.testclient import TestClient
+    from main import app
+
+    monkeypatch.setattr(settings, "TRACING_ENABLED", True)
+    monkeypatch.setattr(settings, "TERABOX_RACE_FIRST_HOP", False)
+    res = TestClient(app).get("/api/get-link", params={"url": URL})
+    assert res.status_code == 200
+    timing = res.headers["server-timing"]
+    for name in ("proxy_select", "attempt", "shorturlinfo", "dlink"):
+        assert f"{name};dur=" in timing
+
+
+def test_flight_drops_only_the_deadline_from_context(upstream, admission, monkeypatch):
+    from app.utils import deadline
+    from app.utils.tracing import Trace, _current_trace, current_trace
+
+    seen = {}
+
+    async def fake_get_direct_link(url):
+        seen["trace"] = current_trace()
+        seen["remaining"] = deadline.remaining()
+        return {"success": True, "direct_link": "https://d/x"}
+
+    monkeypatch.setattr(terabox, "get_direct_link", fake_get_direct_link)
+    trace = Trace(method="GET", path="/api/get-link")
+
+    async def main():
+        _current_trace.set(trace)
+        with deadline_scope(5):
+            return await LinkResolver().resolve(URL, "standard")
+
+    assert asyncio.run(main())["success"] is True
+    assert seen == {"trace": trace, "remaining": None}
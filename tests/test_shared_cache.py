@@ -0,0 +1,92 @@
+import socket
+
+import pytest
+
+from app.core.proxy_pool import ProxyPoolManager
+from app.core.shared_state import SharedRegion, SharedState
+from app.utils.cache import InMemoryCache
+
+URL = "https://terabox.com/s/1shared"
+
+
+def _worker(tmp_path, role: str) -> SharedState:
+    state = SharedState(ProxyPoolManager(), InMemoryCache())
+    state._dir = str(tmp_path)
+    state._proxies = SharedRegion(str(tmp_path / "proxies.shm"), 1 << 20)
+    state._hot_cache = SharedRegion(str(tmp_path / "cache.shm"), 1 << 20)
+    state._sock_path = str(tmp_path / "reports.sock")
+    state.role = role
+    if role == "leader":
+        state._proxies.open(create=True)
+        state._hot_cache.open(create=True)
+        state._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        state._sock.bind(state._sock_path)
+        state._sock.setblocking(False)
+    else:
+        state._client_socket()
+    state.cache.attach_shared(state)
+    return state
+
+
+@pytest.fixture
+def cluster(tmp_path):
+    leader = _worker(tmp_path, "leader")
+    followers = [_worker(tmp_path, "follower") for _ in range(2)]
+    yield leader, followers
+    for state in (leader, *followers):
+        state._sock.close()
+
+
+def _round(leader):
+    """Coordinator ka ek cycle — reports padho, publish karo"""
+    leader._drain_reports()
+    leader._publish_cache()
+
+
+def test_clear_on_follower_reaches_leader_and_other_followers(cluster):
+    leader, (f1, f2) = cluster
+    leader.cache.set(URL, {"direct_link": "x"})
+    _round(leader)
+    assert f2.cache.get(URL) == {"direct_link": "x"}  # ab f2 ke local store mein bhi
+
+    f1.cache.clear()
+    _round(leader)
+
+    assert leader.cache.get(URL) is None
+    assert f1.cache.get(URL) is None
+    assert f2.cache.get(URL) is None
+
+
+def test_delete_on_follower_tombstones_key_everywhere(cluster):
+    leader, (f1, f2) = cluster
+    leader.cache.set(URL, {"direct_link": "x"})
+    leader.cache.set(URL + "2", {"direct_link": "y"})
+    _round(leader)
+    assert f2.cache.get(URL)
+
+    f1.cache.delete(URL)
+    _round(leader)
+
+    assert leader.cache.get(URL) is None
+    assert f2.cache.get(URL) is None
+    assert f2.cache.get(URL + "2") == {"direct_link": "y"}
+
+
+def test_entry_set_after_delete_survives_tombstone(cluster):
+    leader, (f1, f2) = cluster
+    f1.cache.delete(URL)
+    _round(leader)
+    f2.cache.set(URL, {"direct_link": "fresh"})
+    _round(leader)
+    assert f2.cache.get(URL) == {"direct_link": "fresh"}
+
+
+def test_shared_hit_returns_copy(cluster):
+    leader, (f1, _) = cluster
+    leader.cache.set(URL, {"direct_link": "x"})
+    _round(leader)
+
+    hit = f1.cache.get(URL)
+    hit["cached"] = True  # router yahi karta hai
+    assert "cached" not in f1.cache.get(URL)
+    assert "cached" not in leader._cache_table[leader.cache._make_key(URL)]["data"]
@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.core.tor_pool import TorCircuitPool, TorController, TorControlError
+from benchmarks.loadtest.fake_tor import FakeTor
+
+
+def _run_with_tor(body, ports=1):
+    """FakeTor (local SOCKS + control port) chala ke `body(tor)` chalao"""
+    async def main():
+        tor = FakeTor(ports=ports, bad_circuit_rate=0.0)
+        await tor.start()
+        try:
+            return await body(tor)
+        finally:
+            await tor.stop()
+    return asyncio.run(main())
+
+
+@pytest.fixture
+def tor_settings(monkeypatch):
+    monkeypatch.setattr(settings, "TOR_CIRCUITS_PER_PORT", 2)
+    monkeypatch.setattr(settings, "TOR_ROTATE_EVERY", 600)
+    monkeypatch.setattr(settings, "TOR_STRATEGY", "least_loaded")
+
+
+# ── Control port ──────────────────────────────────────────────────────────────
+
+def test_controller_finds_and_closes_circuits_by_username():
+    async def body(tor):
+        port = tor.socks_ports[0]
+        mine = tor._circuit(port, "tbx-1-a")
+        other = tor._circuit(port, "tbx-1-b")
+        ctl = TorController(port=tor.control_port, password=None)  # PROTOCOLINFO → NULL auth
+
+        ids = await ctl.circuits_for("tbx-1-a")
+        assert ids == [str(mine.cid)]
+        await ctl.close_circuits(ids)
+        assert mine.closed and not other.closed
+        assert await ctl.circuits_for("tbx-1-a") == []
+
+        await TorController(port=tor.control_port, password="secret").newnym()
+        assert tor.newnyms == 1 and other.closed
+
+    _run_with_tor(body)
+
+
+def test_controller_surfaces_error_replies():
+    async def body(tor):
+        with pytest.raises(TorControlError, match="510"):
+            await TorController(port=tor.control_port, password=None).run("BOGUS")
+
+    _run_with_tor(body)
+
+
+def test_close_is_if_unused():
+    async def body(tor):
+        busy = tor._circuit(tor.socks_ports[0], "tbx-1-busy")
+        busy.active = 1  # stream abhi chal rahi
+        ctl = TorController(port=tor.control_port, password=None)
+        await ctl.close_circuits(await ctl.circuits_for("tbx-1-busy"))
+        assert not busy.closed
+
+    _run_with_tor(body)
+
+
+# ── Rotation ──────────────────────────────────────────────────────────────────
+
+def _pool(tor, monkeypatch) -> TorCircuitPool:
+    monkeypatch.setattr(settings, "TOR_SOCKS_PORTS", tor.socks_ports)
+    return TorCircuitPool(controller=TorController(port=tor.control_port, password=None))
+
+
+def _username(url: str) -> str:
+    return url.split("//", 1)[1].split(":", 1)[0]
+
+
+def test_rotate_with_in_flight_request_drains_old_circuit(tor_settings, monkeypatch):
+    monkeypatch.setattr(settings, "TERABOX_TIMEOUT", 5)
+
+    async def body(tor):
+        pool = _pool(tor, monkeypatch)
+        old_url = pool.get_circuit()
+        # Request us circuit pe Tor tak pahunchi
+        fake = tor._circuit(tor.socks_ports[0], _username(old_url))
+        circuit = pool._by_url[old_url]
+
+        pool.rotate(circuit)
+        new_url = circuit.entry.url
+        assert new_url != old_url and _username(new_url).endswith("-1")
+        assert pool.owns(old_url) and pool.stats()["retiring"] == 1
+        assert circuit.entry.in_flight == 0  # naya circuit fresh
+
+        await asyncio.sleep(1.2)
+        assert not fake.closed  # request abhi chal rahi — band nahi
+
+        # Purane circuit ka outcome naye entry ki health nahi chhedta
+        score = circuit.entry.score
+        pool.report(old_url, False)
+        assert circuit.entry.score == score and circuit.entry.failures == 0
+
+        await asyncio.wait_for(_retired(pool), 3)
+        assert fake.closed
+        assert not pool.owns(old_url)
+        assert pool.stats()["rotations"] == 1
+
+    _run_with_tor(body)
+
+
+def test_rotate_idle_circuit_closes_it_right_away(tor_settings, monkeypatch):
+    async def body(tor):
+        pool = _pool(tor, monkeypatch)
+        circuit = pool._circuits[0]
+        old_url = circuit.entry.url
+        fake = tor._circuit(tor.socks_ports[0], _username(old_url))
+
+        pool.rotate(circuit)
+        assert not pool.owns(old_url)  # in-flight nahi — retiring mein nahi
+        await asyncio.wait_for(_retired(pool), 2)
+        assert fake.closed
+
+    _run_with_tor(body)
+
+
+def test_rotation_survives_dead_control_port(tor_settings, monkeypatch):
+    async def body(tor):
+        pool = _pool(tor, monkeypatch)
+        pool._controller = TorController(port=1, password=None, timeout=0.5)
+        pool.rotate(pool._circuits[0])
+        await asyncio.wait_for(_retired(pool), 2)  # OSError log hota hai, raise nahi
+        assert pool.stats()["rotations"] == 1
+
+    _run_with_tor(body)
+
+
+async def _retired(pool):
+    """Rotate ke background _retire tasks khatam hone do"""
+    tasks = [t for t in asyncio.all_tasks()
+             if t is not asyncio.current_task() and "_retire" in repr(t.get_coro())]
+    await asyncio.gather(*tasks)